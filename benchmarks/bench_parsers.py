@@ -0,0 +1,134 @@
+"""
+Offline benchmark for the scrapers' HTML parsing.
+
+Replays the saved pages in benchmarks/fixtures/ through each scraper's parse
+step, reports pages/sec, posts/sec and peak memory, and compares the numbers
+with benchmarks/baseline.json.
+
+    python benchmarks/bench_parsers.py                    # compare with the baseline
+    python benchmarks/bench_parsers.py --update-baseline  # record a new baseline
+
+Exits with status 1 when a parser got slower or hungrier than the tolerance
+allows, or when it extracts a different number of posts than before.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+
+import hanime_index  # noqa: E402
+import javguru_index  # noqa: E402
+import onejav_index  # noqa: E402
+import playlist_index  # noqa: E402
+from html_parsing import PARSER  # noqa: E402
+
+# --- Configuration ---
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+MIN_SECONDS = 1.0  # Minimum time spent timing each fixture
+TOLERANCE = 0.25  # Allowed slowdown / memory growth before it counts as a regression
+FETCH_TIME = "2025-01-01T00:00:00+00:00"
+
+# Fixture file name -> the parse step that consumes it.
+PARSERS = {
+    "missav_playlist.html": lambda html: playlist_index.parse_playlist_page(html, FETCH_TIME),
+    "hanime_listing.html": lambda html: hanime_index.extract_posts_from_html(html, "https://hanimes.org/tag/hanime/"),
+    "onejav_overview.html": lambda html: onejav_index.parse_overview_page(html, onejav_index.BASE_URL, FETCH_TIME),
+    "javguru_listing.html": lambda html: javguru_index.parse_listing_page(html, javguru_index.BASE_URL, FETCH_TIME)[0],
+}
+
+
+def bench_fixture(parse, html, min_seconds):
+    """Times `parse` on one page and measures its peak traced memory."""
+    posts = parse(html)  # Warm-up, and the post count we report.
+
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        parse(html)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pages_per_sec = iterations / elapsed
+    return {
+        "posts_per_page": len(posts),
+        "pages_per_sec": round(pages_per_sec, 2),
+        "posts_per_sec": round(pages_per_sec * len(posts), 2),
+        "peak_kib": round(peak / 1024, 1),
+        "page_kib": round(len(html.encode('utf-8')) / 1024, 1),
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["posts_per_page"] != base["posts_per_page"]:
+            regressions.append(f"{name}: extracted {result['posts_per_page']} posts, baseline has {base['posts_per_page']}")
+        if result["pages_per_sec"] < base["pages_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['pages_per_sec']} pages/sec, baseline {base['pages_per_sec']}")
+        if result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: peak {result['peak_kib']} KiB, baseline {base['peak_kib']} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers' HTML parsing on saved pages.")
+    parser.add_argument('--update-baseline', action='store_true', help="Save this run as the new baseline.")
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS, help="Time spent timing each fixture.")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="Allowed relative regression.")
+    args = parser.parse_args()
+
+    print(f"--- Parser benchmark (backend: {PARSER}) ---")
+    results = {}
+    for name, parse in PARSERS.items():
+        path = os.path.join(FIXTURES_DIR, name)
+        if not os.path.exists(path):
+            print(f"[!] Missing fixture '{path}', skipping.")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        results[name] = result = bench_fixture(parse, html, args.min_seconds)
+        print(f"{name:<24} {result['pages_per_sec']:>9.1f} pages/s {result['posts_per_sec']:>10.1f} posts/s "
+              f"{result['peak_kib']:>9.1f} KiB peak ({result['posts_per_page']} posts, {result['page_kib']} KiB page)")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"parser": PARSER, "results": results}, f, indent=4)
+        print(f"✅ Baseline written to '{BASELINE_FILE}'.")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("-> No baseline yet. Run with --update-baseline to create one.")
+        return 0
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("parser") != PARSER:
+        print(f"[!] Baseline was recorded with '{baseline.get('parser')}', this run uses '{PARSER}'.")
+
+    regressions = find_regressions(results, baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print("\n[!] Regressions against the baseline:")
+        for line in regressions:
+            print(f"    - {line}")
+        return 1
+    print("\n✅ No regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark for the JS packer unpacker in tools/bulk_missav.py.
+
+Runs the packed player scripts found in benchmarks/fixtures/missav_video.html
+through the original unpack-and-search code and through JsUnpacker, both cold
+(no memoized results) and warm (the same script seen again), and checks that
+every variant finds the same text and M3U8 links.
+
+    python benchmarks/bench_unpacker.py
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'tools'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+
+from bulk_missav import M3U8_RE, PACKED_SCRIPT_RE, JsUnpacker  # noqa: E402
+
+# --- Configuration ---
+FIXTURE = os.path.join(BENCH_DIR, "fixtures", "missav_video.html")
+MIN_SECONDS = 1.0  # Minimum time spent timing each variant
+SCRIPT_RE = re.compile(r'<script[^>]*>(.*?)</script>', re.S)
+
+
+def legacy_unpack_js_packer(packed_js):
+    """unpack_js_packer() as it was before JsUnpacker, kept as the reference."""
+    try:
+        match = re.search(r"}\('(.+)',(\d+),(\d+),'(.+?)'\.split\('\|'\)", packed_js)
+        if not match:
+            return None
+
+        payload, radix, count, symbols = match.groups()
+        radix = int(radix)
+        count = int(count)
+        symbols = symbols.split('|')
+
+        def int_to_base_n(num, base):
+            if num < 0: return ''
+            if num == 0: return '0'
+            alphabet = "0123456789abcdefghijklmnopqrstuvwxyz"
+            if num < base:
+                return alphabet[num]
+            else:
+                return int_to_base_n(num // base, base) + alphabet[num % base]
+
+        symbol_table = {int_to_base_n(i, radix): sym for i, sym in enumerate(symbols)}
+        return re.sub(r'\b(\w+)\b', lambda m: symbol_table.get(m.group(1), m.group(1)), payload)
+
+    except Exception as e:
+        print(f"    [!] Warning: Failed to unpack a JS block. Error: {e}")
+        return None
+
+
+def legacy_find(script):
+    unpacked = legacy_unpack_js_packer(script)
+    m3u8_pattern = re.compile(r'https?://[^\s"\'`]+\.m3u8[^\s"\'`]*')
+    return unpacked, set(m3u8_pattern.findall(unpacked))
+
+
+def engine_find(unpacker):
+    def find(script):
+        unpacked = unpacker.unpack(script)
+        return unpacked, set(M3U8_RE.findall(unpacked))
+    return find
+
+
+def bench(find, scripts, min_seconds):
+    """Returns scripts per second for `find` over all packed scripts."""
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        for script in scripts:
+            find(script)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return iterations * len(scripts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JS packer unpacker on a saved page.")
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS, help="Time spent timing each variant.")
+    args = parser.parse_args()
+
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        html = f.read()
+    scripts = [s for s in SCRIPT_RE.findall(html) if PACKED_SCRIPT_RE.search(s)]
+    print(f"--- Unpacker benchmark ({len(scripts)} packed scripts, "
+          f"{sum(map(len, scripts)) // 1024} KiB) ---")
+
+    # Cold: a fresh engine per call, so only the precomputed keys and regexes help.
+    cold = JsUnpacker()
+    def cold_find(script):
+        cold._results.clear()
+        return engine_find(cold)(script)
+
+    variants = {
+        "legacy": legacy_find,
+        "engine (cold)": cold_find,
+        "engine (memoized)": engine_find(JsUnpacker()),
+    }
+    expected = [legacy_find(script) for script in scripts]
+    for name, find in variants.items():
+        if [find(script) for script in scripts] != expected:
+            print(f"[!] '{name}' does not match the legacy output.")
+            return 1
+
+    legacy_rate = None
+    for name, find in variants.items():
+        rate = bench(find, scripts, args.min_seconds)
+        legacy_rate = legacy_rate or rate
+        print(f"{name:<18} {rate:>12.1f} scripts/s {rate / legacy_rate:>8.1f}x")
+    print("\n✅ All variants produce the same output.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Re-records the HTML fixtures used by bench_parsers.py from the live sites.
+
+MissAV and hanime pages go through FlareSolverr, like the scrapers do, so a
+FlareSolverr instance must be running on localhost:8191.
+
+    python benchmarks/record_fixtures.py
+"""
+import os
+import sys
+
+import cloudscraper
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+
+import javguru_index  # noqa: E402
+import onejav_index  # noqa: E402
+import playlist_index  # noqa: E402
+from flaresolverr_client import FlareSolverrClient  # noqa: E402
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+HANIME_URL = "https://hanimes.org/tag/hanime/"
+MISSAV_VIDEO_URL = "https://missav.ws/dm90/en/pla-062"  # Any video page with the packed player script
+
+
+def save(name, html):
+    if not html:
+        print(f"[!] Could not fetch '{name}', keeping the old fixture.")
+        return
+    with open(os.path.join(FIXTURES_DIR, name), 'w', encoding='utf-8') as f:
+        f.write(html)
+    print(f"-> Saved '{name}' ({len(html) // 1024} KiB).")
+
+
+if __name__ == '__main__':
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    with FlareSolverrClient(playlist_index.FLARESOLVERR_URL, pool_size=1) as client:
+        save("missav_playlist.html", client.get(playlist_index.START_URL))
+        save("hanime_listing.html", client.get(HANIME_URL))
+        save("missav_video.html", client.get(MISSAV_VIDEO_URL))
+    save("onejav_overview.html", requests.get(onejav_index.BASE_URL, headers=onejav_index.HEADERS, timeout=30).text)
+    save("javguru_listing.html", cloudscraper.create_scraper().get(javguru_index.BASE_URL, timeout=30).text)
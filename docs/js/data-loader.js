@@ -0,0 +1,108 @@
+// Loads the compact data files written by scripts/build_site.py.
+//
+// Each docs/data/<name>.json has a minified, column-encoded sibling
+// <name>.min.json (plus a pre-compressed .min.json.gz). loadSourceData()
+// fetches the smallest variant the browser can read and returns it in the
+// original shape: { last_fetched, source_website, total_videos, posts }.
+// loadCatalogue() reads the merged, one-item-per-code catalogue.min.json.
+// loadManifest() and loadShard() read the pre-paginated views in data/shards.
+(function () {
+    const COMPACT_FORMAT = 'columns-v1';
+    const CATALOGUE_FORMAT = 'catalogue-v1';
+    const SHARDS_FORMAT = 'shards-v2';
+
+    function decodeColumn(column) {
+        if (column.values) return column.values;
+        if (column.dict) return column.index.map(i => column.dict[i]);
+        const { prefixes, suffixes, parts } = column;
+        return parts.map(part => part === null
+            ? null
+            : prefixes[part[0]] + part[1] + (part[2] >= 0 ? suffixes[part[2]] : ''));
+    }
+
+    function decodeCompact(doc) {
+        if (doc.format !== COMPACT_FORMAT) throw new Error(`Unsupported data format: ${doc.format}`);
+        const posts = Array.from({ length: doc.count }, () => ({}));
+        doc.fields.forEach(field => {
+            const column = doc.columns[field];
+            const missing = new Set(column.missing || []);
+            decodeColumn(column).forEach((value, i) => {
+                if (!missing.has(i)) posts[i][field] = value;
+            });
+        });
+        const header = {};
+        Object.keys(doc).forEach(key => {
+            if (!['format', 'count', 'fields', 'columns'].includes(key)) header[key] = doc[key];
+        });
+        return { ...header, posts };
+    }
+
+    // Items come with records: [[source position, index in that source, link], ...].
+    function decodeCatalogue(doc) {
+        if (doc.catalogue !== CATALOGUE_FORMAT) throw new Error(`Unsupported catalogue: ${doc.catalogue}`);
+        const items = decodeCompact(doc.items).posts;
+        const rows = decodeCompact(doc.records).posts;
+        let position = 0;
+        items.forEach(item => {
+            const count = item.records;
+            item.records = rows.slice(position, position + count).map(row => [row.source, row.index, row.link]);
+            position += count;
+        });
+        return { last_fetched: doc.last_fetched, sources: doc.sources, total_videos: doc.total_videos, items };
+    }
+
+    async function fetchJson(url, init) {
+        const res = await fetch(url, init);
+        if (!res.ok) throw new Error(`HTTP ${res.status} for ${url}`);
+        return res.json();
+    }
+
+    async function fetchGzipJson(url, init) {
+        const res = await fetch(url, init);
+        if (!res.ok) throw new Error(`HTTP ${res.status} for ${url}`);
+        const stream = res.body.pipeThrough(new DecompressionStream('gzip'));
+        return new Response(stream).json();
+    }
+
+    // Fetches a build artifact, preferring its pre-compressed .gz sibling.
+    // `query` (e.g. a cache buster) is appended to whichever URL is fetched.
+    async function loadArtifact(url, query = '', init = undefined) {
+        if ('DecompressionStream' in window) {
+            try { return await fetchGzipJson(`${url}.gz${query}`, init); }
+            catch (err) { console.warn(`Falling back from ${url}.gz:`, err); }
+        }
+        return fetchJson(`${url}${query}`, init);
+    }
+
+    // Tries .min.json(.gz), then the original indented .json.
+    async function loadSourceData(name, baseUrl = 'data/') {
+        try { return decodeCompact(await loadArtifact(`${baseUrl}${name}.min.json`)); }
+        catch (err) { console.warn(`Falling back from ${name}.min.json:`, err); }
+        const data = await fetchJson(`${baseUrl}${name}.json`);
+        return Array.isArray(data) ? { total_videos: data.length, posts: data } : data;
+    }
+
+    async function loadCatalogue(baseUrl = 'data/') {
+        return decodeCatalogue(await loadArtifact(`${baseUrl}catalogue.min.json`));
+    }
+
+    // { version, page_size, last_fetched, views: { <view>: { label, total, pages, last_fetched } } }
+    async function loadManifest(baseUrl = 'data/') {
+        // Always revalidated: it is tiny and names the current shard version.
+        const manifest = await loadArtifact(`${baseUrl}shards/manifest.json`, '', { cache: 'no-cache' });
+        if (manifest.format !== SHARDS_FORMAT) throw new Error(`Unsupported shards: ${manifest.format}`);
+        return manifest;
+    }
+
+    // One page (1-based, newest first) of a view, decoded like the catalogue.
+    // The shard files are numbered from the oldest post, so that new posts
+    // only change the newest one: page 1 is the last file.
+    async function loadShard(manifest, view, page, baseUrl = 'data/') {
+        const file = manifest.views[view].pages - page + 1;
+        return decodeCatalogue(await loadArtifact(`${baseUrl}shards/${view}/${file}.min.json`, `?v=${manifest.version}`));
+    }
+
+    window.DataLoader = {
+        decodeCompact, decodeCatalogue, fetchJson, loadArtifact, loadSourceData, loadCatalogue, loadManifest, loadShard,
+    };
+})();
@@ -0,0 +1,158 @@
+// Keeps the viewer's data in IndexedDB and brings it up to date with the
+// deltas written by scripts/build_site.py, so a returning visitor downloads
+// the changes since their last visit instead of every data file.
+//
+// data/deltas/manifest.json names the current version and chains the last
+// builds' deltas ({ from, to, file }). Each delta lists, per exported list
+// ('catalogue', 'javguru', ...), the new header, the new count, the keys
+// that are gone (tombstones) and ops that rebuild the list in the build's
+// order: [0, start, end] copies the old items start..end, [1, n] takes the
+// next n of the delta's rows.
+//
+//   const { lists, restored } = await DataSync.load(['catalogue', 'javguru']);
+//   lists.catalogue // as DataLoader.loadCatalogue() returns it
+//   lists.javguru   // as DataLoader.loadSourceData() returns it
+(function () {
+    const DELTAS_FORMAT = 'deltas-v1';
+    const DB_NAME = 'jav-links';
+    const DB_STORE = 'lists';
+
+    function openDb() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(DB_STORE);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    // Runs one request against the store; resolves to its result.
+    async function withStore(mode, run) {
+        const db = await openDb();
+        try {
+            return await new Promise((resolve, reject) => {
+                const request = run(db.transaction(DB_STORE, mode).objectStore(DB_STORE));
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        } finally {
+            db.close();
+        }
+    }
+
+    // IndexedDB can be missing or refuse (private windows, full disks); the
+    // viewer then simply downloads everything as before.
+    async function readStored(key) {
+        if (!('indexedDB' in window)) return null;
+        try { return (await withStore('readonly', store => store.get(key))) || null; }
+        catch (err) { console.warn('Could not read the stored data:', err); return null; }
+    }
+
+    async function writeStored(key, value) {
+        if (!('indexedDB' in window)) return;
+        try { await withStore('readwrite', store => store.put(value, key)); }
+        catch (err) { console.warn('Could not store the data:', err); }
+    }
+
+    // Mirrors post_key() in scripts/deltas.py.
+    function postKey(post) {
+        if (post.records) return post.code || `link:${post.records[0][2]}`;
+        return post.page_link || post.link || post.url;
+    }
+
+    const itemsField = (list) => (Array.isArray(list.items) ? 'items' : 'posts');
+
+    function applyList(list, change) {
+        const field = itemsField(list);
+        const old = list[field];
+        const rows = change.rows.catalogue
+            ? DataLoader.decodeCatalogue(change.rows).items
+            : DataLoader.decodeCompact(change.rows).posts;
+        const items = [];
+        let next = 0;
+        change.ops.forEach(op => {
+            if (op[0] === 0) {
+                for (let i = op[1]; i < op[2]; i++) items.push(old[i]);
+            } else {
+                items.push(...rows.slice(next, next + op[1]));
+                next += op[1];
+            }
+        });
+        if (items.length !== change.count) throw new Error(`Delta left ${items.length} items, expected ${change.count}`);
+        const gone = new Set(change.removed);
+        if (gone.size && items.some(item => gone.has(postKey(item)))) throw new Error('Delta kept a removed item');
+        const header = { ...change.header };
+        if (field === 'items') delete header.catalogue; // decodeCatalogue() drops it too
+        return { ...header, [field]: items };
+    }
+
+    // The deltas leading from `version` to the manifest's, or null if the
+    // chain no longer reaches back that far.
+    function pathFrom(manifest, version) {
+        const start = manifest.chain.findIndex(link => link.from === version);
+        if (start < 0) return null;
+        const path = manifest.chain.slice(start);
+        return path.every((link, i) => i === 0 || link.from === path[i - 1].to) ? path : null;
+    }
+
+    async function loadFresh(names, baseUrl) {
+        const loaded = await Promise.all(names.map(name =>
+            (name === 'catalogue' ? DataLoader.loadCatalogue(baseUrl) : DataLoader.loadSourceData(name, baseUrl))
+                .catch(err => { console.error(`Error loading ${name}:`, err); return null; })
+        ));
+        const lists = {};
+        names.forEach((name, i) => { lists[name] = loaded[i]; });
+        return lists;
+    }
+
+    // Resolves to { lists, restored }: each requested list (null if it could
+    // not be loaded), and whether they came from the stored copy rather than
+    // the full data files.
+    async function load(names, baseUrl = 'data/') {
+        const key = names.join(',');
+        let manifest = null;
+        try {
+            manifest = await DataLoader.loadArtifact(`${baseUrl}deltas/manifest.json`, '', { cache: 'no-cache' });
+            if (manifest.format !== DELTAS_FORMAT) throw new Error(`Unsupported deltas: ${manifest.format}`);
+        } catch (err) {
+            console.warn('No delta manifest; loading the full data.', err);
+            manifest = null;
+        }
+        const stored = await readStored(key);
+
+        if (manifest && stored) {
+            if (stored.version === manifest.version) return { lists: stored.lists, restored: true };
+            const path = pathFrom(manifest, stored.version);
+            if (path) {
+                try {
+                    let lists = stored.lists;
+                    for (const link of path) {
+                        const delta = await DataLoader.loadArtifact(`${baseUrl}deltas/${link.file}`);
+                        const updated = {};
+                        names.forEach(name => { updated[name] = applyList(lists[name], delta.lists[name]); });
+                        lists = updated;
+                    }
+                    await writeStored(key, { version: manifest.version, lists });
+                    return { lists, restored: true };
+                } catch (err) {
+                    console.warn('Could not apply the deltas; loading the full data.', err);
+                }
+            }
+        }
+
+        const lists = await loadFresh(names, baseUrl);
+        if (!names.every(name => lists[name])) {
+            // Offline (not even the manifest came): the last copy beats nothing.
+            if (stored && !manifest) return { lists: stored.lists, restored: true };
+            return { lists, restored: false };
+        }
+        // Only a complete copy of the manifest's build can take deltas later.
+        const counts = manifest && manifest.lists;
+        if (counts && names.every(name => lists[name][itemsField(lists[name])].length === counts[name])) {
+            await writeStored(key, { version: manifest.version, lists });
+        }
+        return { lists, restored: false };
+    }
+
+    window.DataSync = { load, applyList };
+})();
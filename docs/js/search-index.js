@@ -0,0 +1,143 @@
+// Client for the search indexes written by scripts/build_site.py.
+//
+// The index maps every title token to the documents containing it.
+// Post k of source s, counting from the source's oldest post, is document
+// k * (number of sources) + s, so new posts only add ids at the end; a
+// document id is turned back into (source name, post index) with the
+// per-source counts stored in the index.
+(function () {
+    const SEARCH_FORMAT = 'search-v2';
+    const GRAM = 3; // Same as GRAM in scripts/search_index.py
+    const TOKEN_RE = /[\p{L}\p{N}]+/gu;
+    const JAV_CODE_RE = /([A-Z]{2,5})-?(\d{3,5})/i; // Same as JAV_CODE_RE in scripts/search_index.py
+
+    const tokenize = (text) => (text || '').toLowerCase().match(TOKEN_RE) || [];
+
+    class SearchIndex {
+        constructor(doc) {
+            if (doc.format !== SEARCH_FORMAT) throw new Error(`Unsupported search index: ${doc.format}`);
+            this.tokens = doc.tokens;
+            this.postings = doc.postings; // gap-encoded, decoded on first use
+            this.decoded = new Map();
+            this.grams = null; // trigram -> positions of the tokens containing it, built on first search
+            this.codes = doc.codes;
+            this.sources = doc.sources;
+        }
+
+        static async load(url) {
+            return new SearchIndex(await DataLoader.loadArtifact(url));
+        }
+
+        // Builds the same index in the browser (mirrors build_search_index()
+        // in scripts/search_index.py), for data that was brought up to date
+        // locally and so has no prebuilt index to match it.
+        static build(sources, titleOf, extraOf = null) {
+            const postings = new Map();
+            const codes = [];
+            sources.forEach(([, posts], position) => codes.push([...posts].reverse().map((post, k) => {
+                const docId = k * sources.length + position;
+                const title = titleOf(post);
+                const match = (title || '').match(JAV_CODE_RE);
+                const code = match ? `${match[1].toUpperCase()}-${match[2]}` : '';
+                const tokens = new Set(tokenize(title));
+                (extraOf ? extraOf(post) : []).forEach(value => tokenize(value).forEach(t => tokens.add(t)));
+                if (code) {
+                    const [letters, digits] = code.toLowerCase().split('-');
+                    [letters, digits, letters + digits].forEach(t => tokens.add(t));
+                }
+                tokens.forEach(token => {
+                    if (!postings.has(token)) postings.set(token, []);
+                    postings.get(token).push(docId);
+                });
+                return code;
+            })));
+            const tokens = [...postings.keys()].sort();
+            return new SearchIndex({
+                format: SEARCH_FORMAT,
+                sources: sources.map(([name, posts]) => ({ name, count: posts.length })),
+                codes,
+                tokens,
+                postings: tokens.map(token => postings.get(token).sort((a, b) => a - b)
+                    .map((id, i, ids) => i ? id - ids[i - 1] : id)),
+            });
+        }
+
+        docsForToken(i) {
+            let ids = this.decoded.get(i);
+            if (!ids) {
+                ids = [];
+                let doc = 0;
+                for (const gap of this.postings[i]) { doc += gap; ids.push(doc); }
+                this.decoded.set(i, ids);
+            }
+            return ids;
+        }
+
+        // Mirrors token_trigrams() in scripts/search_index.py.
+        trigrams() {
+            if (!this.grams) {
+                this.grams = new Map();
+                this.tokens.forEach((token, i) => {
+                    for (let k = 0; k + GRAM <= token.length; k++) {
+                        const gram = token.slice(k, k + GRAM);
+                        let positions = this.grams.get(gram);
+                        if (!positions) this.grams.set(gram, positions = []);
+                        if (positions[positions.length - 1] !== i) positions.push(i);
+                    }
+                });
+            }
+            return this.grams;
+        }
+
+        // The positions of the tokens containing `term`: only the tokens
+        // sharing its rarest trigram are checked, and a term shorter than a
+        // trigram is looked for in the whole vocabulary.
+        matchingTokens(term) {
+            if (term.length < GRAM) {
+                const positions = [];
+                this.tokens.forEach((token, i) => { if (token.includes(term)) positions.push(i); });
+                return positions;
+            }
+            const grams = this.trigrams();
+            let candidates = null;
+            for (let k = 0; k + GRAM <= term.length; k++) {
+                const positions = grams.get(term.slice(k, k + GRAM)) || [];
+                if (candidates === null || positions.length < candidates.length) candidates = positions;
+            }
+            return candidates.filter(i => this.tokens[i].includes(term));
+        }
+
+        // Returns the ids of documents that have, for every query token, a
+        // token containing it, in post order (source after source, newest
+        // first); or null when the query has no tokens at all.
+        // Only the vocabulary is looked up, never the posts.
+        search(query) {
+            const terms = tokenize(query);
+            if (terms.length === 0) return null;
+            let result = null;
+            for (const term of terms) {
+                const matches = new Set();
+                this.matchingTokens(term).forEach(i => this.docsForToken(i).forEach(id => matches.add(id)));
+                result = result === null ? matches : new Set([...result].filter(id => matches.has(id)));
+                if (result.size === 0) break;
+            }
+            const count = this.sources.length;
+            return [...result].sort((a, b) => (a % count) - (b % count) || b - a);
+        }
+
+        // Maps a document id back to its source file name and post index.
+        locate(docId) {
+            const source = this.sources[docId % this.sources.length];
+            const index = source.count - 1 - Math.floor(docId / this.sources.length);
+            return index >= 0 ? { name: source.name, index } : null;
+        }
+
+        // True if the index was built from the same post counts we loaded.
+        matches(countsByName) {
+            return this.sources.every(({ name, count }) => countsByName[name] === count);
+        }
+    }
+
+    SearchIndex.tokenize = tokenize;
+    window.SearchIndex = SearchIndex;
+})();
@@ -0,0 +1,160 @@
+// Virtualized, infinite-scroll grid for the viewer pages.
+//
+// The container keeps its CSS grid layout, but only the rows near the
+// viewport are in the DOM: the rows above and below are stood in for by the
+// container's top and bottom padding, sized from measured row heights.
+// Cards are built once from createCard() and reused for whichever posts
+// scroll into view (updateCard() fills them in), and images marked with
+// data-lazy-src are loaded by one IntersectionObserver as they come close.
+//
+//   const grid = new VirtualGrid(container, { createCard, updateCard, onNearEnd });
+//   grid.setItems(posts);   // replace the list
+//   grid.append(morePosts); // e.g. the next shard
+(function () {
+    const BLANK_IMAGE = 'data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw==';
+
+    class VirtualGrid {
+        constructor(container, {
+            createCard, updateCard, onNearEnd = null,
+            overscanRows = 2, nearEndRows = 3, estimatedRowHeight = 400, lazyMargin = '300px',
+        }) {
+            this.container = container;
+            this.createCard = createCard;
+            this.updateCard = updateCard;
+            this.onNearEnd = onNearEnd;
+            this.overscanRows = overscanRows;
+            this.nearEndRows = nearEndRows;
+            this.estimatedRowHeight = estimatedRowHeight;
+            this.items = [];
+            this.rendered = new Map(); // item index -> card node in the DOM
+            this.pool = []; // detached cards waiting for reuse
+            this.rowHeights = []; // measured height of each row, gap included
+            this.columns = 1;
+            this.frame = null;
+
+            this.lazy = 'IntersectionObserver' in window
+                ? new IntersectionObserver(entries => entries.forEach(entry => {
+                    if (entry.isIntersecting) this.loadMedia(entry.target);
+                }), { rootMargin: lazyMargin })
+                : null;
+
+            const schedule = () => this.schedule();
+            window.addEventListener('scroll', schedule, { passive: true });
+            window.addEventListener('resize', () => { this.rowHeights = []; this.schedule(); });
+        }
+
+        setItems(items) {
+            this.items = items.slice();
+            this.rowHeights = [];
+            this.rendered.forEach(node => this.release(node));
+            this.rendered.clear();
+            this.update();
+        }
+
+        append(items) {
+            this.items.push(...items);
+            this.update();
+        }
+
+        get length() {
+            return this.items.length;
+        }
+
+        // Sets an image to load once it comes close to the viewport.
+        static lazyImage(img, src, srcset = '') {
+            img.removeAttribute('srcset');
+            img.src = BLANK_IMAGE;
+            img.dataset.lazySrc = src;
+            if (srcset) img.dataset.lazySrcset = srcset;
+            else delete img.dataset.lazySrcset;
+        }
+
+        loadMedia(img) {
+            if (this.lazy) this.lazy.unobserve(img);
+            if (!img.dataset.lazySrc) return;
+            if (img.dataset.lazySrcset) img.srcset = img.dataset.lazySrcset;
+            img.src = img.dataset.lazySrc;
+            delete img.dataset.lazySrc;
+            delete img.dataset.lazySrcset;
+        }
+
+        schedule() {
+            if (this.frame === null) {
+                this.frame = requestAnimationFrame(() => { this.frame = null; this.update(); });
+            }
+        }
+
+        release(node) {
+            node.querySelectorAll('[data-lazy-src]').forEach(img => this.lazy && this.lazy.unobserve(img));
+            node.remove();
+            this.pool.push(node);
+        }
+
+        countColumns() {
+            const template = getComputedStyle(this.container).gridTemplateColumns;
+            return Math.max(1, template && template !== 'none' ? template.split(' ').length : 1);
+        }
+
+        rowHeight(row) {
+            return this.rowHeights[row] || this.averageRowHeight();
+        }
+
+        averageRowHeight() {
+            const measured = this.rowHeights.filter(Boolean);
+            return measured.length ? measured.reduce((a, b) => a + b, 0) / measured.length : this.estimatedRowHeight;
+        }
+
+        update() {
+            const columns = this.countColumns();
+            if (columns !== this.columns) { this.columns = columns; this.rowHeights = []; }
+            const totalRows = Math.ceil(this.items.length / columns);
+
+            // The part of the viewport that overlaps the list, in list coordinates.
+            const listTop = this.container.getBoundingClientRect().top + window.scrollY;
+            const viewTop = window.scrollY - listTop;
+            const viewBottom = viewTop + window.innerHeight;
+
+            let row = 0, offset = 0;
+            while (row < totalRows && offset + this.rowHeight(row) < viewTop) offset += this.rowHeight(row++);
+            const firstRow = Math.max(0, row - this.overscanRows);
+            while (row < totalRows && offset < viewBottom) offset += this.rowHeight(row++);
+            const endRow = Math.min(totalRows, row + this.overscanRows);
+
+            const start = firstRow * columns;
+            const end = Math.min(this.items.length, endRow * columns);
+            this.rendered.forEach((node, index) => {
+                if (index < start || index >= end) { this.release(node); this.rendered.delete(index); }
+            });
+            let cursor = this.container.firstChild;
+            for (let index = start; index < end; index++) {
+                let node = this.rendered.get(index);
+                if (!node) {
+                    node = this.pool.pop() || this.createCard();
+                    this.updateCard(node, this.items[index], index);
+                    this.rendered.set(index, node);
+                    if (this.lazy) node.querySelectorAll('[data-lazy-src]').forEach(img => this.lazy.observe(img));
+                    else node.querySelectorAll('[data-lazy-src]').forEach(img => this.loadMedia(img));
+                }
+                if (node === cursor) cursor = cursor.nextSibling;
+                else this.container.insertBefore(node, cursor);
+            }
+
+            // Measure the rendered rows, then stand in for the others with padding.
+            const gap = parseFloat(getComputedStyle(this.container).rowGap) || 0;
+            for (let r = firstRow; r < endRow; r++) {
+                const first = this.rendered.get(r * columns);
+                const next = this.rendered.get((r + 1) * columns);
+                if (first) this.rowHeights[r] = next ? next.offsetTop - first.offsetTop : first.offsetHeight + gap;
+            }
+            let above = 0, below = 0;
+            for (let r = 0; r < firstRow; r++) above += this.rowHeight(r);
+            for (let r = endRow; r < totalRows; r++) below += this.rowHeight(r);
+            this.container.style.paddingTop = `${above}px`;
+            this.container.style.paddingBottom = `${below}px`;
+
+            if (this.onNearEnd && endRow >= totalRows - this.nearEndRows) this.onNearEnd();
+        }
+    }
+
+    window.VirtualGrid = VirtualGrid;
+})();
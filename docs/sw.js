@@ -0,0 +1,119 @@
+// Service worker for the viewer pages. Generated by scripts/service_worker.py
+// from scripts/sw_template.js; edit the template, not docs/sw.js.
+//
+// - The app shell (pages, js/, CDN styles and scripts) is precached per
+//   build: a new VERSION installs a fresh copy and drops the old one.
+// - The shard and delta manifests and the shards are served
+//   stale-while-revalidate: instantly from the cache, refreshed behind.
+// - Delta files never change once written, so they are served cache-first.
+// - Cover thumbnails are cached as they load, keeping the most recently
+//   used THUMB_CACHE_ENTRIES.
+const VERSION = "cd9f5a0123a8";
+const PRECACHE = ["./", "index.html", "js/data-loader.js", "js/search-index.js", "js/data-sync.js", "js/virtual-grid.js", "hanime.html"]; // Same-origin, relative to this file
+const CDN_ASSETS = ["https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.1/css/all.min.css", "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;700&display=swap", "https://cdn.tailwindcss.com", "https://fonts.googleapis.com/css2?family=Inter:wght@400;600&display=swap", "https://cdn.plyr.io/3.7.8/plyr.css", "https://cdn.plyr.io/3.7.8/plyr.polyfilled.js"];
+const THUMB_CACHE_ENTRIES = 600;
+const DATA_CACHE_ENTRIES = 200;
+
+const SHELL_CACHE = `shell-${VERSION}`;
+const DATA_CACHE = 'data-v1';
+const THUMB_CACHE = 'thumbs-v1';
+const CACHES = [SHELL_CACHE, DATA_CACHE, THUMB_CACHE];
+const CDN_HOSTS = new Set([...CDN_ASSETS.map(url => new URL(url).host), 'fonts.gstatic.com']);
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.addAll(PRECACHE);
+        // A CDN that is down must not keep the worker from installing; the
+        // page then loads that asset from the network as before.
+        await Promise.allSettled(CDN_ASSETS.map(async url => {
+            let response = await fetch(url, { mode: 'cors' }).catch(() => null);
+            if (!response || !response.ok) response = await fetch(url, { mode: 'no-cors' });
+            await cache.put(url, response);
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => !CACHES.includes(name)).map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+// Drops the least recently used entries past `limit`. Cache keys keep
+// insertion order and a put() re-inserts, so touched entries move to the end.
+async function trim(cache, limit) {
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - limit)).map(key => cache.delete(key)));
+}
+
+async function cacheFirst(request, cacheName, limit = 0) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    // An opaque (no-cors) copy cannot answer a CORS request.
+    if (cached && !(cached.type === 'opaque' && request.mode === 'cors')) {
+        if (limit) cache.put(request, cached.clone());
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') {
+        await cache.put(request, response.clone());
+        if (limit) trim(cache, limit);
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(event, cacheName, limit) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const refresh = fetch(event.request).then(async response => {
+        if (response.ok) {
+            await cache.put(event.request, response.clone());
+            await trim(cache, limit);
+        }
+        return response;
+    });
+    if (!cached) return refresh;
+    event.waitUntil(refresh.catch(() => {})); // Offline: the cached copy stands
+    return cached;
+}
+
+async function shell(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(request, { ignoreSearch: true });
+    if (cached) return cached;
+    try {
+        return await fetch(request);
+    } catch (err) {
+        // Offline navigation to a URL we do not know (e.g. the bare folder).
+        if (request.mode === 'navigate') return (await cache.match('index.html')) || Response.error();
+        throw err;
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const { request } = event;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    const scope = new URL(self.registration.scope);
+
+    if (url.origin !== scope.origin) {
+        if (CDN_HOSTS.has(url.host)) event.respondWith(cacheFirst(request, SHELL_CACHE));
+        return;
+    }
+    if (!url.pathname.startsWith(scope.pathname)) return;
+    const path = url.pathname.slice(scope.pathname.length);
+
+    if (path.startsWith('data/shards/') || /^data\/deltas\/manifest\.json/.test(path)) {
+        event.respondWith(staleWhileRevalidate(event, DATA_CACHE, DATA_CACHE_ENTRIES));
+    } else if (path.startsWith('data/deltas/')) {
+        event.respondWith(cacheFirst(request, DATA_CACHE, DATA_CACHE_ENTRIES));
+    } else if (path.startsWith('thumbs/')) {
+        event.respondWith(cacheFirst(request, THUMB_CACHE, THUMB_CACHE_ENTRIES));
+    } else if (request.mode === 'navigate' || PRECACHE.includes(path)) {
+        event.respondWith(shell(request));
+    }
+});
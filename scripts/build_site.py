@@ -0,0 +1,248 @@
+import glob
+import json
+import os
+import re
+import zlib
+from catalogue import build_catalogue, decode_catalogue, encode_catalogue
+from compact_format import decode_posts, encode_posts
+from deltas import build_delta, build_manifest as build_delta_manifest, version_of
+from link_checker import load_dead_links, mark_dead_links
+from search_index import build_search_index
+from service_worker import build_service_worker
+from shards import PAGE_SIZE, build_manifest, build_views, paginate
+from thumbnails import attach_thumbnails, load_thumbnails
+
+# --- Configuration ---
+DATA_DIR = "docs/data"
+SOURCES = ["javguru", "onejav", "playlist", "hanime"]  # docs/data/<name>.json files to export
+VIEWER_SOURCES = ["javguru", "onejav", "playlist"]  # Loaded by index.html, in this order
+SHARDS_DIR = os.path.join(DATA_DIR, "shards")  # manifest.json plus <view>/<n>.min.json, n = 1 for the oldest
+DELTAS_DIR = os.path.join(DATA_DIR, "deltas")  # manifest.json plus <version>.min.json per build
+DEAD_LINK_POLICY = "flag"  # "flag" lists dead media in post["dead_links"]; "drop" also blanks the URLs
+GZIP_RESET_TOKENS = 256  # The .gz compressor restarts every ~256 JSON tokens, at points set by the content
+
+def load_source(name):
+    """
+    Loads an exported docs/data/<name>.json file.
+
+    Returns the header fields and the posts; hanime.json is a bare list, so
+    its header is empty.
+    """
+    path = os.path.join(DATA_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None, []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        print(f"[!] Error reading '{path}'. Skipping it.")
+        return None, []
+    if isinstance(data, dict):
+        header = {k: v for k, v in data.items() if k not in ('posts', 'total_videos')}
+        return header, data.get('posts', [])
+    return {}, data
+
+def gzip_stable(raw, reset_tokens=GZIP_RESET_TOKENS):
+    """
+    gzip-compresses `raw` so a small edit only changes the compressed bytes
+    near it, the way `gzip --rsyncable` does: the compressor starts afresh
+    after every comma-separated token whose checksum is a multiple of
+    `reset_tokens`. The restart points follow the content, so they line up
+    again right after an insertion, and git stores the next build's .gz as a
+    small delta instead of a whole new file. It costs a few percent of the
+    compressed size. There is no timestamp in the header, so the same data
+    always gives the same bytes.
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    chunks = []
+    start = end = 0
+    for token in raw.split(b','):
+        end += len(token) + 1
+        if zlib.crc32(token) % reset_tokens == 0:
+            chunks.append(compressor.compress(raw[start:end]))
+            chunks.append(compressor.flush(zlib.Z_FULL_FLUSH))
+            start = end
+    chunks.append(compressor.compress(raw[start:]))
+    chunks.append(compressor.flush())
+    return b''.join(chunks)
+
+def write_artifact(path, document):
+    """
+    Writes minified JSON plus a gzip sibling, which the viewer fetches and
+    inflates itself.
+
+    Returns:
+        dict: Byte sizes of each written file.
+    """
+    raw = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sizes = {'json': len(raw)}
+    with open(path, 'wb') as f:
+        f.write(raw)
+    packed = gzip_stable(raw)
+    with open(f"{path}.gz", 'wb') as f:
+        f.write(packed)
+    sizes['gz'] = len(packed)
+    # Earlier builds also wrote brotli copies that nothing ever loaded.
+    if os.path.exists(f"{path}.br"):
+        os.remove(f"{path}.br")
+    return sizes
+
+def build_compact_sources(loaded):
+    """Writes docs/data/<name>.min.json (+ .gz) for every source."""
+    for name, (header, posts) in loaded.items():
+        path = os.path.join(DATA_DIR, f"{name}.min.json")
+        sizes = write_artifact(path, encode_posts(posts, {**header, "total_videos": len(posts)}))
+        original = os.path.getsize(os.path.join(DATA_DIR, f"{name}.json"))
+        print(f"-> {path}: {original // 1024} KiB -> " + ", ".join(f"{k} {v // 1024} KiB" for k, v in sizes.items()))
+
+def build_merged_catalogue(loaded):
+    """
+    Writes docs/data/catalogue.min.json (+ .gz): index.html's sources
+    merged into one item per JAV code, newest first, for the 'All Sources' view.
+
+    Returns:
+        tuple: The catalogue header, its items and the (name, header, posts)
+        sources it was built from.
+    """
+    sources = [(name, *loaded[name]) for name in VIEWER_SOURCES if name in loaded]
+    header, items = build_catalogue(sources)
+    sizes = write_artifact(os.path.join(DATA_DIR, "catalogue.min.json"), encode_catalogue(header, items))
+    merged = sum(1 for item in items if len(item["records"]) > 1)
+    total = sum(len(posts) for _, _, posts in sources)
+    print(f"-> catalogue.min.json: {total} posts -> {len(items)} items ({merged} found on several sources), "
+          f"{sizes['gz'] // 1024} KiB gzipped")
+    return header, items, sources
+
+def build_shards(header, items, sources):
+    """
+    Writes docs/data/shards: every view of index.html ('all' and one per
+    source) pre-sorted and cut into PAGE_SIZE-post shards, plus manifest.json
+    with the totals, so the first render needs the manifest and one shard.
+    Shards are numbered from the oldest post, so a run rewrites only the
+    newest shard or two of each view its new posts land in.
+    """
+    views = build_views(header, items, sources)
+    pages = {key: list(paginate(view_header, view_items)) for key, (_, view_header, view_items) in views.items()}
+    written = 0
+    for key, documents in pages.items():
+        view_dir = os.path.join(SHARDS_DIR, key)
+        os.makedirs(view_dir, exist_ok=True)
+        for number, document in enumerate(documents, start=1):
+            written += write_artifact(os.path.join(view_dir, f"{number}.min.json"), document)['gz']
+        # Drop the pages a shrinking view no longer has.
+        for path in glob.glob(os.path.join(view_dir, "*.min.json*")):
+            match = re.match(r'(\d+)\.min\.json', os.path.basename(path))
+            if match and int(match.group(1)) > len(documents):
+                os.remove(path)
+    write_artifact(os.path.join(SHARDS_DIR, "manifest.json"), build_manifest(views, pages))
+    shard_count = sum(len(documents) for documents in pages.values())
+    print(f"-> shards: {len(views)} views, {shard_count} shards of {PAGE_SIZE} posts, "
+          f"{written // 1024} KiB gzipped ({written / max(shard_count, 1) / 1024:.1f} KiB each)")
+
+def load_previous_lists():
+    """
+    Reads what the last build exported (the .min.json files this build is
+    about to replace), as list name -> (header, items) for build_deltas().
+    """
+    previous = {}
+    for name in ["catalogue", *SOURCES]:
+        path = os.path.join(DATA_DIR, f"{name}.min.json")
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            if name == "catalogue":
+                header, items = decode_catalogue(document)
+                previous[name] = ({**header, "total_videos": len(items)}, items)
+            else:
+                previous[name] = decode_posts(document)
+        except (json.JSONDecodeError, KeyError, IndexError):
+            print(f"[!] Could not read the previous '{path}'. Leaving it out of the delta.")
+    return previous
+
+def build_deltas(previous, current):
+    """
+    Writes docs/data/deltas: what changed in each exported list since the
+    last build, plus manifest.json chaining the last MAX_DELTAS of them, so a
+    returning viewer that kept its copy downloads only the changes.
+    """
+    os.makedirs(DELTAS_DIR, exist_ok=True)
+    manifest_path = os.path.join(DELTAS_DIR, "manifest.json")
+    last_manifest = None
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                last_manifest = json.load(f)
+        except json.JSONDecodeError:
+            print(f"[!] Error reading '{manifest_path}'. Starting a new chain.")
+
+    delta = None
+    if previous and version_of(previous) != version_of(current):
+        delta = build_delta(previous, current)
+        sizes = write_artifact(os.path.join(DELTAS_DIR, f"{delta['to']}.min.json"), delta)
+        changed = sum(op[1] for d in delta["lists"].values() for op in d["ops"] if op[0] == 1)
+        removed = sum(len(d["removed"]) for d in delta["lists"].values())
+        print(f"-> delta {delta['from']} -> {delta['to']}: {changed} new or changed, {removed} removed, "
+              f"{sizes['gz'] / 1024:.1f} KiB gzipped")
+    manifest = build_delta_manifest(last_manifest, delta, current)
+    write_artifact(manifest_path, manifest)
+
+    # Deltas that fell off the chain can no longer be reached.
+    kept = {link["file"] for link in manifest["chain"]}
+    for path in glob.glob(os.path.join(DELTAS_DIR, "*.min.json*")):
+        if os.path.basename(path).split('.min.json')[0] + '.min.json' not in kept:
+            os.remove(path)
+    print(f"-> deltas: version {manifest['version']}, {len(manifest['chain'])} deltas in the chain")
+
+def build_search_indexes(loaded):
+    """
+    Writes the prebuilt search indexes: search-index.json for index.html's
+    sources and hanime-search-index.json (which also indexes genres).
+    """
+    viewer_sources = [(name, loaded[name][1]) for name in VIEWER_SOURCES if name in loaded]
+    index = build_search_index(viewer_sources, lambda post: post.get('title') or post.get('text'))
+    sizes = write_artifact(os.path.join(DATA_DIR, "search-index.json"), index)
+    print(f"-> search-index.json: {len(index['tokens'])} tokens, {sizes['gz'] // 1024} KiB gzipped")
+
+    if "hanime" in loaded:
+        index = build_search_index([("hanime", loaded["hanime"][1])],
+                                   lambda post: post.get('title'), lambda post: post.get('genres') or [])
+        sizes = write_artifact(os.path.join(DATA_DIR, "hanime-search-index.json"), index)
+        print(f"-> hanime-search-index.json: {len(index['tokens'])} tokens, {sizes['gz'] // 1024} KiB gzipped")
+
+def main():
+    """Builds every site artifact from the exported docs/data files."""
+    print("--- Building site data artifacts ---")
+    loaded = {}
+    for name in SOURCES:
+        header, posts = load_source(name)
+        if header is None:
+            print(f"[!] '{name}' has no data yet. Skipping it.")
+            continue
+        loaded[name] = (header, posts)
+    dead = load_dead_links()
+    for name, (_, posts) in loaded.items():
+        marked = mark_dead_links(name, posts, dead, DEAD_LINK_POLICY)
+        if marked:
+            print(f"-> '{name}': {marked} posts have dead media ({DEAD_LINK_POLICY}).")
+    thumbnails = load_thumbnails()
+    for name, (_, posts) in loaded.items():
+        attached = attach_thumbnails(name, posts, thumbnails)
+        if attached:
+            print(f"-> '{name}': {attached} of {len(posts)} posts have thumbnails.")
+    previous = load_previous_lists()
+    build_compact_sources(loaded)
+    header, items, sources = build_merged_catalogue(loaded)
+    build_shards(header, items, sources)
+    build_search_indexes(loaded)
+    current = {name: ({**source_header, "total_videos": len(posts)}, posts)
+               for name, (source_header, posts) in loaded.items()}
+    current["catalogue"] = ({**header, "total_videos": len(items)}, items)
+    build_deltas(previous, current)
+    version, local, remote = build_service_worker()
+    print(f"-> sw.js: version {version}, precaching {local} local and {remote} CDN assets")
+    print("✅ Site data artifacts are up-to-date.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+from compact_format import decode_posts, encode_posts
+from search_index import JAV_CODE_RE
+
+# --- Configuration ---
+FORMAT = "catalogue-v1"
+
+
+def normalize_code(title):
+    """
+    Returns the canonical JAV code of a title, or '' if it has none.
+
+    'PLA-062 ...', '[PLA-062] ...' and 'PLA062 (2.1 GB)' all become 'PLA-062';
+    digits are re-padded to three places so 'ABC-00123' and 'ABC-123' match.
+    """
+    match = JAV_CODE_RE.search(title or '')
+    if not match:
+        return ''
+    return f"{match.group(1).upper()}-{int(match.group(2)):03d}"
+
+
+def standardize_post(post, source_website):
+    """The common post shape the viewer renders (mirrors standardizePost() in docs/index.html)."""
+    dead = post.get('dead_links') or []
+    standard = {
+        "title": post.get('title') or post.get('text'),
+        "page_link": post.get('page_link') or post.get('link'),
+        "cover_image_url": None if 'cover_image_url' in dead else (post.get('cover_image_url') or post.get('image_source')),
+        "preview_video_url": None if 'preview_video_url' in dead else post.get('preview_video_url'),
+        "source_website": source_website,
+        "post_fetched_date": post.get('post_fetched_date') or '',
+    }
+    if post.get('thumbnail'):
+        standard["thumbnail"] = post['thumbnail']
+    return standard
+
+
+def build_code_index(sources):
+    """
+    Maps each normalized code to the posts that carry it.
+
+    Args:
+        sources (list[tuple[str, dict, list[dict]]]): (name, header, posts) per source.
+
+    Returns:
+        dict: code -> list of (source position, post index). Posts without a
+        code are keyed by their link instead, so they stay separate items.
+    """
+    index = {}
+    for position, (_, header, posts) in enumerate(sources):
+        source_website = header.get('source_website', 'Unknown')
+        for i, post in enumerate(posts):
+            standard = standardize_post(post, source_website)
+            key = normalize_code(standard["title"]) or f"link:{standard['page_link']}"
+            index.setdefault(key, []).append((position, i))
+    return index
+
+
+def build_catalogue(sources):
+    """
+    Merges the posts of several sources into one item per JAV code.
+
+    Each item keeps the newest fetch date of its posts, takes its title and
+    media from the newest post that has them, and lists every post under
+    'records' as [source position, index in that source's file, page link].
+    Items are sorted newest first, so the viewer needs no merge or sort.
+
+    Returns:
+        tuple[dict, list[dict]]: The header (source names, labels and counts)
+        and the items.
+    """
+    standardized = [
+        [standardize_post(post, header.get('source_website', 'Unknown')) for post in posts]
+        for _, header, posts in sources
+    ]
+    items = []
+    for key, members in build_code_index(sources).items():
+        # Newest post first; ties keep source order.
+        members = sorted(members, key=lambda m: standardized[m[0]][m[1]]["post_fetched_date"], reverse=True)
+        posts = [standardized[s][i] for s, i in members]
+        records, seen = [], set()
+        for (s, i), post in zip(members, posts):
+            if post["page_link"] not in seen:
+                seen.add(post["page_link"])
+                records.append([s, i, post["page_link"]])
+        cover = next((p for p in posts if p["cover_image_url"]), {})
+        item = {
+            "code": '' if key.startswith('link:') else key,
+            "title": next((p["title"] for p in posts if p["title"]), ''),
+            "cover_image_url": cover.get("cover_image_url"),
+            "preview_video_url": next((p["preview_video_url"] for p in posts if p["preview_video_url"]), None),
+            "post_fetched_date": posts[0]["post_fetched_date"],
+            "records": records,
+        }
+        if cover.get("thumbnail"):
+            item["thumbnail"] = cover["thumbnail"]
+        items.append(item)
+    items.sort(key=lambda item: item["post_fetched_date"], reverse=True)
+
+    fetched = [header.get('last_fetched') for _, header, _ in sources if header.get('last_fetched')]
+    header = {
+        "catalogue": FORMAT,
+        "last_fetched": max(fetched) if fetched else None,
+        "sources": [
+            {"name": name, "source_website": header.get('source_website', 'Unknown'), "count": len(posts)}
+            for name, header, posts in sources
+        ],
+    }
+    return header, items
+
+
+def encode_catalogue(header, items):
+    """
+    Encodes the catalogue as two column-encoded tables: the items, with the
+    number of records each one has, and all records flattened in item order
+    into (source, index, link) rows, so the links get the same URL
+    compression as any other URL column.
+    """
+    rows = [{"source": s, "index": i, "link": link} for item in items for s, i, link in item["records"]]
+    return {
+        **header,
+        "total_videos": len(items),
+        "items": encode_posts([{**item, "records": len(item["records"])} for item in items]),
+        "records": encode_posts(rows),
+    }
+
+
+def decode_catalogue(document):
+    """Inverse of encode_catalogue(). Returns the header and the items."""
+    _, items = decode_posts(document["items"])
+    _, rows = decode_posts(document["records"])
+    position = 0
+    for item in items:
+        count = item["records"]
+        item["records"] = [[row["source"], row["index"], row["link"]] for row in rows[position:position + count]]
+        position += count
+    header = {k: v for k, v in document.items() if k not in ("items", "records", "total_videos")}
+    return header, items
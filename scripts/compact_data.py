@@ -0,0 +1,235 @@
+"""
+Keeps the committed data small: rewrites the store logs and the exported
+JSON files in their canonical form, and packs the data history into periodic
+snapshot archives so the git history itself can be squashed.
+
+    python scripts/compact_data.py                       # canonical logs and exports
+    python scripts/compact_data.py --snapshots           # also archive each finished month
+    python scripts/compact_data.py --squash-branch slim  # also write a one-commit branch
+
+Canonical means one line per post in the logs (its newest record, in the
+order posts were first seen), sorted keys everywhere, and the exports in the
+order the scrapers wrote them. A run then only changes the lines of posts
+that are new or changed; run_all.py compacts before every site build.
+
+The files build_site.py derives from them (.min.json and .gz copies,
+catalogue, shards, search indexes, deltas) stay in the tracked tree, since
+GitHub Pages serves docs/ as committed, and are byte-stable instead: the
+same data always builds the same bytes, so a build without new posts
+changes nothing. New posts only rewrite the newest shards of each view, add
+ids at the end of the search index and add one delta. The whole-list files
+do change, but their .gz copies are written so git stores them as small
+deltas (see gzip_stable() in build_site.py). Nothing here needs to touch
+them.
+
+A snapshot archive, data/snapshots/<YYYY-MM>.tar.gz, holds the logs and
+exported JSON files as of the last data commit of that month, plus a
+snapshot.json naming the commit. The derived files (.min.json, .gz, shards,
+deltas, indexes) are left out; build_site.py remakes them. Once every
+finished month is archived, --squash-branch writes a branch whose single
+commit holds the last commit's files plus the archives. Nothing else is
+touched: to replace the published history, push that branch over the main
+one yourself.
+"""
+import argparse
+import fnmatch
+import glob
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+from datetime import datetime, UTC
+
+from post_store import STORE_DIR, PostStore, write_export
+
+# --- Configuration ---
+DATA_DIR = "docs/data"
+EXPORTS = ["javguru", "onejav", "playlist", "hanime"]  # docs/data/<name>.json files to rewrite
+STORE_KEYS = {
+    # data/store/<name>.ndjson -> the field that identifies its records
+    "javguru": "link",
+    "onejav": "link",
+    "playlist": "page_link",
+    "hanime": "url",
+    "links": "url",
+    "thumbs": "url",
+}
+SNAPSHOT_DIR = "data/snapshots"
+SNAPSHOT_PERIOD = "%Y-%m"  # One archive per month; "%Y" would make it one per year
+SNAPSHOT_PATTERNS = ["docs/data/*.json", "data/store/*.ndjson"]  # The data worth archiving
+DERIVED_PATTERNS = ["docs/data/*.min.json", "docs/data/*search-index.json"]  # Rebuilt by build_site.py, so not archived
+
+
+def compact_stores(store_dir=STORE_DIR):
+    """Rewrites every known log in data/store with one canonical line per record."""
+    for path in sorted(glob.glob(os.path.join(store_dir, "*.ndjson"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name not in STORE_KEYS:
+            print(f"[!] No key configured for '{path}'. Leaving it as it is.")
+            continue
+        removed = PostStore(name, STORE_KEYS[name], store_dir=store_dir).compact()
+        if removed is not None:
+            print(f"-> Compacted '{path}': {removed} superseded or malformed lines removed.")
+
+
+def compact_exports(data_dir=DATA_DIR, names=EXPORTS):
+    """Rewrites the exported JSON files canonically, keeping their order and headers."""
+    for name in names:
+        path = os.path.join(data_dir, f"{name}.json")
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"[!] Error reading '{path}'. Leaving it as it is.")
+            continue
+        if isinstance(data, dict):
+            header = {k: v for k, v in data.items() if k not in ('posts', 'total_videos')}
+            changed = write_export(path, data.get('posts', []), header)
+        else:
+            changed = write_export(path, data)
+        if changed:
+            print(f"-> Rewrote '{path}' in the canonical layout.")
+
+
+def git(*args, env=None):
+    """Runs a git command and returns its stdout as bytes."""
+    return subprocess.run(["git", *args], check=True, capture_output=True, env=env).stdout
+
+
+def _matches(path, patterns):
+    # fnmatch's '*' also matches '/', so compare the folder exactly.
+    folder, name = os.path.split(path)
+    return any(folder == os.path.dirname(pattern) and fnmatch.fnmatch(name, os.path.basename(pattern))
+               for pattern in patterns)
+
+
+def is_snapshot_path(path):
+    return _matches(path, SNAPSHOT_PATTERNS) and not _matches(path, DERIVED_PATTERNS)
+
+
+def data_commits_by_period(period=SNAPSHOT_PERIOD):
+    """
+    Maps each period to the newest commit in it that touched the archived
+    data, for every period before the current one.
+
+    Returns:
+        dict[str, tuple[str, datetime]]: period -> (commit hash, commit time), oldest first.
+    """
+    roots = sorted({os.path.dirname(pattern) for pattern in SNAPSHOT_PATTERNS})
+    log = git("log", "--format=%H %cI", "--", *roots).decode('utf-8')
+    current = datetime.now(UTC).strftime(period)
+    latest = {}
+    # git log lists the newest commit first, so the first one seen per period wins.
+    for line in log.splitlines():
+        commit, stamp = line.split(' ', 1)
+        when = datetime.fromisoformat(stamp).astimezone(UTC)
+        key = when.strftime(period)
+        if key != current:
+            latest.setdefault(key, (commit, when))
+    return dict(sorted(latest.items()))
+
+
+def write_snapshot(path, period, commit, when):
+    """
+    Writes the archived data of `commit` to `path` as a .tar.gz, members
+    sorted by path. The archive only depends on the commit, so rewriting it
+    yields the same bytes.
+
+    Returns:
+        int: The number of data files archived.
+    """
+    files = sorted(name for name in git("ls-tree", "-r", "--name-only", commit).decode('utf-8').splitlines()
+                   if is_snapshot_path(name))
+    mtime = int(when.timestamp())
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode='w', format=tarfile.PAX_FORMAT) as archive:
+            info = {"period": period, "commit": commit, "committed": when.isoformat(), "files": files}
+            members = [("snapshot.json", json.dumps(info, indent=4).encode('utf-8'))]
+            members += [(name, git("show", f"{commit}:{name}")) for name in files]
+            for name, content in members:
+                member = tarfile.TarInfo(name)
+                member.size = len(content)
+                member.mtime = mtime
+                member.mode = 0o644
+                archive.addfile(member, io.BytesIO(content))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(buffer.getvalue())
+    return len(files)
+
+
+def write_snapshots(snapshot_dir=SNAPSHOT_DIR, period=SNAPSHOT_PERIOD):
+    """
+    Archives every finished period that has no archive yet.
+
+    Returns:
+        list[str]: The periods archived in this run.
+    """
+    written = []
+    for key, (commit, when) in data_commits_by_period(period).items():
+        path = os.path.join(snapshot_dir, f"{key}.tar.gz")
+        if os.path.exists(path):
+            continue
+        count = write_snapshot(path, key, commit, when)
+        print(f"-> Archived {count} data files of {key} (commit {commit[:10]}) to '{path}'.")
+        written.append(key)
+    if not written:
+        print("-> Every finished period is already archived.")
+    return written
+
+
+def write_squash_branch(branch, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Creates `branch` with a single parentless commit holding HEAD's tree plus
+    the snapshot archives, through a throwaway index so neither the working
+    tree nor the current branch changes.
+
+    Returns:
+        str: The new commit's hash.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = {**os.environ, "GIT_INDEX_FILE": os.path.join(temp_dir, "index")}
+        git("read-tree", "HEAD", env=env)
+        if os.path.isdir(snapshot_dir):
+            git("add", "--", snapshot_dir, env=env)
+        tree = git("write-tree", env=env).decode('utf-8').strip()
+    message = f"Data history up to {datetime.now(UTC):%Y-%m-%d}, archived in {snapshot_dir}"
+    commit = git("commit-tree", tree, "-m", message).decode('utf-8').strip()
+    # Without --force, git refuses to move a branch that already exists.
+    git("branch", branch, commit)
+    return commit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite the data canonically and archive its history.")
+    parser.add_argument('--snapshots', action='store_true',
+                        help="Archive the data of every finished period into SNAPSHOT_DIR.")
+    parser.add_argument('--squash-branch', metavar='NAME',
+                        help="Also create branch NAME with one commit holding the current tree and the archives.")
+    args = parser.parse_args(argv)
+
+    print("--- Compacting the data ---")
+    compact_stores()
+    compact_exports()
+    if args.snapshots or args.squash_branch:
+        write_snapshots()
+    if args.squash_branch:
+        try:
+            commit = write_squash_branch(args.squash_branch)
+        except subprocess.CalledProcessError as e:
+            print(f"[!] Could not create branch '{args.squash_branch}': {e.stderr.decode('utf-8').strip()}")
+            return 1
+        print(f"✅ Branch '{args.squash_branch}' holds the squashed history ({commit[:10]}).")
+        print(f"   Review it, then publish it with: git push --force origin {args.squash_branch}:main")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Bump when the layout changes; the viewer checks it before decoding.
+FORMAT = "columns-v1"
+
+
+def _split_url(url):
+    """Splits a URL into (origin prefix, rest), e.g. ('https://fourhoi.com/', 'pla-062/cover-t.jpg')."""
+    parts = urlsplit(url)
+    prefix = f"{parts.scheme}://{parts.netloc}/"
+    if not url.startswith(prefix):
+        return '', url
+    return prefix, url[len(prefix):]
+
+
+def _tail(rest):
+    """The last path segment including its slash, e.g. '/cover-t.jpg'."""
+    cut = rest.rfind('/')
+    return rest[cut:] if cut > 0 else ''
+
+
+def _encode_urls(values):
+    """
+    Stores each URL as [prefix index, middle, suffix index]. Origins and
+    repeated trailing segments (like '/cover-t.jpg') are kept once in a
+    dictionary; a suffix index of -1 means the middle holds the whole rest.
+    """
+    split = [_split_url(v) if v is not None else None for v in values]
+    tail_counts = Counter(_tail(rest) for _, rest in filter(None, split))
+    prefixes, suffixes = {}, {}
+    parts = []
+    for item in split:
+        if item is None:
+            parts.append(None)
+            continue
+        prefix, rest = item
+        p = prefixes.setdefault(prefix, len(prefixes))
+        tail = _tail(rest)
+        if tail and tail_counts[tail] > 1:
+            parts.append([p, rest[:-len(tail)], suffixes.setdefault(tail, len(suffixes))])
+        else:
+            parts.append([p, rest, -1])
+    return {"prefixes": list(prefixes), "suffixes": list(suffixes), "parts": parts}
+
+
+def _encode_dict(values):
+    lookup = {}
+    index = [lookup.setdefault(v, len(lookup)) for v in values]
+    return {"dict": list(lookup), "index": index}
+
+
+def _encode_column(values):
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, str) and v.startswith(('http://', 'https://')) for v in present):
+        return _encode_urls(values)
+    if all(isinstance(v, (str, int, float, bool, type(None))) for v in values) \
+            and len(set(values)) <= len(values) // 2:
+        return _encode_dict(values)
+    return {"values": values}
+
+
+def encode_posts(posts, header=None):
+    """
+    Encodes a list of post dicts column by column.
+
+    Key names are stored once instead of on every record, low-cardinality
+    columns (dates, source names) become dictionaries, and URL columns share
+    their origins and repeated file names.
+
+    Args:
+        posts (list[dict]): Posts, all in the same (current) shape.
+        header (dict | None): Top-level fields to carry along, e.g. last_fetched.
+
+    Returns:
+        dict: The JSON-serializable compact document.
+    """
+    fields = []
+    for post in posts:
+        for field in post:
+            if field not in fields:
+                fields.append(field)
+    columns = {}
+    for field in fields:
+        values = [post.get(field) for post in posts]
+        column = _encode_column(values)
+        # Remember which records really lack the field so decoding is exact.
+        missing = [i for i, post in enumerate(posts) if field not in post]
+        if missing:
+            column["missing"] = missing
+        columns[field] = column
+    return {"format": FORMAT, **(header or {}), "count": len(posts), "fields": fields, "columns": columns}
+
+
+def _decode_column(column):
+    if "values" in column:
+        return column["values"]
+    if "dict" in column:
+        return [column["dict"][i] for i in column["index"]]
+    prefixes, suffixes = column["prefixes"], column["suffixes"]
+    return [
+        None if part is None else prefixes[part[0]] + part[1] + (suffixes[part[2]] if part[2] >= 0 else '')
+        for part in column["parts"]
+    ]
+
+
+def decode_posts(document):
+    """
+    Inverse of encode_posts().
+
+    Returns:
+        tuple[dict, list[dict]]: The header fields and the decoded posts.
+    """
+    count = document["count"]
+    posts = [{} for _ in range(count)]
+    for field in document["fields"]:
+        column = document["columns"][field]
+        missing = set(column.get("missing", ()))
+        for i, value in enumerate(_decode_column(column)):
+            if i not in missing:
+                posts[i][field] = value
+    header = {k: v for k, v in document.items() if k not in ("format", "count", "fields", "columns")}
+    return header, posts
@@ -0,0 +1,113 @@
+import hashlib
+import json
+from difflib import SequenceMatcher
+
+from catalogue import encode_catalogue
+from compact_format import encode_posts
+
+# --- Configuration ---
+FORMAT = "deltas-v1"
+MAX_DELTAS = 30  # Deltas kept in the chain; older viewers download everything again
+
+
+def _canonical(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def post_key(post):
+    """The key a post is known by across builds: its link (or, for catalogue items, its code)."""
+    if "records" in post:
+        return post["code"] or f"link:{post['records'][0][2]}"
+    return post.get('page_link') or post.get('link') or post.get('url')
+
+
+def post_content(post):
+    """
+    What counts as a change. A catalogue record's index into its source file
+    shifts whenever posts are added above it, so records are compared by
+    source and link only; the viewer matches them by link for the same reason.
+    """
+    if "records" in post:
+        post = {**post, "records": [[source, link] for source, _, link in post["records"]]}
+    return hashlib.sha1(_canonical(post).encode('utf-8')).hexdigest()
+
+
+def version_of(lists):
+    """A short hash of every list's header and items; the viewer stores it next to its copy."""
+    digest = hashlib.sha1()
+    for name in sorted(lists):
+        header, items = lists[name]
+        digest.update(_canonical([name, header]).encode('utf-8'))
+        for item in items:
+            digest.update(post_content(item).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def diff_list(old, new):
+    """
+    Describes `new` as runs of `old` plus new rows, so the viewer rebuilds
+    the list in exactly the build's order.
+
+    Returns:
+        tuple[list, list[dict], list[str]]: The ops ([0, start, end] copies
+        old[start:end], [1, n] takes the next n rows), the rows, and the
+        keys that are gone (tombstones).
+    """
+    matcher = SequenceMatcher(None, [post_content(p) for p in old], [post_content(p) for p in new], autojunk=False)
+    ops, rows = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([0, i1, i2])
+        elif j2 > j1:  # 'insert' or 'replace'
+            ops.append([1, j2 - j1])
+            rows.extend(new[j1:j2])
+    kept = {post_key(p) for p in new}
+    removed = [key for key in dict.fromkeys(post_key(p) for p in old) if key not in kept]
+    return ops, rows, removed
+
+
+def build_delta(previous, current):
+    """
+    The changes that turn the `previous` lists into the `current` ones.
+
+    Args:
+        previous (dict): list name -> (header, items) as of the last build.
+        current (dict): list name -> (header, items) as of this build.
+
+    Returns:
+        dict: The JSON-serializable delta, from version_of(previous) to
+        version_of(current).
+    """
+    lists = {}
+    for name, (header, items) in current.items():
+        ops, rows, removed = diff_list(previous.get(name, ({}, []))[1], items)
+        if "catalogue" in header:
+            encoded = encode_catalogue({"catalogue": header["catalogue"]}, rows)
+        else:
+            encoded = encode_posts(rows)
+        lists[name] = {"header": header, "count": len(items), "ops": ops, "rows": encoded, "removed": removed}
+    return {"format": FORMAT, "from": version_of(previous), "to": version_of(current), "lists": lists}
+
+
+def build_manifest(previous_manifest, delta, current, max_deltas=MAX_DELTAS):
+    """
+    Extends the chain of the last manifest with `delta` (None when nothing
+    changed). A chain whose head is not the delta's starting point is
+    dropped, since no viewer can hold that data any more.
+
+    Returns:
+        dict: {format, version, lists: {name: count}, chain: [{from, to, file}]}.
+    """
+    chain = []
+    if previous_manifest and previous_manifest.get("format") == FORMAT:
+        chain = previous_manifest.get("chain", [])
+        if delta and previous_manifest.get("version") != delta["from"]:
+            chain = []
+    if delta:
+        chain = chain + [{"from": delta["from"], "to": delta["to"], "file": f"{delta['to']}.min.json"}]
+    return {
+        "format": FORMAT,
+        "version": version_of(current),
+        "lists": {name: len(items) for name, (_, items) in current.items()},
+        "chain": chain[-max_deltas:],
+    }
@@ -0,0 +1,250 @@
+import itertools
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from instrumentation import METRICS, failure_cause
+from rate_limit import SCHEDULER, retry_after
+
+# --- Configuration ---
+FLARESOLVERR_URL = "http://localhost:8191/v1"
+POOL_SIZE = 4  # Browser sessions kept open inside FlareSolverr
+MAX_TIMEOUT_MS = 60000  # How long FlareSolverr may spend solving one page
+REQUEST_TIMEOUT = 90  # Our own HTTP timeout for a single FlareSolverr call
+RETRIES = 2
+BACKOFF_SECONDS = 2.0
+INITIAL_CONCURRENCY = 2  # Solves allowed in flight before the adaptive limit has seen any results
+LATENCY_TARGET = 20.0  # Seconds; slower solves count as a sign FlareSolverr is overloaded
+DECREASE_FACTOR = 0.5  # The limit is multiplied by this on a failed or slow solve
+
+
+class AIMDLimiter:
+    """
+    Adaptive limit on concurrent solves (additive increase, multiplicative
+    decrease, as in TCP congestion control).
+
+    Every fast, successful solve raises the limit by 1/limit, so it grows by
+    about one per round of requests. A failed, non-"ok" or slower-than-target
+    solve multiplies it by DECREASE_FACTOR. Only solves that started after the
+    last decrease can decrease it again, so one burst of timeouts halves the
+    limit once instead of collapsing it to the minimum.
+    """
+
+    def __init__(self, maximum, initial=INITIAL_CONCURRENCY, minimum=1,
+                 latency_target=LATENCY_TARGET, decrease_factor=DECREASE_FACTOR):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.last_decrease = float('-inf')
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a solve may start. Returns its start time, for release()."""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started, ok):
+        now = time.monotonic()
+        with self.condition:
+            self.in_flight -= 1
+            if ok and now - started <= self.latency_target:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif started > self.last_decrease:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self.last_decrease = now
+            self.condition.notify_all()
+
+
+def solve_failure_cause(result):
+    """Names why a FlareSolverr answer holds no usable page, or returns None."""
+    if result.get('status') != 'ok':
+        message = (result.get('message') or '').lower()
+        if 'timeout' in message:
+            return "solve_timeout"
+        if 'challenge' in message or 'cloudflare' in message:
+            return "cloudflare_challenge"
+        return "flaresolverr_error"
+    solution = result.get('solution')
+    if not solution or not solution.get('response'):
+        return "empty_solution"
+    return failure_cause(status=solution.get('status'))
+
+
+class FlareSolverrClient:
+    """
+    Small FlareSolverr client shared by the scrapers.
+
+    Each request borrows one of `pool_size` named FlareSolverr sessions, so the
+    browser context (and its Cloudflare clearance cookies) is reused between
+    pages instead of being rebuilt for every request. Borrowing blocks while
+    every session is busy, which bounds the number of in-flight solves.
+
+    On top of that, an AIMDLimiter adapts how many of those sessions may solve
+    at once to how well FlareSolverr is coping, between 1 and `pool_size`,
+    and the shared per-host scheduler paces the target sites themselves (a
+    429 from a site, or its Retry-After, holds back every solve for it).
+
+    Several clients (even in different processes) can share one FlareSolverr
+    instance fairly by passing the same `budget` semaphore: every solve holds
+    it, so the total number of in-flight solves never exceeds its value.
+
+    Use it as a context manager so the sessions are destroyed afterwards:
+
+        with FlareSolverrClient(pool_size=4) as client:
+            html = client.get("https://example.com/")
+    """
+
+    def __init__(self, url=FLARESOLVERR_URL, pool_size=POOL_SIZE, max_timeout=MAX_TIMEOUT_MS,
+                 request_timeout=REQUEST_TIMEOUT, retries=RETRIES, backoff=BACKOFF_SECONDS,
+                 use_sessions=True, budget=None, adaptive=True):
+        self.url = url
+        self.pool_size = max(1, pool_size)
+        self.max_timeout = max_timeout
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.use_sessions = use_sessions
+        self.budget = budget
+        self.limiter = AIMDLimiter(self.pool_size) if adaptive else None
+        self._http = requests.Session()
+        self._prefix = f"jav-links-{uuid.uuid4().hex[:8]}"
+        self._counter = itertools.count()
+        # Each slot holds a session id, or None until the slot is first used.
+        # Last in, first out: the most recently used (warm) session is reused
+        # first, and a new one is only created when every warm one is busy.
+        self._slots = queue.LifoQueue()
+        for _ in range(self.pool_size):
+            self._slots.put(None)
+        self._created = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _command(self, payload, timeout=None):
+        response = self._http.post(self.url, json=payload, timeout=timeout or self.request_timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _create_session(self):
+        session_id = f"{self._prefix}-{next(self._counter)}"
+        try:
+            result = self._command({'cmd': 'sessions.create', 'session': session_id})
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"[!] Could not create FlareSolverr session, falling back to one-off requests: {e}")
+            self.use_sessions = False
+            return None
+        if result.get('status') != 'ok':
+            print(f"[!] FlareSolverr refused to create a session: {result.get('message', 'Unknown error')}")
+            self.use_sessions = False
+            return None
+        self._created.append(session_id)
+        return session_id
+
+    def _destroy_session(self, session_id):
+        try:
+            self._command({'cmd': 'sessions.destroy', 'session': session_id}, timeout=30)
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        if session_id in self._created:
+            self._created.remove(session_id)
+
+    def _solve(self, payload):
+        started = self.limiter.acquire() if self.limiter else None
+        ok = False
+        try:
+            if self.budget is None:
+                result = self._command(payload)
+            else:
+                with self.budget:
+                    result = self._command(payload)
+            ok = result.get('status') == 'ok'
+            return result
+        finally:
+            if self.limiter:
+                self.limiter.release(started, ok)
+
+    @property
+    def concurrency(self):
+        """The number of solves currently allowed in flight."""
+        return int(self.limiter.limit) if self.limiter else self.pool_size
+
+    def get(self, target_url):
+        """
+        Fetches `target_url` through FlareSolverr.
+
+        Returns:
+            str | None: The page HTML if FlareSolverr solved it, None otherwise.
+        """
+        session_id = self._slots.get()
+        try:
+            for attempt in range(self.retries + 1):
+                if session_id is None and self.use_sessions:
+                    session_id = self._create_session()
+
+                payload = {'cmd': 'request.get', 'url': target_url, 'maxTimeout': self.max_timeout}
+                if session_id:
+                    payload['session'] = session_id
+                wait = None
+                with SCHEDULER.slot(target_url):
+                    start = time.perf_counter()
+                    try:
+                        result = self._solve(payload)
+                        solution = result.get('solution') or {}
+                        html = solution.get('response')
+                        cause = solve_failure_cause(result)
+                        METRICS.observe_request('flaresolverr', target_url, time.perf_counter() - start,
+                                                len((html or '').encode('utf-8')), cause)
+                        if solution.get('status') == 429:
+                            SCHEDULER.slow_down(target_url)
+                            wait = retry_after(solution.get('headers') or {}) or SCHEDULER.backoff_delay(attempt, self.backoff)
+                            SCHEDULER.hold(target_url, min(wait, SCHEDULER.max_backoff))
+                        elif result.get('status') == 'ok' and result.get('solution'):
+                            return html
+                    except (requests.exceptions.RequestException, ValueError) as e:
+                        cause = failure_cause(e)
+                        METRICS.observe_request('flaresolverr', target_url, time.perf_counter() - start, cause=cause)
+
+                # A failed solve can leave the browser in a bad state, so start
+                # the next attempt from a fresh session.
+                if session_id:
+                    self._destroy_session(session_id)
+                    session_id = None
+                if attempt < self.retries:
+                    METRICS.observe_retry('flaresolverr', cause)
+                    # A 429's hold already spaces out the retry; otherwise back off with jitter.
+                    if wait is None:
+                        time.sleep(SCHEDULER.backoff_delay(attempt, self.backoff))
+            return None
+        finally:
+            self._slots.put(session_id)
+
+    def get_many(self, target_urls):
+        """
+        Fetches several URLs concurrently, at most `pool_size` at a time.
+
+        Yields:
+            tuple[str, str | None]: (url, html) pairs in completion order.
+        """
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            future_to_url = {executor.submit(self.get, url): url for url in target_urls}
+            for future in as_completed(future_to_url):
+                yield future_to_url[future], future.result()
+
+    def close(self):
+        """Destroys every session this client created."""
+        for session_id in list(self._created):
+            self._destroy_session(session_id)
+        self._http.close()
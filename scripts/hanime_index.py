@@ -1,51 +1,36 @@
+import argparse
+import hashlib
 import requests
-from bs4 import BeautifulSoup
 import json
+from datetime import datetime, timedelta, UTC
 from urllib.parse import urljoin
 import time
 import os
+import queue
+import threading
 import concurrent.futures
 from tqdm import tqdm
+from flaresolverr_client import FlareSolverrClient
+from html_parsing import make_soup, only
+from instrumentation import METRICS, instrumented, timed_get, timed_parse
+from post_store import PostStore
+from rate_limit import HOST_POLICIES
 
-def fetch_page_with_flaresolverr(flaresolverr_url: str, target_url: str) -> str | None:
-    """
-    Fetches a webpage using FlareSolverr to bypass Cloudflare.
-
-    Args:
-        flaresolverr_url (str): The URL of your running FlareSolverr instance.
-        target_url (str): The URL of the website you want to fetch.
-
-    Returns:
-        str | None: The HTML content of the page if successful, None otherwise.
-    """
-    payload = {
-        "cmd": "request.get",
-        "url": target_url,
-        "maxTimeout": 60000,
-    }
-    # This function is not suitable for a progress bar, so verbose output is kept.
-    # print(f"Sending request to FlareSolverr for URL: {target_url}")
-    try:
-        response = requests.post(
-            f"{flaresolverr_url}/v1",
-            json=payload,
-            timeout=70
-        )
-        response.raise_for_status()
-        result = response.json()
-        if result and result.get("status") == "ok" and result.get("solution"):
-            # print(f"Successfully fetched {target_url}")
-            return result["solution"]["response"]
-        else:
-            # print(f"FlareSolverr request failed for {target_url}: {result.get('message', 'Unknown error')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        # print(f"An error occurred during the request to FlareSolverr for {target_url}: {e}")
-        return None
-    except json.JSONDecodeError:
-        # print(f"Failed to decode JSON response from FlareSolverr for {target_url}.")
-        return None
+# --- Configuration ---
+FLARESOLVERR_URL = "http://localhost:8191/v1"
+BASE_WEBSITE_URL = "https://hanimes.org/tag/hanime/"
+OUTPUT_JSON_FILE = "docs/data/hanime.json"
+LINK_CACHE_FILE = "data/hanime_link_cache.json"
+LINK_TTL = timedelta(days=30) # How long a resolved direct link is trusted...
+LINK_TTL_SPREAD = 0.25 # ...less up to this fraction per post, so links resolved together come due on different runs
+NEGATIVE_LINK_TTL = timedelta(days=1) # How long 'N/A'/'Error' results wait before a retry
+FAILED_LINKS = ('N/A', 'Error') # Results that mean the link could not be resolved
+MAX_WORKERS = HOST_POLICIES["fetch.mrspidyxd.workers.dev"]["concurrency"] # Concurrent threads fetching video links: what the link API allows
+LISTING_WINDOW = 3 # Listing pages fetched ahead of the one being handed to the resolvers (within hanimes.org's concurrency)
+RESOLVE_QUEUE_SIZE = 2 * MAX_WORKERS # Posts waiting for a resolver; a full queue pauses the listing crawl
+PAGE_REQUEUES = 2 # Extra tries for a listing page whose fetch failed, before pagination stops
 
+@timed_parse
 def extract_posts_from_html(html_content: str, base_url: str) -> list[dict]:
     """
     Extracts post details from the given HTML content.
@@ -59,7 +44,7 @@ def extract_posts_from_html(html_content: str, base_url: str) -> list[dict]:
     """
     if not html_content:
         return []
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content, parse_only=only('ul', class_='MovieList'))
     posts_data = []
     movie_list = soup.find('ul', class_='MovieList')
     if not movie_list:
@@ -102,7 +87,7 @@ def get_direct_video_link(post_url: str) -> str | None:
     
     api_url = f"https://fetch.mrspidyxd.workers.dev/?url={post_url}&extract=true"
     try:
-        response = requests.get(api_url, timeout=30)
+        response = timed_get(requests, api_url, timeout=30)
         response.raise_for_status()
         data = response.json()
         if data.get("success"):
@@ -115,78 +100,314 @@ def get_direct_video_link(post_url: str) -> str | None:
         # Errors will be common in concurrent requests, so we suppress verbose logging.
         return None
     except json.JSONDecodeError:
+        METRICS.observe_failure('requests', 'bad_response')
         return None
 
-def save_data_to_json(data: list, filename: str):
+def is_resolved(link: str | None) -> bool:
+    """Whether `link` is a usable direct link rather than a missing or failed one."""
+    return bool(link) and link not in FAILED_LINKS
+
+def _spread(post_url: str) -> float:
+    """A fraction in [0, 1) that is fixed per post URL, to spread expiries out."""
+    return int(hashlib.sha1(post_url.encode('utf-8')).hexdigest()[:8], 16) / 0x100000000
+
+class LinkCache:
     """
-    Saves the provided data to a JSON file.
+    Persistent cache of direct-video-link resolutions, keyed by post URL.
 
-    Args:
-        data (list): The list of dictionaries to save.
-        filename (str): The name of the file to save the data to.
+    Successful resolutions are trusted for `ttl`, shortened per post by up
+    to LINK_TTL_SPREAD; 'N/A' and 'Error' results are cached too, but only
+    for the shorter `negative_ttl` so they are retried on a later run.
+    Entries of posts that left the listing are dropped by evict(), and only
+    posts with an entry are resolved again.
+    """
+
+    def __init__(self, filename: str, ttl: timedelta, negative_ttl: timedelta):
+        self.filename = filename
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.entries = data
+            except json.JSONDecodeError:
+                print(f"[!] Error reading '{filename}'. Starting with an empty link cache.")
+
+    def get(self, post_url: str) -> str | None:
+        """
+        Returns the cached link for a post, or None if it must be resolved again.
+        """
+        entry = self.entries.get(post_url)
+        if not entry:
+            return None
+        if is_resolved(entry['link']):
+            ttl = self.ttl * (1 - LINK_TTL_SPREAD * _spread(post_url))
+        else:
+            ttl = self.negative_ttl
+        if datetime.fromisoformat(entry['resolved_at']) + ttl < datetime.now(UTC):
+            return None
+        return entry['link']
+
+    def put(self, post_url: str, link: str, resolved_at: datetime | None = None):
+        resolved_at = resolved_at or datetime.now(UTC)
+        self.entries[post_url] = {'link': link, 'resolved_at': resolved_at.isoformat()}
+
+    def seed(self, posts: list[dict]):
+        """
+        Fills an empty cache (the first run with one) from the already
+        resolved posts. Their resolution times are spread over the last
+        `ttl`, so they come due a few at a time instead of all in the same
+        run. A cache that has entries is left alone, so evicted posts are
+        not added back.
+        """
+        if self.entries:
+            return
+        now = datetime.now(UTC)
+        for post in posts:
+            if post.get('url') not in self.entries and post.get('direct_video_link'):
+                self.put(post['url'], post['direct_video_link'], now - self.ttl * _spread(post['url']))
+
+    def evict(self, keep_urls: set[str]) -> int:
+        """
+        Drops the entries of posts not in `keep_urls` (the posts seen in a
+        listing walked to its end), so delisted posts are not resolved again.
+
+        Returns:
+            int: The number of evicted entries.
+        """
+        stale = [url for url in self.entries if url not in keep_urls]
+        for url in stale:
+            del self.entries[url]
+        return len(stale)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=4, ensure_ascii=False, sort_keys=True)
+
+class ResolverPool:
+    """
+    Long-lived threads that resolve direct video links for the posts fed to
+    submit(), through a bounded queue.
+
+    submit() blocks while the queue is full, so a listing crawl that runs
+    ahead of resolution is held back instead of piling up posts.
+
+    A post whose saved link (from `saved_links`) is good keeps it when
+    resolving it again fails; only the failure goes into the cache, so it
+    is retried after the cache's negative TTL.
+    """
+
+    def __init__(self, cache: LinkCache, saved_links: dict[str, str] | None = None,
+                 workers: int = MAX_WORKERS, queue_size: int = RESOLVE_QUEUE_SIZE):
+        self.cache = cache
+        self.saved_links = {url: link for url, link in (saved_links or {}).items() if is_resolved(link)}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.pbar = tqdm(total=0, desc="Resolving links", unit="link")
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            # Stopping early: drop the posts no thread has started on.
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+        self.close()
+
+    def submit(self, posts: list[dict]) -> int:
+        """
+        Fills in 'direct_video_link' from the cache where it is fresh and
+        queues the other posts for resolution (the posts are updated in place).
+
+        Returns:
+            int: The number of posts queued.
+        """
+        queued = 0
+        for post in posts:
+            cached_link = self.cache.get(post['url'])
+            if cached_link is not None:
+                post['direct_video_link'] = cached_link if is_resolved(cached_link) \
+                    else self.saved_links.get(post['url'], cached_link)
+                continue
+            with self.lock:
+                self.queued += 1
+                self.pbar.total += 1
+                self.pbar.refresh()
+            self.queue.put(post)
+            queued += 1
+        return queued
+
+    def _work(self):
+        while True:
+            post = self.queue.get()
+            if post is None:
+                return
+            try:
+                direct_link = get_direct_video_link(post['url'])
+                result = direct_link if direct_link else 'N/A'
+            except Exception:
+                result = 'Error'
+            post['direct_video_link'] = result if is_resolved(result) \
+                else self.saved_links.get(post['url'], result)
+            with self.lock:
+                self.cache.put(post['url'], result)
+                self.pbar.update(1)
+
+    def close(self):
+        """Waits for every queued post to be resolved, then stops the threads."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.pbar.close()
+
+def listing_page_url(page_number: int) -> str:
+    return f"{BASE_WEBSITE_URL}page/{page_number}/" if page_number > 1 else BASE_WEBSITE_URL
+
+def fetch_listing_page(client: FlareSolverrClient, page_number: int) -> list[dict] | None:
+    """
+    Fetches and parses one listing page, retrying a failed fetch PAGE_REQUEUES times.
+
+    Returns:
+        list[dict] | None: The posts on the page, or None if it could not be fetched.
     """
+    target_page_url = listing_page_url(page_number)
+    page_html = client.get(target_page_url)
+    for _ in range(PAGE_REQUEUES):
+        if page_html:
+            break
+        print(f"\n-> Page {page_number} failed. Trying it again.")
+        page_html = client.get(target_page_url)
+    if not page_html:
+        return None
+    return extract_posts_from_html(page_html, BASE_WEBSITE_URL)
+
+def crawl_listing(client: FlareSolverrClient, resolver: ResolverPool, existing_urls: set[str],
+                  full: bool, window: int = LISTING_WINDOW) -> tuple[list[dict], bool]:
+    """
+    The producer side of the crawl: keeps `window` listing pages in flight,
+    takes them in page order and hands their posts to `resolver`.
+
+    Resolution never waits for the listing, and the listing only waits for
+    resolution when the resolver queue is full. Pages fetched past the end
+    of the listing (or past the already saved posts) are discarded.
+
+    Returns:
+        tuple[list[dict], bool]: The listed posts in listing order (their
+        links may still be resolving until `resolver` is closed), and whether
+        the listing was walked to its end, so the posts hold every listed one.
+    """
+    all_posts_data = []
+    complete = False
+    listing = concurrent.futures.ThreadPoolExecutor(max_workers=window)
+    pending = {}
+    next_page = 1
+    page_number = 1
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"\nSuccessfully saved all data to '{filename}'")
-        print(f"File saved at: {os.path.abspath(filename)}")
-    except IOError as e:
-        print(f"Error saving data to file: {e}")
+        with tqdm(desc="Scraping Pages", unit="page") as pbar_pages:
+            while True:
+                while len(pending) < window:
+                    pending[next_page] = listing.submit(fetch_listing_page, client, next_page)
+                    next_page += 1
+                pbar_pages.set_description(f"Scraping Page {page_number}")
+                posts_on_page = pending.pop(page_number).result()
 
-if __name__ == "__main__":
-    # --- Configuration ---
-    FLARESOLVERR_URL = "http://localhost:8191"
-    BASE_WEBSITE_URL = "https://hanimes.org/tag/hanime/"
-    OUTPUT_JSON_FILE = "docs/data/hanime.json"
-    MAX_WORKERS = 11 # Number of concurrent threads for fetching video links
+                if posts_on_page is None:
+                    print("\nFailed to fetch page HTML. Stopping pagination.")
+                    break
+                if not posts_on_page:
+                    print("\nNo more posts found. Reached the end.")
+                    complete = True
+                    break
+
+                resolver.submit(posts_on_page)
+                all_posts_data.extend(posts_on_page)
+                page_number += 1
+                pbar_pages.update(1)
+
+                if not full and existing_urls and all(post['url'] in existing_urls for post in posts_on_page):
+                    print("\nReached posts that are already saved. Stopping.")
+                    break
+    finally:
+        # Pages not started yet are dropped; the ones in flight finish and are ignored.
+        listing.shutdown(wait=True, cancel_futures=True)
+    return all_posts_data, complete
+
+def refresh_older_posts(resolver: ResolverPool, cache: LinkCache, existing_posts: list[dict],
+                        listed_posts: list[dict], complete: bool) -> tuple[list[dict], int]:
+    """
+    Hands the saved posts this crawl did not list to `resolver`, which
+    resolves them again once their cache entry expires. After a complete
+    listing, the posts missing from it are delisted: their cache entries
+    are evicted first, so they keep their saved link and are not resolved.
+
+    Returns:
+        tuple[list[dict], int]: The older posts, and the number of evicted entries.
+    """
+    listed_urls = {post['url'] for post in listed_posts}
+    older_posts = [post for post in existing_posts if post['url'] not in listed_urls]
+    evicted = cache.evict(listed_urls) if complete else 0
+    resolver.submit([post for post in older_posts if post['url'] in cache.entries])
+    return older_posts, evicted
+
+@instrumented('hanime')
+def main(argv=None, budget=None):
+    """Runs one hanime crawl. `budget` is an optional semaphore shared with other FlareSolverr users."""
+    parser = argparse.ArgumentParser(description="Scrape hanime posts and resolve their direct video links.")
+    parser.add_argument('--full', action='store_true',
+                        help="Walk every listing page instead of stopping at already saved posts.")
+    args = parser.parse_args(argv)
 
     print(f"Starting scraper for: {BASE_WEBSITE_URL}")
     print(f"Using FlareSolverr instance at: {FLARESOLVERR_URL}")
 
-    all_posts_data = []
-    page_number = 1
-    
-    # --- Main Scraping Loop ---
-    with tqdm(desc="Scraping Pages", unit="page") as pbar_pages:
-        while True:
-            target_page_url = f"{BASE_WEBSITE_URL}page/{page_number}/" if page_number > 1 else BASE_WEBSITE_URL
-            pbar_pages.set_description(f"Scraping Page {page_number}")
-            
-            page_html = fetch_page_with_flaresolverr(FLARESOLVERR_URL, target_page_url)
-            
-            if not page_html:
-                print("\nFailed to fetch page HTML. Stopping pagination.")
-                break
-                
-            posts_on_page = extract_posts_from_html(page_html, BASE_WEBSITE_URL)
-            
-            if not posts_on_page:
-                print("\nNo more posts found. Reached the end.")
-                break
-                
-            # Use ThreadPoolExecutor to fetch direct links concurrently
-            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Create a mapping from future to post to update it later
-                future_to_post = {executor.submit(get_direct_video_link, post['url']): post for post in posts_on_page}
-                
-                # Process completed futures with a progress bar
-                for future in tqdm(concurrent.futures.as_completed(future_to_post), total=len(posts_on_page), desc=f"Fetching links for page {page_number}"):
-                    post = future_to_post[future]
-                    try:
-                        direct_link = future.result()
-                        post['direct_video_link'] = direct_link if direct_link else 'N/A'
-                    except Exception as exc:
-                        post['direct_video_link'] = 'Error'
-                        # print(f"{post['title']} generated an exception: {exc}")
-
-            all_posts_data.extend(posts_on_page)
-            page_number += 1
-            pbar_pages.update(1)
+    store = PostStore('hanime', key='url', legacy_file=OUTPUT_JSON_FILE)
+    # Work on copies so the store can tell which posts actually changed.
+    existing_posts = [dict(post) for post in store.posts()]
+    existing_urls = {post['url'] for post in existing_posts}
+    print(f"-> Found {len(existing_posts)} existing posts in '{store.path}'.")
+    link_cache = LinkCache(LINK_CACHE_FILE, LINK_TTL, NEGATIVE_LINK_TTL)
+    link_cache.seed(existing_posts)
+    saved_links = {post['url']: post.get('direct_video_link') for post in existing_posts}
+
+    # --- Main Scraping Pipeline ---
+    # Listing pages run ahead in a bounded window and feed one resolver pool.
+    with FlareSolverrClient(FLARESOLVERR_URL, pool_size=LISTING_WINDOW, budget=budget) as client, \
+            ResolverPool(link_cache, saved_links) as resolver:
+        all_posts_data, complete = crawl_listing(client, resolver, existing_urls, args.full)
+
+        # --- Merge with the posts from previous runs ---
+        # Older posts are resolved again once their cache entry expires; if that
+        # fails, a good saved link is kept and only the failure is cached.
+        older_posts, evicted = refresh_older_posts(resolver, link_cache, existing_posts, all_posts_data, complete)
+        all_posts_data.extend(older_posts)
+    resolved_count = resolver.queued
+
+    link_cache.save()
+    print(f"\nResolved {resolved_count} direct links ({evicted} cache entries of delisted posts evicted).")
         
     # --- Save Results ---
-    if all_posts_data:
-        save_data_to_json(all_posts_data, OUTPUT_JSON_FILE)
+    # Oldest first, so new posts land at the end of the log in listing order.
+    changed = store.upsert(reversed(all_posts_data))
+    if changed or not os.path.exists(OUTPUT_JSON_FILE):
+        final_posts_list = store.export_json(OUTPUT_JSON_FILE)
+        print(f"\nSaved {len(changed)} new or updated posts; '{OUTPUT_JSON_FILE}' now holds {len(final_posts_list)} posts.")
     else:
-        print("\nNo posts were scraped. The output file will not be created.")
+        print("\nNo new or updated posts. The output file is already up-to-date.")
 
     print("\nScript finished.")
+
+if __name__ == "__main__":
+    main()
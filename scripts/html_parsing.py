@@ -0,0 +1,48 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml builds trees several times faster than the pure-Python html.parser,
+# but it is optional: everything works the same without it.
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+def _has_class(class_names):
+    wanted = {class_names} if isinstance(class_names, str) else set(class_names)
+
+    def match(value):
+        # While parsing, the strainer may see the raw "a b c" attribute string
+        # rather than the split list find_all() works with.
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return not wanted.isdisjoint(classes)
+    return match
+
+
+def only(name=None, class_=None, **attrs):
+    """
+    Builds a SoupStrainer so that only matching elements (and everything inside
+    them) end up in the tree. Arguments follow BeautifulSoup's find_all(); a
+    list for `class_` matches elements carrying any of those classes.
+    """
+    if class_ is not None:
+        attrs['class'] = _has_class(class_)
+    return SoupStrainer(name, attrs)
+
+
+def make_soup(markup, parse_only=None):
+    """
+    Parses HTML with the fastest available backend.
+
+    Args:
+        markup (str | bytes): The page to parse.
+        parse_only (SoupStrainer | None): Restricts the tree to the region a
+            scraper actually reads, which skips building the rest of the page.
+
+    Returns:
+        BeautifulSoup: The (possibly partial) document.
+    """
+    return BeautifulSoup(markup, PARSER, parse_only=parse_only)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+
+from instrumentation import timed_get
+
+
+class HttpCache:
+    """
+    Small on-disk cache of validators for listing pages.
+
+    For every URL it remembers the ETag / Last-Modified headers of the last
+    response plus a fingerprint of the part of the page we actually parse, so
+    callers can send conditional requests and skip pages that did not change.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.entries = data
+            except json.JSONDecodeError:
+                print(f"[!] Error reading '{filename}'. Starting with an empty HTTP cache.")
+
+    @staticmethod
+    def fingerprint(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def conditional_headers(self, url):
+        """Returns If-None-Match / If-Modified-Since headers for a cached URL."""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, session, url, **kwargs):
+        """
+        Sends a conditional GET through `session`.
+
+        Returns:
+            The response, or None when the server answered 304 Not Modified.
+        """
+        headers = {**kwargs.pop('headers', {}), **self.conditional_headers(url)}
+        response = timed_get(session, url, headers=headers, **kwargs)
+        if response.status_code == 304:
+            return None
+        return response
+
+    def is_unchanged(self, url, fingerprint):
+        return self.entries.get(url, {}).get('fingerprint') == fingerprint
+
+    def store(self, url, response, fingerprint):
+        self.entries[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fingerprint': fingerprint,
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=4, sort_keys=True)
@@ -0,0 +1,244 @@
+import bisect
+import functools
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime, UTC
+
+import requests
+
+from rate_limit import SCHEDULER
+
+# --- Configuration ---
+METRICS_DIR = "data/metrics"  # One <source>.json report per scraper run
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]  # Upper bounds; the last bucket is open
+POSTS_BUCKETS = [0, 1, 5, 10, 20, 30, 50, 100]  # Upper bounds for posts extracted per page
+SLOWEST_KEPT = 10  # Slowest requests listed in the report
+
+
+class Histogram:
+    """Fixed-bucket histogram that also keeps count, sum and max."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the open bucket)."""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [self.max], self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else 0,
+            "p50": round(self.quantile(0.5), 1),
+            "p95": round(self.quantile(0.95), 1),
+            "max": round(self.max, 1),
+            "buckets": self.bounds,
+            "counts": self.counts,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe counters for one scraper run: request latency per fetch
+    backend, bytes transferred, failures and retries by cause, parse time and
+    posts extracted per page.
+
+    There is one instance per process (METRICS); each scraper process runs a
+    single source, so everything recorded belongs to `self.source`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, source=None):
+        with self.lock:
+            self.source = source
+            self.started = datetime.now(UTC)
+            self.clock = time.monotonic()
+            self.backends = {}
+            self.slowest = []  # min-heap of (ms, url, backend)
+            self.parse_ms = Histogram(LATENCY_BUCKETS_MS)
+            self.posts_per_page = Histogram(POSTS_BUCKETS)
+
+    def _backend(self, name):
+        backend = self.backends.get(name)
+        if backend is None:
+            backend = self.backends[name] = {
+                "latency_ms": Histogram(LATENCY_BUCKETS_MS),
+                "bytes": 0,
+                "failures": {},
+                "retries": {},
+            }
+        return backend
+
+    def observe_request(self, backend, url, seconds, nbytes=0, cause=None):
+        """Records one request; `cause` names the failure, or is None on success."""
+        ms = seconds * 1000
+        with self.lock:
+            stats = self._backend(backend)
+            stats["latency_ms"].add(ms)
+            stats["bytes"] += nbytes
+            if cause:
+                stats["failures"][cause] = stats["failures"].get(cause, 0) + 1
+            entry = (round(ms, 1), url, backend)
+            if len(self.slowest) < SLOWEST_KEPT:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def observe_failure(self, backend, cause):
+        """Counts a failure found after the request itself succeeded (e.g. an unreadable body)."""
+        with self.lock:
+            failures = self._backend(backend)["failures"]
+            failures[cause] = failures.get(cause, 0) + 1
+
+    def observe_retry(self, backend, cause):
+        with self.lock:
+            retries = self._backend(backend)["retries"]
+            retries[cause] = retries.get(cause, 0) + 1
+
+    def observe_parse(self, seconds, posts):
+        with self.lock:
+            self.parse_ms.add(seconds * 1000)
+            self.posts_per_page.add(posts)
+
+    def report(self):
+        """Returns the run's metrics as a JSON-serializable dict."""
+        with self.lock:
+            backends = {}
+            for name, stats in self.backends.items():
+                backends[name] = {
+                    "requests": stats["latency_ms"].count,
+                    "failed": sum(stats["failures"].values()),
+                    "bytes": stats["bytes"],
+                    "latency_ms": stats["latency_ms"].to_dict(),
+                    "failures_by_cause": stats["failures"],
+                    "retries_by_cause": stats["retries"],
+                }
+            return {
+                "source": self.source,
+                "started": self.started.isoformat(),
+                "seconds": round(time.monotonic() - self.clock, 1),
+                "backends": backends,
+                "parse": {
+                    "pages": self.parse_ms.count,
+                    "posts": int(self.posts_per_page.total),
+                    "empty_pages": self.posts_per_page.counts[0],
+                    "parse_ms": self.parse_ms.to_dict(),
+                    "posts_per_page": self.posts_per_page.to_dict(),
+                },
+                "slowest_requests": [
+                    {"url": url, "backend": backend, "ms": ms}
+                    for ms, url, backend in sorted(self.slowest, reverse=True)
+                ],
+            }
+
+    def write_report(self, metrics_dir=METRICS_DIR):
+        """Writes the report to <metrics_dir>/<source>.json and returns its path."""
+        path = os.path.join(metrics_dir, f"{self.source or 'unknown'}.json")
+        os.makedirs(metrics_dir, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=4)
+        return path
+
+
+METRICS = Metrics()
+
+
+def failure_cause(error=None, status=None, headers=None):
+    """Names why a request failed, e.g. 'timeout', 'cloudflare' or 'http_404'."""
+    if error is not None:
+        if isinstance(error, requests.exceptions.Timeout):
+            return "timeout"
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return "connection"
+        if isinstance(error, ValueError):
+            return "bad_response"
+        return type(error).__name__
+    if status is not None and status >= 400:
+        # Cloudflare answers challenges and blocks with 403/503 from its own servers.
+        if status in (403, 503) and (headers or {}).get('Server', '').lower() == 'cloudflare':
+            return "cloudflare"
+        return f"http_{status}"
+    return None
+
+
+def backend_name(session):
+    """'cloudscraper' for cloudscraper sessions, 'requests' otherwise."""
+    return "cloudscraper" if type(session).__module__.startswith('cloudscraper') else "requests"
+
+
+def timed_get(session, url, **kwargs):
+    """
+    session.get(url, **kwargs), paced and retried by the shared per-host
+    scheduler, that records each attempt's latency, size and outcome.
+    `session` may also be the requests module itself.
+    """
+    backend = backend_name(session)
+
+    def attempt():
+        start = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+        except Exception as e:
+            METRICS.observe_request(backend, url, time.perf_counter() - start, cause=failure_cause(e))
+            raise
+        METRICS.observe_request(backend, url, time.perf_counter() - start, len(response.content),
+                                failure_cause(status=response.status_code, headers=response.headers))
+        return response
+
+    def on_retry(error, response):
+        METRICS.observe_retry(backend, failure_cause(error) if error is not None
+                              else failure_cause(status=response.status_code, headers=response.headers))
+
+    return SCHEDULER.request(url, attempt, on_retry)
+
+
+def timed_parse(parse):
+    """Decorator for page parsers: records parse time and the number of posts returned."""
+    @functools.wraps(parse)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = parse(*args, **kwargs)
+        # Some parsers return (posts, extra) tuples.
+        posts = result[0] if isinstance(result, tuple) else result
+        METRICS.observe_parse(time.perf_counter() - start, len(posts or ()))
+        return result
+    return wrapper
+
+
+def instrumented(source):
+    """Decorator for a scraper's main(): starts fresh metrics and always writes the report."""
+    def decorate(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            METRICS.reset(source)
+            try:
+                return main(*args, **kwargs)
+            finally:
+                path = METRICS.write_report()
+                print(f"-> Metrics written to '{path}'.")
+        return wrapper
+    return decorate
@@ -1,129 +1,167 @@
+import argparse
 import cloudscraper
-from bs4 import BeautifulSoup
-import json
 from datetime import datetime, UTC
-import time
 import re
 from urllib.parse import urljoin
-import os
 from tqdm import tqdm
+from http_cache import HttpCache
+from html_parsing import make_soup, only
+from instrumentation import instrumented, timed_get, timed_parse
+from post_store import PostStore
 
 # --- Configuration ---
 BASE_URL = "https://jav.guru/"
 POSTS_FILE = "docs/data/javguru.json"
+CACHE_FILE = "data/javguru_http_cache.json"  # ETag/Last-Modified and content fingerprints per page
 MAX_PAGES_TO_SCRAPE = 15
+# The article grid plus the pagination block are all we read from a listing page.
+LISTING_ONLY = only(class_=['inside-article', 'wp-pagenavi'])
 
-def load_existing_links(filename):
-    """Loads existing post links to avoid re-scraping."""
-    if not os.path.exists(filename):
-        return set()
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        if isinstance(data, dict) and 'posts' in data:
-            links = {post.get('link') for post in data['posts']}
-            print(f"-> Found {len(links)} existing posts in '{filename}'.")
-            return links
-    except (json.JSONDecodeError, KeyError):
-        return set()
-    return set()
-
-def scrape_jav_guru(base_url, max_pages, scraper):
+def article_section(html):
+    """
+    Returns the slice of a listing page that holds the article grid.
+
+    This is found with plain string searches so an unchanged page can be
+    recognised without building a BeautifulSoup tree first.
+    """
+    start = html.find('inside-article')
+    if start == -1:
+        return html
+    end = html.find('wp-pagenavi', start)
+    return html[start:end if end != -1 else len(html)]
+
+@timed_parse
+def parse_listing_page(html, base_url, post_fetch_time):
+    """
+    Parses one listing page without touching the network.
+
+    Returns the posts on the page and the total page count from its pagination.
+    """
+    page_soup = make_soup(html, parse_only=LISTING_ONLY)
+
+    last_page_link = page_soup.select_one('.wp-pagenavi .last')
+    total_pages = 1
+    if last_page_link and last_page_link.has_attr('href'):
+        match = re.search(r'/page/(\d+)/', last_page_link['href'])
+        if match: total_pages = int(match.group(1))
+
+    page_posts = []
+    for article in page_soup.find_all('div', class_='inside-article'):
+        link_tag = article.select_one('.imgg a')
+        title_tag = article.select_one('.grid1 h2 a')
+        date_tag = article.select_one('.date')
+        img_tag = article.select_one('.imgg img')
+
+        if not (link_tag and title_tag and date_tag and img_tag): continue
+
+        # --- THIS IS THE CORRECTED LOGIC FROM THE MASTER SCRIPT ---
+        # It prioritizes 'data-src' for lazy-loaded images, then falls back to 'src'.
+        image_url = img_tag.get('data-src') or img_tag.get('src')
+        # --- END CORRECTION ---
+
+        try:
+            parsed_date = datetime.strptime(date_tag.get_text(strip=True), '%d %b, %y').strftime('%Y-%m-%d')
+        except ValueError:
+            parsed_date = None
+
+        page_posts.append({
+            'date': parsed_date,
+            'link': urljoin(base_url, link_tag.get('href')),
+            'image_source': urljoin(base_url, image_url) if image_url else None,
+            'text': title_tag.get('title'),
+            'post_fetched_date': post_fetch_time
+        })
+    return page_posts, total_pages
+
+def scrape_jav_guru(base_url, max_pages, scraper, existing_links=None, cache=None):
     """
     Scrapes posts directly from JAV.Guru listing pages,
     using the corrected logic to find cover images.
+
+    With a cache, pages answered with 304 Not Modified (or whose article grid
+    has the same fingerprint as last time) end the crawl before parsing. With
+    existing_links, the crawl also ends after the first page whose posts are
+    all already known.
     """
     all_posts = []
-    print("-> Discovering total pages for JAV.Guru...")
+    existing_links = existing_links or set()
     try:
-        response = scraper.get(base_url, timeout=30)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        last_page_link = soup.select_one('.wp-pagenavi .last')
-        total_pages = 1
-        if last_page_link and last_page_link.has_attr('href'):
-            match = re.search(r'/page/(\d+)/', last_page_link['href'])
-            if match: total_pages = int(match.group(1))
-        
-        pages_to_scrape = min(max_pages, total_pages)
-        print(f"-> Found {total_pages} total pages. Scraping the first {pages_to_scrape}.")
-
         post_fetch_time = datetime.now(UTC).isoformat()
+        pages_to_scrape = max_pages
         
-        for page_num in tqdm(range(1, pages_to_scrape + 1), desc="Scraping JAV.Guru"):
-            page_url = urljoin(base_url, f"page/{page_num}/")
-            page_response = scraper.get(page_url, timeout=30)
-            page_soup = BeautifulSoup(page_response.content, 'html.parser')
-
-            for article in page_soup.find_all('div', class_='inside-article'):
-                link_tag = article.select_one('.imgg a')
-                title_tag = article.select_one('.grid1 h2 a')
-                date_tag = article.select_one('.date')
-                img_tag = article.select_one('.imgg img')
-
-                if not (link_tag and title_tag and date_tag and img_tag): continue
-                
-                # --- THIS IS THE CORRECTED LOGIC FROM THE MASTER SCRIPT ---
-                # It prioritizes 'data-src' for lazy-loaded images, then falls back to 'src'.
-                image_url = img_tag.get('data-src') or img_tag.get('src')
-                # --- END CORRECTION ---
-
-                try:
-                    parsed_date = datetime.strptime(date_tag.get_text(strip=True), '%d %b, %y').strftime('%Y-%m-%d')
-                except ValueError:
-                    parsed_date = None
-
-                all_posts.append({
-                    'date': parsed_date,
-                    'link': urljoin(base_url, link_tag.get('href')),
-                    'image_source': urljoin(base_url, image_url) if image_url else None,
-                    'text': title_tag.get('title'),
-                    'post_fetched_date': post_fetch_time
-                })
-            time.sleep(1) # Be polite
+        for page_num in tqdm(range(1, max_pages + 1), desc="Scraping JAV.Guru"):
+            if page_num > pages_to_scrape: break
+            # The front page is page 1, so it doubles as the page-count discovery request.
+            page_url = base_url if page_num == 1 else urljoin(base_url, f"page/{page_num}/")
+            page_response = cache.get(scraper, page_url, timeout=30) if cache else timed_get(scraper, page_url, timeout=30)
+            if page_response is None:
+                print(f"\n-> Page {page_num} not modified since the last run. Stopping.")
+                break
+
+            html = page_response.text
+            fingerprint = HttpCache.fingerprint(article_section(html))
+            if cache and cache.is_unchanged(page_url, fingerprint):
+                print(f"\n-> Page {page_num} has the same posts as the last run. Stopping.")
+                break
+
+            page_posts, total_pages = parse_listing_page(html, base_url, post_fetch_time)
+            if page_num == 1:
+                pages_to_scrape = min(max_pages, total_pages)
+                print(f"\n-> Found {total_pages} total pages. Scraping up to the first {pages_to_scrape}.")
+
+            all_posts.extend(page_posts)
+            # Only remember the page once its posts are safely collected.
+            if cache: cache.store(page_url, page_response, fingerprint)
+
+            if existing_links and page_posts and all(p['link'] in existing_links for p in page_posts):
+                print(f"\n-> Every post on page {page_num} is already known. Stopping.")
+                break
         
         return all_posts
 
     except Exception as e:
         print(f"[!] An unexpected error occurred: {e}")
-        return []
+        # Pages already recorded in the cache must keep their posts, or the
+        # next run would skip them as unchanged.
+        return all_posts
+
+@instrumented('javguru')
+def main(argv=None):
+    """Runs one JAV.Guru crawl; `argv` defaults to the command line."""
+    parser = argparse.ArgumentParser(description="Scrape the JAV.Guru listing pages.")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the HTTP cache and known posts, and scrape every page up to the limit.")
+    args = parser.parse_args(argv)
 
-if __name__ == '__main__':
     print(f"--- Running JAV.Guru Scraper ---")
     scraper = cloudscraper.create_scraper()
 
     # Load links of posts we already have
-    existing_links = load_existing_links(POSTS_FILE)
+    store = PostStore('javguru', key='link', legacy_file=POSTS_FILE)
+    existing_links = store.keys()
+    print(f"-> Found {len(existing_links)} existing posts in '{store.path}'.")
+    cache = HttpCache(CACHE_FILE)
     
     # Scrape the listing pages
-    scraped_posts = scrape_jav_guru(BASE_URL, MAX_PAGES_TO_SCRAPE, scraper)
+    if args.full:
+        scraped_posts = scrape_jav_guru(BASE_URL, MAX_PAGES_TO_SCRAPE, scraper, cache=None)
+    else:
+        scraped_posts = scrape_jav_guru(BASE_URL, MAX_PAGES_TO_SCRAPE, scraper, existing_links, cache)
+    cache.save()
     
-    # Filter out posts we already have in our JSON file
-    newly_added = [p for p in scraped_posts if p['link'] not in existing_links]
+    # Only posts we do not have yet are written to the store
+    newly_added = store.append(reversed(scraped_posts))
     print(f"\n-> Found {len(newly_added)} new posts from JAV.Guru.")
 
     if newly_added:
-        # Load old posts from the file to append to them
-        if os.path.exists(POSTS_FILE):
-            with open(POSTS_FILE, 'r', encoding='utf-8') as f:
-                try:
-                    final_posts_list = json.load(f).get('posts', []) + newly_added
-                except (json.JSONDecodeError, AttributeError):
-                    final_posts_list = newly_added
-        else:
-            final_posts_list = newly_added
-        
         # Sort the combined list by date
-        final_posts_list.sort(key=lambda x: x.get('date') or '1970-01-01', reverse=True)
-
-        final_data = {
+        final_posts_list = store.export_json(POSTS_FILE, sort_key=lambda x: x.get('date') or '1970-01-01', header={
             "last_fetched": datetime.now(UTC).isoformat(),
             "source_website": "JAV.Guru",
-            "total_videos": len(final_posts_list),
-            "posts": final_posts_list
-        }
-        with open(POSTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(final_data, f, ensure_ascii=False, indent=4)
+        })
         print(f"✅ Success! '{POSTS_FILE}' updated. Total posts: {len(final_posts_list)}.")
     else:
         print("\n--- No new posts found. The file is already up-to-date. ---")
+
+if __name__ == '__main__':
+    main()
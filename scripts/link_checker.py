@@ -0,0 +1,207 @@
+import argparse
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, UTC
+
+import requests
+from tqdm import tqdm
+
+from post_store import STORE_DIR, PostStore
+from rate_limit import SCHEDULER
+
+# --- Configuration ---
+STATUS_STORE = "links"  # data/store/links.ndjson, one status record per media URL
+CHECKED_SOURCES = {
+    # store name -> the key of its posts, the media fields to check, and the
+    # value the viewer already treats as "no media" for that source.
+    "playlist": {"key": "page_link", "fields": ["cover_image_url", "preview_video_url"], "missing": None},
+    "hanime": {"key": "url", "fields": ["image_url", "direct_video_link"], "missing": "N/A"},
+}
+MAX_WORKERS = 16
+PER_HOST_CONCURRENCY = 4  # Simultaneous requests to one host
+REQUESTS_PER_SECOND = 8  # Per host
+REQUEST_TIMEOUT = 15
+MIN_INTERVAL_DAYS = 1  # New, changed or failing links are re-checked this often...
+MAX_INTERVAL_DAYS = 32  # ...and the interval doubles, up to this, while the result stays the same
+INTERVAL_JITTER = 0.25  # next_check lands within this share of the interval either way, so links found together drift apart
+DEAD_STATUSES = {404, 410}
+DEAD_AFTER = 2  # Consecutive dead answers before a link counts as dead
+HEAD_FALLBACK_STATUSES = {403, 405, 501}  # Servers that refuse HEAD get a one-byte range GET
+SAVE_EVERY = 500  # Status records written per batch, so an interrupted run keeps its progress
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class LinkChecker:
+    """
+    Checks URLs with HEAD (or one-byte range GET) requests over pooled
+    connections. The shared scheduler paces each host, caps its requests in
+    flight and retries rate-limited answers.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, per_host=PER_HOST_CONCURRENCY,
+                 requests_per_second=REQUESTS_PER_SECOND, timeout=REQUEST_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Media hosts have no policy of their own; this sets theirs.
+        SCHEDULER.configure(rate=requests_per_second, concurrency=per_host)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=per_host)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def check(self, url):
+        """Returns the final HTTP status of `url`, or None if the request failed."""
+        try:
+            response = SCHEDULER.request(url, lambda: self.session.head(url, allow_redirects=True, timeout=self.timeout))
+            if response.status_code in HEAD_FALLBACK_STATUSES:
+                response = SCHEDULER.request(url, lambda: self.session.get(
+                    url, headers={'Range': 'bytes=0-0'}, stream=True, allow_redirects=True, timeout=self.timeout))
+                response.close()
+            return response.status_code
+        except requests.RequestException:
+            return None
+
+    def check_many(self, urls, desc="Checking links"):
+        """Yields (url, status) pairs as the checks complete."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_url = {executor.submit(self.check, url): url for url in urls}
+            for future in tqdm(as_completed(future_to_url), total=len(future_to_url), desc=desc):
+                yield future_to_url[future], future.result()
+
+
+def classify(status):
+    """'alive' for 2xx/3xx, 'dead' for 404/410, 'error' for anything that may be temporary."""
+    if status is not None and status < 400:
+        return "alive"
+    if status in DEAD_STATUSES:
+        return "dead"
+    return "error"
+
+
+def next_status(previous, url, status, now):
+    """
+    Builds the new status record for `url` from the previous one.
+
+    A link whose result stays the same is checked half as often each time
+    (up to MAX_INTERVAL_DAYS); a new link, a changed result or an error
+    brings it back to MIN_INTERVAL_DAYS. A link is only reported dead after
+    DEAD_AFTER dead answers in a row, so one bad response does not hide it.
+    The next check is moved by up to INTERVAL_JITTER of the interval either
+    way, so links first seen in the same run do not stay due on the same day.
+    """
+    result = classify(status)
+    previous = previous or {}
+    failures = previous.get("failures", 0)
+    if result == "alive":
+        failures = 0
+    elif result == "dead":
+        failures += 1
+    if result != "error" and result == previous.get("result"):
+        interval = min(previous.get("interval_days", MIN_INTERVAL_DAYS) * 2, MAX_INTERVAL_DAYS)
+    else:
+        interval = MIN_INTERVAL_DAYS
+    return {
+        "url": url,
+        "status": status,
+        "result": result,
+        "failures": failures,
+        "dead": failures >= DEAD_AFTER,
+        "interval_days": interval,
+        "last_checked": now.isoformat(),
+        "next_check": (now + timedelta(days=interval * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER))).isoformat(),
+    }
+
+
+def media_urls(store_dir=STORE_DIR):
+    """Collects the checked media URLs of every source, in store order."""
+    urls = {}
+    for name, config in CHECKED_SOURCES.items():
+        for post in PostStore(name, config["key"], store_dir=store_dir).posts():
+            for field in config["fields"]:
+                value = post.get(field)
+                if isinstance(value, str) and value.startswith(('http://', 'https://')):
+                    urls.setdefault(value, None)
+    return list(urls)
+
+
+def due_urls(urls, statuses, now, check_all=False):
+    """The URLs never checked or whose next_check has passed, oldest check first."""
+    due = [url for url in urls
+           if check_all or url not in statuses
+           or datetime.fromisoformat(statuses.get(url)["next_check"]) <= now]
+    return sorted(due, key=lambda url: statuses.get(url)["last_checked"] if url in statuses else "")
+
+
+def load_dead_links(store_dir=STORE_DIR):
+    """Returns the set of URLs currently considered dead."""
+    statuses = PostStore(STATUS_STORE, "url", store_dir=store_dir)
+    return {url for url, record in statuses.index.items() if record.get("dead")}
+
+
+def mark_dead_links(name, posts, dead, policy="flag"):
+    """
+    Marks the dead media of one source's posts in place.
+
+    With policy 'flag' each affected post gets a 'dead_links' list naming the
+    dead fields and keeps its URLs; with 'drop' the dead URLs are also
+    replaced by the source's "no media" value. Posts are never removed, so
+    the post order the search index relies on is unchanged.
+
+    Returns:
+        int: The number of posts with dead media.
+    """
+    config = CHECKED_SOURCES.get(name)
+    if not config or not dead:
+        return 0
+    marked = 0
+    for post in posts:
+        fields = [field for field in config["fields"] if post.get(field) in dead]
+        if not fields:
+            continue
+        marked += 1
+        post["dead_links"] = fields
+        if policy == "drop":
+            for field in fields:
+                post[field] = config["missing"]
+    return marked
+
+
+def main(argv=None):
+    """Checks the media URLs that are due; `argv` defaults to the command line."""
+    parser = argparse.ArgumentParser(description="Re-check the media URLs of the stored posts.")
+    parser.add_argument('--all', action='store_true', help="Check every URL, not just the ones that are due.")
+    parser.add_argument('--limit', type=int, help="Check at most this many URLs in this run.")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Concurrent checks.")
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONCURRENCY, help="Concurrent checks per host.")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="Requests per second per host.")
+    args = parser.parse_args(argv)
+
+    print("--- Checking media links ---")
+    now = datetime.now(UTC)
+    store = PostStore(STATUS_STORE, "url")
+    statuses = store.index
+    urls = media_urls()
+    due = due_urls(urls, statuses, now, args.all)[:args.limit]
+    print(f"-> {len(due)} of {len(urls)} media URLs are due for a check.")
+
+    checker = LinkChecker(args.workers, args.per_host, args.rate)
+    batch, counts = [], {"alive": 0, "dead": 0, "error": 0}
+    for url, status in checker.check_many(due):
+        record = next_status(statuses.get(url), url, status, now)
+        counts[record["result"]] += 1
+        batch.append(record)
+        if len(batch) >= SAVE_EVERY:
+            store.upsert(batch)
+            batch = []
+    store.upsert(batch)
+
+    dead = sum(1 for url in urls if statuses.get(url, {}).get("dead"))
+    print(f"-> Checked {len(due)}: {counts['alive']} alive, {counts['dead']} dead answers, {counts['error']} errors.")
+    print(f"✅ {dead} of {len(urls)} media URLs are currently dead.")
+
+
+if __name__ == '__main__':
+    main()
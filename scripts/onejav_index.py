@@ -1,16 +1,23 @@
+import argparse
 import requests
-from bs4 import BeautifulSoup
-import json
 from datetime import datetime, timedelta, UTC
-import time
 import os
-from urllib.parse import urljoin # <-- FIXED: Added this import for building URLs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit # <-- FIXED: Added this import for building URLs
 from tqdm import tqdm # <-- FIXED: Added this import for the progress bar
+from rate_limit import SCHEDULER
+from html_parsing import make_soup, only
+from instrumentation import instrumented, timed_get, timed_parse
+from post_store import PostStore
 
 # --- Configuration ---
 BASE_URL = "https://onejav.com/"
 POSTS_FILE = "docs/data/onejav.json" # Output file for this script
 DAYS_TO_SCRAPE = 30
+MAX_WORKERS = 6 # Day pages fetched concurrently
+REQUESTS_PER_SECOND = 5 # Per-host pacing, replaces the old fixed 0.5s sleep
+HEADERS = {'User-Agent': 'Mozilla/5.0', 'X-Requested-With': 'XMLHttpRequest'}
+OVERVIEW_ONLY = only('div', class_='card-overview') # The only part of a page we parse
 
 def parse_posts_from_html(soup, base_url, fetch_time):
     posts = []
@@ -32,72 +39,97 @@ def parse_posts_from_html(soup, base_url, fetch_time):
                 })
     return posts
 
-def scrape_all_posts(base_url, days_to_scrape):
+@timed_parse
+def parse_overview_page(html, base_url, fetch_time):
+    """Parses a front page or `?action=overview` response. Needs no network access."""
+    return parse_posts_from_html(make_soup(html, parse_only=OVERVIEW_ONLY), base_url, fetch_time)
+
+def create_session(pool_size):
+    """Creates a requests session whose connection pool matches our concurrency."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def fetch_day_posts(session, base_url, date_str, fetch_time):
+    """Fetches one `?action=overview` day page. Returns None if the request failed."""
+    api_url = f"{base_url}?action=overview&currentdate={date_str}"
+    response = timed_get(session, api_url, timeout=30)
+    if response.status_code != 200 or not response.text: return None
+    return parse_overview_page(response.text, base_url, fetch_time)
+
+def scrape_all_posts(base_url, days_to_scrape, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
     all_posts = []
-    headers = {'User-Agent': 'Mozilla/5.0', 'X-Requested-With': 'XMLHttpRequest'}
     fetch_time = datetime.now(UTC).isoformat()
+    # The shared scheduler paces (and retries) every request to the host.
+    SCHEDULER.configure(urlsplit(base_url).netloc, rate=requests_per_second, burst=max_workers,
+                        concurrency=max_workers)
 
     try:
-        print(f"-> Scraping initial page: {base_url}")
-        response = requests.get(base_url, headers=headers, timeout=30)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        all_posts.extend(parse_posts_from_html(soup, base_url, fetch_time))
-        if not all_posts: return []
+        with create_session(max_workers) as session:
+            print(f"-> Scraping initial page: {base_url}")
+            response = timed_get(session, base_url, timeout=30)
             
-        last_date_str = all_posts[-1]['date']
-        current_date = datetime.strptime(last_date_str, '%Y-%m-%d')
-        
-        for _ in tqdm(range(days_to_scrape), desc="Scraping OneJAV"):
-            current_date -= timedelta(days=1)
-            date_str = current_date.strftime('%Y-%m-%d')
-            api_url = f"{base_url}?action=overview&currentdate={date_str}"
-            response = requests.get(api_url, headers=headers, timeout=30)
-            if response.status_code != 200 or not response.text: break
-            
-            page_soup = BeautifulSoup(response.text, 'html.parser')
-            new_posts = parse_posts_from_html(page_soup, base_url, fetch_time)
-            if not new_posts: break
-            all_posts.extend(new_posts)
-            time.sleep(0.5)
+            all_posts.extend(parse_overview_page(response.content, base_url, fetch_time))
+            if not all_posts: return []
+                
+            # Every day we want is known up front, so fetch them all at once
+            # and put the results back in date order afterwards.
+            last_date = datetime.strptime(all_posts[-1]['date'], '%Y-%m-%d')
+            dates = [(last_date - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(1, days_to_scrape + 1)]
+            posts_by_date = {}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_date = {
+                    executor.submit(fetch_day_posts, session, base_url, date_str, fetch_time): date_str
+                    for date_str in dates
+                }
+                for future in tqdm(as_completed(future_to_date), total=len(dates), desc="Scraping OneJAV"):
+                    date_str = future_to_date[future]
+                    try:
+                        posts_by_date[date_str] = future.result()
+                    except requests.exceptions.RequestException as e:
+                        print(f"[!] Failed to fetch OneJAV day {date_str}: {e}")
+                        posts_by_date[date_str] = None
+
+            # Keep the serial walk's semantics: stop at the first day with nothing to show.
+            for date_str in dates:
+                new_posts = posts_by_date[date_str]
+                if not new_posts: break
+                all_posts.extend(new_posts)
 
         return all_posts
     except Exception as e:
         print(f"[!] An error occurred during OneJAV scraping: {e}")
         return []
 
-if __name__ == '__main__':
+@instrumented('onejav')
+def main(argv=None):
+    """Runs one OneJAV crawl; `argv` defaults to the command line."""
+    parser = argparse.ArgumentParser(description="Scrape the OneJAV daily overview pages.")
+    parser.add_argument('--days', type=int, default=DAYS_TO_SCRAPE, help="Number of previous days to fetch.")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Day pages fetched concurrently.")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="Maximum requests per second to OneJAV.")
+    args = parser.parse_args(argv)
+
     print(f"--- Running OneJAV Scraper ---")
-    scraped_posts = scrape_all_posts(BASE_URL, DAYS_TO_SCRAPE)
+    scraped_posts = scrape_all_posts(BASE_URL, args.days, args.workers, args.rate)
 
-    # Use a set of links for efficient duplicate checking
-    unique_posts_map = {p['link']: p for p in scraped_posts}
-    
-    # Load existing posts to update the file correctly
-    if os.path.exists(POSTS_FILE):
-        with open(POSTS_FILE, 'r', encoding='utf-8') as f:
-            try:
-                existing_data = json.load(f)
-                if isinstance(existing_data, dict) and 'posts' in existing_data:
-                    existing_posts = existing_data.get('posts', [])
-                    for p in existing_posts:
-                        # Add existing posts to the map, only if not already scraped
-                        if p['link'] not in unique_posts_map:
-                             unique_posts_map[p['link']] = p
-            except (json.JSONDecodeError, AttributeError):
-                pass
-                
-    final_posts_list = list(unique_posts_map.values())
-    final_posts_list.sort(key=lambda x: x['post_fetched_date'], reverse=True)
+    store = PostStore('onejav', key='link', legacy_file=POSTS_FILE)
+    # Posts already in the store keep their original fetch date.
+    newly_added = store.append(reversed(scraped_posts))
     
-    print(f"\n-> Found {len(scraped_posts)} posts this run. Total unique posts are {len(final_posts_list)}.")
+    print(f"\n-> Found {len(scraped_posts)} posts this run, {len(newly_added)} of them new. Total unique posts are {len(store)}.")
+
+    if newly_added or not os.path.exists(POSTS_FILE):
+        final_posts_list = store.export_json(POSTS_FILE, sort_key=lambda x: x['post_fetched_date'], header={
+            "last_fetched": datetime.now(UTC).isoformat(),
+            "source_website": "OneJAV",
+        })
+        print(f"✅ Success! '{POSTS_FILE}' updated with {len(final_posts_list)} total posts.")
+    else:
+        print(f"--- No new posts found. '{POSTS_FILE}' is already up-to-date. ---")
 
-    final_data = {
-        "last_fetched": datetime.now(UTC).isoformat(),
-        "source_website": "OneJAV",
-        "total_videos": len(final_posts_list),
-        "posts": final_posts_list
-    }
-    with open(POSTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, ensure_ascii=False, indent=4)
-    print(f"✅ Success! '{POSTS_FILE}' updated with {len(final_posts_list)} total posts.")
+if __name__ == '__main__':
+    main()
@@ -1,101 +1,229 @@
+import argparse
 import json
 import os
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, UTC
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from flaresolverr_client import FlareSolverrClient
+from html_parsing import make_soup, only
+from instrumentation import instrumented, timed_parse
+from post_store import PostStore
+from rate_limit import HOST_POLICIES
 
 # --- Configuration ---
 FLARESOLVERR_URL = "http://localhost:8191/v1"
 START_URL = "https://missav.ws/en/playlists/dprelff6"
 POSTS_FILE = "docs/data/playlist.json"  # Output file for this script
-MAX_WORKERS = 11
+MAX_WORKERS = HOST_POLICIES["missav.ws"]["concurrency"]  # Upper bound on concurrent pages (and FlareSolverr sessions): what missav.ws allows; the client adapts below it
+STATE_FILE = "data/playlist_state.json"  # Per-playlist crawl high-water marks
+INCREMENTAL_WINDOW = 3  # Pages fetched in parallel per step of an incremental crawl
+REQUEUE_ROUNDS = 2  # Extra passes over pages whose fetch failed
 
-def load_existing_posts(filename):
+def load_crawl_state(filename):
     if not os.path.exists(filename):
-        return [], set()
+        return {}
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        if isinstance(data, dict) and 'posts' in data:
-            posts = data.get('posts', [])
-            links = {post.get('page_link') for post in posts}
-            print(f"-> Found {len(posts)} existing posts in '{filename}'.")
-            return posts, links
-    except (json.JSONDecodeError, KeyError):
-        print(f"[!] Error reading '{filename}'. Starting fresh.")
-    return [], set()
-
-def get_total_pages(start_url):
+        return data if isinstance(data, dict) else {}
+    except json.JSONDecodeError:
+        print(f"[!] Error reading '{filename}'. Ignoring saved crawl state.")
+        return {}
+
+def save_crawl_state(filename, state):
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=4)
+
+def parse_total_pages(html):
+    """Reads the page count from a playlist page's pagination links."""
+    soup = make_soup(html, parse_only=only('a', href=lambda href: href and '?page=' in href))
+    pagination_links = soup.select('a[href*="?page="]')
+    return int(pagination_links[-2].text.strip()) if pagination_links else 1
+
+@timed_parse
+def parse_playlist_page(html, post_fetch_time):
+    """Extracts the posts from one playlist page. Needs no network access."""
+    soup = make_soup(html, parse_only=only('li', class_='sm:flex'))
+    posts = []
+    for item in soup.find_all('li', class_='sm:flex'):
+        title_tag = item.find('label')
+        link_tag = item.find('a', href=True)
+        img_tag = item.find('img', {'data-src': True})
+        video_tag = item.find('video', {'data-src': True})
+        if all([title_tag, link_tag, img_tag, video_tag]):
+            posts.append({
+                "title": title_tag.text.strip(),
+                "page_link": link_tag['href'],
+                "cover_image_url": img_tag['data-src'],
+                "preview_video_url": video_tag['data-src'],
+                "post_fetched_date": post_fetch_time, # Standardized date field
+            })
+    return posts
+
+def get_total_pages(client, start_url):
     print("-> Discovering total pages for MissAV...")
-    payload = {'cmd': 'request.get', 'url': start_url, 'maxTimeout': 60000}
     try:
-        response = requests.post(FLARESOLVERR_URL, json=payload, timeout=90).json()
-        soup = BeautifulSoup(response["solution"]["response"], 'html.parser')
-        pagination_links = soup.select('a[href*="?page="]')
-        total_pages = int(pagination_links[-2].text.strip()) if pagination_links else 1
+        html = client.get(start_url)
+        if html is None:
+            raise ValueError("FlareSolverr could not solve the playlist page")
+        total_pages = parse_total_pages(html)
         print(f"-> Found {total_pages} total pages.")
         return total_pages
     except Exception as e:
         print(f"[!] Could not determine total pages: {e}")
         return None
 
-def fetch_single_page_posts(page_url):
-    payload = {'cmd': 'request.get', 'url': page_url, 'maxTimeout': 60000}
+def fetch_single_page_posts(client, page_url):
+    """Returns the posts on one playlist page, or None if the page could not be fetched."""
     try:
-        response = requests.post(FLARESOLVERR_URL, json=payload, timeout=90).json()
-        if response.get("status") != "ok": return []
-        
-        soup = BeautifulSoup(response["solution"]["response"], 'html.parser')
-        posts = []
+        html = client.get(page_url)
+        if html is None: return None
         # The fetch time is now recorded for each post
-        post_fetch_time = datetime.now(UTC).isoformat()
-        
-        for item in soup.find_all('li', class_='sm:flex'):
-            title_tag = item.find('label')
-            link_tag = item.find('a', href=True)
-            img_tag = item.find('img', {'data-src': True})
-            video_tag = item.find('video', {'data-src': True})
-            if all([title_tag, link_tag, img_tag, video_tag]):
-                posts.append({
-                    "title": title_tag.text.strip(),
-                    "page_link": link_tag['href'],
-                    "cover_image_url": img_tag['data-src'],
-                    "preview_video_url": video_tag['data-src'],
-                    "post_fetched_date": post_fetch_time, # Standardized date field
-                })
-        return posts
+        return parse_playlist_page(html, datetime.now(UTC).isoformat())
     except Exception:
-        return []
+        return None
+
+def fetch_pages(client, executor, page_urls, pbar=None):
+    """
+    Fetches pages concurrently. Pages whose fetch failed are put back in the
+    queue for up to REQUEUE_ROUNDS more passes, by which time the client has
+    usually lowered its concurrency to what FlareSolverr can handle.
+
+    Returns:
+        dict: page url -> posts, for every page that was fetched.
+    """
+    posts_by_url = {}
+    pending = list(page_urls)
+    for attempt in range(REQUEUE_ROUNDS + 1):
+        future_to_url = {executor.submit(fetch_single_page_posts, client, url): url for url in pending}
+        failed = set()
+        for future in as_completed(future_to_url):
+            url = future_to_url[future]
+            posts = future.result()
+            if posts is None:
+                failed.add(url)
+                continue
+            posts_by_url[url] = posts
+            if pbar is not None:
+                pbar.update(1)
+        if not failed:
+            break
+        pending = [url for url in pending if url in failed]
+        if attempt < REQUEUE_ROUNDS:
+            print(f"\n-> Requeueing {len(pending)} failed pages (concurrency now {client.concurrency}).")
+    else:
+        print(f"\n[!] {len(pending)} pages still failed after {REQUEUE_ROUNDS} requeues.")
+        if pbar is not None:
+            pbar.update(len(pending))
+    return posts_by_url
+
+def newest_link(posts_by_url, first_page_url):
+    """The first link on page 1, the newest post in the playlist, or None if page 1 was not fetched."""
+    posts = posts_by_url.get(first_page_url)
+    return posts[0]['page_link'] if posts else None
+
+def scrape_all_pages(client, start_url, total_pages):
+    """
+    Fetches every page of the playlist (full resync).
+
+    Returns the fetched posts, the number of pages requested and the newest
+    link (see newest_link()).
+    """
+    all_urls = [f"{start_url}?page={i}" for i in range(1, total_pages + 1)]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+            tqdm(total=len(all_urls), desc="Scraping MissAV") as pbar:
+        posts_by_url = fetch_pages(client, executor, all_urls, pbar)
+    # Keep playlist order so the first post is always the newest one.
+    all_fetched_posts = [post for url in all_urls for post in posts_by_url.get(url, [])]
+    return all_fetched_posts, total_pages, newest_link(posts_by_url, all_urls[0])
+
+def scrape_new_pages(client, start_url, total_pages, existing_links, high_water_mark=None):
+    """
+    Walks the playlist newest-first in small parallel windows and stops as soon
+    as a page holds only links we already have (or the saved high-water mark).
+
+    Returns the fetched posts, the number of pages that were requested and the
+    newest link (see newest_link()).
+    """
+    all_fetched_posts = []
+    pages_scanned = 0
+    newest = None
+    with ThreadPoolExecutor(max_workers=INCREMENTAL_WINDOW) as executor, \
+            tqdm(total=total_pages, desc="Scraping MissAV (incremental)") as pbar:
+        for window_start in range(1, total_pages + 1, INCREMENTAL_WINDOW):
+            window = range(window_start, min(window_start + INCREMENTAL_WINDOW, total_pages + 1))
+            window_urls = [f"{start_url}?page={i}" for i in window]
+            posts_by_url = fetch_pages(client, executor, window_urls, pbar)
+            results = [posts_by_url.get(url, []) for url in window_urls]
+            if window_start == 1:
+                newest = newest_link(posts_by_url, window_urls[0])
+            pages_scanned += len(results)
+
+            reached_known = False
+            for page_posts in results:
+                all_fetched_posts.extend(page_posts)
+                page_links = {p['page_link'] for p in page_posts}
+                # An empty page is either the end of the playlist or a page that kept
+                # failing; neither tells us we have caught up, so only non-empty pages count.
+                if page_links and (page_links <= existing_links or high_water_mark in page_links):
+                    reached_known = True
+            if reached_known:
+                break
+    return all_fetched_posts, pages_scanned, newest
+
+@instrumented('playlist')
+def main(argv=None, budget=None):
+    """Runs one MissAV crawl. `budget` is an optional semaphore shared with other FlareSolverr users."""
+    parser = argparse.ArgumentParser(description="Scrape a MissAV playlist via FlareSolverr.")
+    parser.add_argument('--full-resync', action='store_true',
+                        help="Fetch every playlist page instead of stopping at already known posts.")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     print(f"--- Running MissAV Playlist Scraper ---")
-    existing_posts, existing_links = load_existing_posts(POSTS_FILE)
-    total_pages = get_total_pages(START_URL)
-    
+    store = PostStore('playlist', key='page_link', legacy_file=POSTS_FILE)
+    existing_links = store.keys()
+    print(f"-> Found {len(existing_links)} existing posts in '{store.path}'.")
+    crawl_state = load_crawl_state(STATE_FILE)
+    playlist_state = crawl_state.get(START_URL, {})
+
+    with FlareSolverrClient(FLARESOLVERR_URL, pool_size=MAX_WORKERS, budget=budget) as client:
+        total_pages = get_total_pages(client, START_URL)
+        if total_pages:
+            if args.full_resync or not existing_links:
+                print("-> Running a full resync of every page.")
+                all_fetched_posts, pages_scanned, newest = scrape_all_pages(client, START_URL, total_pages)
+            else:
+                high_water_mark = playlist_state.get('high_water_mark')
+                all_fetched_posts, pages_scanned, newest = scrape_new_pages(client, START_URL, total_pages, existing_links, high_water_mark)
+                print(f"\n-> Stopped after {pages_scanned} of {total_pages} pages.")
+            print(f"-> FlareSolverr concurrency settled at {client.concurrency} of {MAX_WORKERS}.")
+
     if total_pages:
-        all_urls = [f"{START_URL}?page={i}" for i in range(1, total_pages + 1)]
-        all_fetched_posts = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_url = {executor.submit(fetch_single_page_posts, url): url for url in all_urls}
-            for future in tqdm(as_completed(future_to_url), total=len(all_urls), desc="Scraping MissAV"):
-                all_fetched_posts.extend(future.result())
-        
-        newly_added = [p for p in all_fetched_posts if p['page_link'] not in existing_links]
+        # Append oldest-first so the log keeps the order posts were added in.
+        newly_added = store.append(reversed(all_fetched_posts))
         print(f"\n-> Found {len(newly_added)} new posts from MissAV.")
-        
-        final_posts_list = existing_posts + newly_added
-        # Sort by the fetched date, newest first
-        final_posts_list.sort(key=lambda x: x['post_fetched_date'], reverse=True)
-
-        final_data = {
-            "last_fetched": datetime.now(UTC).isoformat(),
-            "source_website": "MissAV",
-            "total_videos": len(final_posts_list),
-            "posts": final_posts_list
+
+        # Only page 1 can move the mark: if it failed, the first post fetched is an older one.
+        if newest is None:
+            print("[!] Page 1 could not be fetched. Keeping the previous high-water mark.")
+        crawl_state[START_URL] = {
+            "high_water_mark": newest or playlist_state.get('high_water_mark'),
+            "total_pages": total_pages,
+            "pages_scanned": pages_scanned,
+            "last_crawled": datetime.now(UTC).isoformat(),
         }
-        with open(POSTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(final_data, f, ensure_ascii=False, indent=4)
-        print(f"✅ Success! '{POSTS_FILE}' updated with {len(final_posts_list)} total posts.")
+        save_crawl_state(STATE_FILE, crawl_state)
+
+        if newly_added or not os.path.exists(POSTS_FILE):
+            # Sort by the fetched date, newest first
+            final_posts_list = store.export_json(POSTS_FILE, sort_key=lambda x: x['post_fetched_date'], header={
+                "last_fetched": datetime.now(UTC).isoformat(),
+                "source_website": "MissAV",
+            })
+            print(f"✅ Success! '{POSTS_FILE}' updated with {len(final_posts_list)} total posts.")
+        else:
+            print(f"--- No new posts found. '{POSTS_FILE}' is already up-to-date. ---")
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import json
+import os
+
+# --- Configuration ---
+STORE_DIR = "data/store"  # Append-only post logs, one per source
+
+
+def dump_record(record):
+    """
+    Serializes one record as a single compact JSON line. Keys are sorted, so
+    a record is written the same way whichever scraper or import built it.
+    """
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def write_export(filename, posts, header=None):
+    """
+    Writes posts as the JSON file the site loads: compact, with one post per
+    line, so a new post shows up as a one-line change in git.
+
+    Args:
+        filename (str): Output path, e.g. docs/data/playlist.json.
+        posts (list[dict]): The posts, in the order the site shows them.
+        header (dict | None): Top-level fields; without it a bare list is written.
+
+    Returns:
+        bool: Whether the file changed.
+    """
+    lines = ',\n'.join(dump_record(post) for post in posts)
+    if header is None:
+        text = f"[\n{lines}\n]\n"
+    else:
+        head = dump_record({**header, "total_videos": len(posts)})[:-1]
+        text = f'{head},"posts":[\n{lines}\n]}}\n'
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+class PostStore:
+    """
+    Append-only NDJSON log of posts with an in-memory index keyed by link.
+
+    Every line of `data/store/<name>.ndjson` is one post. Posts are only ever
+    appended: a post that changed is written again, and the newest line for a
+    link wins. Daily runs therefore write only new or changed records, and the
+    site's JSON files are produced from the log by export_json(). compact()
+    folds the superseded lines away again.
+    """
+
+    def __init__(self, name, key, store_dir=STORE_DIR, legacy_file=None):
+        """
+        Args:
+            name (str): Log name, e.g. 'playlist' for data/store/playlist.ndjson.
+            key (str): The field that identifies a post ('link', 'page_link', 'url').
+            store_dir (str): Directory holding the logs.
+            legacy_file (str | None): An exported JSON file to import the first
+                time the log is created.
+        """
+        self.name = name
+        self.key = key
+        self.path = os.path.join(store_dir, f"{name}.ndjson")
+        self._index = None
+        if legacy_file and not os.path.exists(self.path):
+            self._import_legacy(legacy_file)
+
+    def _import_legacy(self, filename):
+        if not os.path.exists(filename):
+            return
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"[!] Error reading '{filename}'. Starting with an empty store.")
+            return
+        posts = data.get('posts', []) if isinstance(data, dict) else data
+        # Exports are newest-first; the log is in the order posts were first seen.
+        self.append(reversed(posts))
+        print(f"-> Imported {len(posts)} posts from '{filename}' into '{self.path}'.")
+
+    def _read(self):
+        """Yields every record in the log, oldest first."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A run that was killed mid-write can leave a truncated last line.
+                    print(f"[!] Skipping a malformed line in '{self.path}'.")
+
+    @property
+    def index(self):
+        """Maps each link to its newest record, in the order links were first seen."""
+        if self._index is None:
+            self._index = {}
+            for record in self._read():
+                self._index[record[self.key]] = record
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, link):
+        return link in self.index
+
+    def keys(self):
+        return set(self.index)
+
+    def get(self, link):
+        return self.index.get(link)
+
+    def _write(self, records):
+        if not records:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(dump_record(record) + '\n')
+        for record in records:
+            self.index[record[self.key]] = record
+
+    def append(self, posts):
+        """
+        Appends posts whose link is not in the store yet.
+
+        Returns:
+            list[dict]: The posts that were actually added.
+        """
+        added, seen = [], set()
+        for post in posts:
+            link = post.get(self.key)
+            if not link or link in self.index or link in seen:
+                continue
+            seen.add(link)
+            added.append(post)
+        self._write(added)
+        return added
+
+    def upsert(self, posts):
+        """
+        Appends posts that are new or differ from their stored version.
+
+        Returns:
+            list[dict]: The posts that were written.
+        """
+        changed = {}
+        for post in posts:
+            link = post.get(self.key)
+            if link and self.index.get(link) != post:
+                changed[link] = post
+        self._write(list(changed.values()))
+        return list(changed.values())
+
+    def posts(self, sort_key=None):
+        """
+        Returns the current posts, newest-first by first-seen order, then
+        (stably) sorted by `sort_key` descending if one is given.
+        """
+        posts = list(reversed(self.index.values()))
+        if sort_key:
+            posts.sort(key=sort_key, reverse=True)
+        return posts
+
+    def compact(self):
+        """
+        Rewrites the log with one line per link: its newest record, in the
+        order links were first seen. Changed posts thus stay on their line and
+        new ones still land at the end. Malformed lines are dropped.
+
+        Returns:
+            int | None: The number of lines removed, or None if the log was
+            already compact.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            before = f.read()
+        after = ''.join(dump_record(record) + '\n' for record in self.index.values())
+        if after == before:
+            return None
+        # Write beside the log and swap, so an interrupted run keeps the old one.
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(after)
+        os.replace(temp_path, self.path)
+        return len(before.splitlines()) - len(self.index)
+
+    def export_json(self, filename, sort_key=None, header=None):
+        """
+        Writes the posts as the JSON file the site loads (see write_export()).
+
+        Args:
+            filename (str): Output path, e.g. docs/data/playlist.json.
+            sort_key (callable | None): Sort key for newest-first ordering.
+            header (dict | None): Top-level fields; without it a bare list is written.
+        """
+        posts = self.posts(sort_key)
+        write_export(filename, posts, header)
+        return posts
@@ -0,0 +1,199 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+# --- Configuration ---
+HOST_POLICIES = {
+    # host -> requests per second, burst, and requests in flight at once. The
+    # scrapers size their worker and FlareSolverr pools from these caps.
+    "jav.guru": {"rate": 1.0, "burst": 1, "concurrency": 1},
+    "missav.ws": {"rate": 2.0, "burst": 4, "concurrency": 4},
+    "hanimes.org": {"rate": 2.0, "burst": 4, "concurrency": 4},
+    "fetch.mrspidyxd.workers.dev": {"rate": 8.0, "burst": 8, "concurrency": 8},
+}
+DEFAULT_POLICY = {"rate": 8.0, "burst": 8, "concurrency": 4}  # Any other host (image and video CDNs)
+RETRIES = 3
+BACKOFF_SECONDS = 1.0  # First retry waits about this long, doubling after each failure
+MAX_BACKOFF_SECONDS = 60.0  # Also caps how long a Retry-After is honoured
+RETRY_STATUSES = {429, 502, 503, 504}
+SLOWDOWN_FACTOR = 0.5  # A 429 multiplies the host's rate by this...
+MIN_RATE_FRACTION = 0.1  # ...down to this share of its configured rate
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `burst` requests and
+    refills at `rate` tokens per second.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_after(headers):
+    """The wait in seconds a Retry-After header asks for, or None."""
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def should_retry(response):
+    """
+    True for answers worth another try: 429 and 5xx gateway errors. A
+    Cloudflare challenge (a 503 from Cloudflare without Retry-After) would
+    only be served again, so it is not retried.
+    """
+    if response.status_code not in RETRY_STATUSES:
+        return False
+    if response.status_code == 503 and 'Retry-After' not in response.headers \
+            and response.headers.get('Server', '').lower() == 'cloudflare':
+        return False
+    return True
+
+
+class HostScheduler:
+    """
+    Paces every request of the process per host: a token bucket sets the
+    rate, a semaphore caps the requests in flight, and a 429 or Retry-After
+    holds back the whole host, not just the request that got it. Failed
+    requests are retried with jittered exponential backoff.
+
+        response = SCHEDULER.request(url, lambda: session.get(url, timeout=30))
+
+    Hosts use HOST_POLICIES, or DEFAULT_POLICY when not listed; configure()
+    overrides either (e.g. from a --rate flag).
+    """
+
+    def __init__(self, policies=HOST_POLICIES, default=DEFAULT_POLICY, retries=RETRIES,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+        self.policies = {host: dict(policy) for host, policy in policies.items()}
+        self.default = dict(default)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hosts = {}  # host -> {"policy", "bucket", "slots", "resume_at"}
+        self.lock = threading.Lock()
+
+    def configure(self, host=None, **policy):
+        """
+        Changes the rate, burst or concurrency of `host` (of hosts without
+        their own policy if None). Takes effect for hosts not yet contacted.
+        """
+        target = self.default if host is None else self.policies.setdefault(host, dict(self.default))
+        target.update({key: value for key, value in policy.items() if value is not None})
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                policy = {**self.default, **self.policies.get(host, {})}
+                state = self.hosts[host] = {
+                    "policy": policy,
+                    "bucket": TokenBucket(policy["rate"], policy["burst"]),
+                    "slots": threading.BoundedSemaphore(max(1, policy["concurrency"])),
+                    "resume_at": 0.0,
+                }
+        return state
+
+    @contextmanager
+    def slot(self, url):
+        """Holds one of the host's concurrency slots, entered once the host may be sent a request."""
+        state = self._host(url)
+        with state["slots"]:
+            while True:
+                with self.lock:
+                    wait = state["resume_at"] - time.monotonic()
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+            state["bucket"].acquire()
+            yield
+
+    def hold(self, url, seconds):
+        """Sends nothing more to the host of `url` for `seconds`."""
+        state = self._host(url)
+        with self.lock:
+            state["resume_at"] = max(state["resume_at"], time.monotonic() + seconds)
+
+    def slow_down(self, url):
+        """Lowers the host's rate after a 429, so the rest of the run stays under its limit."""
+        state = self._host(url)
+        bucket, floor = state["bucket"], state["policy"]["rate"] * MIN_RATE_FRACTION
+        with bucket.lock:
+            bucket.rate = max(floor, bucket.rate * SLOWDOWN_FACTOR)
+
+    def backoff_delay(self, attempt, base=None):
+        """Exponential backoff with jitter: between half and all of base * 2**attempt, capped."""
+        delay = min(self.max_backoff, (self.backoff if base is None else base) * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, url, send, on_retry=None):
+        """
+        Calls send() (which makes one request to `url` and returns the
+        response) in one of the host's slots, retrying timeouts, connection
+        errors and should_retry() answers up to `retries` times.
+
+        Args:
+            on_retry (callable | None): Called with (error, response) before each retry.
+
+        Returns:
+            The last response; the last error is raised if no attempt got one.
+        """
+        for attempt in range(self.retries + 1):
+            error = response = None
+            with self.slot(url):
+                try:
+                    response = send()
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    error = e
+            if attempt == self.retries or (error is None and not should_retry(response)):
+                if error is not None:
+                    raise error
+                return response
+            delay = self.backoff_delay(attempt)
+            if response is not None:
+                wait = retry_after(response.headers)
+                if response.status_code == 429:
+                    self.slow_down(url)
+                if wait is not None or response.status_code == 429:
+                    # The host asked everyone to wait, not just this request.
+                    delay = min(self.max_backoff, wait) if wait is not None else delay
+                    self.hold(url, delay)
+                response.close()
+            if on_retry:
+                on_retry(error, response)
+            time.sleep(delay)
+
+
+SCHEDULER = HostScheduler()
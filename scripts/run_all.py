@@ -0,0 +1,210 @@
+"""
+Runs every enabled scraper concurrently, then the link checker, the data
+compaction and the site build, and writes one run report with timings and
+per-source metrics.
+
+    python scripts/run_all.py                 # everything in SCRAPER_CONFIG
+    python scripts/run_all.py onejav javguru  # only these sources
+
+Each source runs in its own forked process: the modules are imported once
+here, a crash or hang in one source cannot take the others down, and a
+source that overruns its timeout is stopped. The two FlareSolverr users share
+one semaphore, so together they never have more than FLARESOLVERR_BUDGET
+solves in flight.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from datetime import datetime, UTC
+
+import build_site
+import compact_data
+import hanime_index
+import javguru_index
+import link_checker
+import onejav_index
+import playlist_index
+import thumbnails
+from instrumentation import METRICS_DIR
+from post_store import dump_record
+
+# --- Configuration ---
+# Sources to scrape. "args" are passed to the scraper's main() as if given on
+# its command line; "flaresolverr" sources share the FlareSolverr budget.
+SCRAPER_CONFIG = {
+    "onejav": {"enabled": True, "module": onejav_index, "args": [], "timeout": 15 * 60, "flaresolverr": False},
+    "javguru": {"enabled": True, "module": javguru_index, "args": [], "timeout": 15 * 60, "flaresolverr": False},
+    "hanime": {"enabled": True, "module": hanime_index, "args": [], "timeout": 60 * 60, "flaresolverr": True},
+    "playlist": {"enabled": True, "module": playlist_index, "args": [], "timeout": 60 * 60, "flaresolverr": True},
+}
+# Solves in flight across all FlareSolverr users. FlareSolverr drives one
+# browser tab per solve, and the workflow's runner (2 CPUs) copes with about
+# 4 at once; that is fewer than the users' own limits add up to (4 + 3 for
+# playlist and hanime), so they share it.
+FLARESOLVERR_BUDGET = 4
+STOP_GRACE_SECONDS = 30  # Time a timed-out source gets to clean up before it is killed
+REPORT_FILE = "data/run_report.json"  # Timings plus each source's metrics, for the latest run
+HISTORY_FILE = "data/run_history.ndjson"  # One summary line per run, to compare runs over time
+THUMBNAILS_ENABLED = False  # Cover thumbnails in docs/thumbs (needs Pillow; adds up to thumbnails.MAX_TOTAL_MB to the site)
+
+
+def _run_source(name, config, budget):
+    """Child process body: runs one scraper and exits 0 on success."""
+    # Turn the runner's SIGTERM into SystemExit so `with` blocks still close
+    # FlareSolverr sessions and files on a timeout.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(124))
+    try:
+        if config["flaresolverr"]:
+            config["module"].main(config["args"], budget=budget)
+        else:
+            config["module"].main(config["args"])
+    except Exception:
+        print(f"[!] Source '{name}' failed:")
+        traceback.print_exc()
+        sys.exit(1)
+
+
+def run_sources(names):
+    """
+    Runs the given sources concurrently.
+
+    Returns:
+        list[dict]: One {name, status, seconds} entry per source, where status
+        is 'ok', 'failed' or 'timeout'.
+    """
+    context = multiprocessing.get_context('fork')
+    budget = context.BoundedSemaphore(FLARESOLVERR_BUDGET)
+    running = {}
+    for name in names:
+        config = SCRAPER_CONFIG[name]
+        process = context.Process(target=_run_source, args=(name, config, budget), name=name)
+        process.start()
+        running[name] = (process, time.monotonic())
+
+    results = {}
+    while running:
+        for name, (process, started) in list(running.items()):
+            elapsed = time.monotonic() - started
+            if not process.is_alive():
+                process.join()
+                status = "ok" if process.exitcode == 0 else "failed"
+            elif elapsed > SCRAPER_CONFIG[name]["timeout"]:
+                print(f"[!] Source '{name}' exceeded {SCRAPER_CONFIG[name]['timeout']}s. Stopping it.")
+                process.terminate()
+                process.join(STOP_GRACE_SECONDS)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                status = "timeout"
+            else:
+                continue
+            results[name] = {"name": name, "status": status, "seconds": round(elapsed, 1)}
+            del running[name]
+        time.sleep(0.2)
+    return [results[name] for name in names]
+
+
+def run_stage(name, function):
+    """Runs a post-processing stage in this process, isolating its failure."""
+    started = time.monotonic()
+    try:
+        function()
+        status = "ok"
+    except Exception:
+        print(f"[!] Stage '{name}' failed:")
+        traceback.print_exc()
+        status = "failed"
+    return {"name": name, "status": status, "seconds": round(time.monotonic() - started, 1)}
+
+
+def load_metrics(name):
+    """Reads the metrics report a source process left in METRICS_DIR, if any."""
+    path = os.path.join(METRICS_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def history_entry(report):
+    """The few numbers per step worth keeping for every run."""
+    steps = []
+    for step in report["steps"]:
+        entry = dict(step)
+        metrics = report["sources"].get(step["name"])
+        if metrics:
+            backends = metrics["backends"].values()
+            entry["requests"] = sum(b["requests"] for b in backends)
+            entry["failed"] = sum(b["failed"] for b in backends)
+            entry["p95_ms"] = max((b["latency_ms"]["p95"] for b in backends), default=0)
+            entry["posts"] = metrics["parse"]["posts"]
+        steps.append(entry)
+    return {"started": report["started"], "wall_seconds": report["wall_seconds"], "steps": steps}
+
+
+def write_report(started_at, wall_seconds, results):
+    report = {
+        "started": started_at.isoformat(),
+        "wall_seconds": round(wall_seconds, 1),
+        "steps": results,
+        "sources": {},
+    }
+    for result in results:
+        metrics = load_metrics(result["name"])
+        if metrics:
+            report["sources"][result["name"]] = metrics
+    os.makedirs(os.path.dirname(REPORT_FILE) or '.', exist_ok=True)
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(dump_record(history_entry(report)) + '\n')
+
+    print("\n--- Run summary ---")
+    for step in history_entry(report)["steps"]:
+        line = f"{step['name']:<14} {step['status']:<8} {step['seconds']:>8.1f}s"
+        if "requests" in step:
+            line += f" {step['requests']:>6} requests, {step['failed']} failed, p95 {step['p95_ms']:.0f} ms, {step['posts']} posts parsed"
+        print(line)
+    print(f"{'total':<14} {'':<8} {wall_seconds:>8.1f}s (wall clock)")
+    print(f"-> Report written to '{REPORT_FILE}'.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the enabled scrapers concurrently, then build the site.")
+    parser.add_argument('sources', nargs='*', help="Sources to run (default: every enabled source).")
+    parser.add_argument('--skip-link-check', action='store_true', help="Do not re-check media links.")
+    parser.add_argument('--thumbnails', action='store_true', default=THUMBNAILS_ENABLED,
+                        help="Make cover thumbnails before the site build.")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.sources if name not in SCRAPER_CONFIG]
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(unknown)}")
+    names = args.sources or [name for name, config in SCRAPER_CONFIG.items() if config["enabled"]]
+    for name in names:
+        # A source that dies before writing its metrics must not report last run's.
+        stale = os.path.join(METRICS_DIR, f"{name}.json")
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    started_at = datetime.now(UTC)
+    start = time.monotonic()
+    print(f"--- Running {len(names)} sources concurrently: {', '.join(names)} ---")
+    results = run_sources(names)
+    if not args.skip_link_check:
+        results.append(run_stage("link_checker", lambda: link_checker.main([])))
+    if args.thumbnails:
+        results.append(run_stage("thumbnails", lambda: thumbnails.main([])))
+    results.append(run_stage("compact_data", lambda: compact_data.main([])))
+    results.append(run_stage("build_site", build_site.main))
+    write_report(started_at, time.monotonic() - start, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
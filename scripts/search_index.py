@@ -0,0 +1,134 @@
+import re
+
+# Same pattern as extractJavCode() in docs/index.html.
+JAV_CODE_RE = re.compile(r'([A-Z]{2,5})-?(\d{3,5})', re.IGNORECASE)
+TOKEN_RE = re.compile(r'[^\W_]+')
+FORMAT = "search-v2"
+GRAM = 3  # Trigrams narrow a lookup down to the tokens worth checking
+
+
+def extract_jav_code(title):
+    """Returns the display form of the JAV code in a title (e.g. 'PLA-062'), or ''."""
+    match = JAV_CODE_RE.search(title or '')
+    return f"{match.group(1).upper()}-{match.group(2)}" if match else ''
+
+
+def tokenize(text):
+    """Lowercased letter/digit runs; the viewer tokenizes queries the same way."""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def document_tokens(title, code, extra=()):
+    tokens = set(tokenize(title))
+    for value in extra:
+        tokens.update(tokenize(value))
+    if code:
+        letters, digits = code.lower().split('-')
+        # 'pla062' finds 'PLA-062' and '300MIUM1227'-style titles.
+        tokens.update((letters, digits, letters + digits))
+    return tokens
+
+
+def build_search_index(sources, title_of, extra_of=None):
+    """
+    Builds an inverted index from title tokens to documents.
+
+    Post k of source s, counting from the source's oldest post, is document
+    k * len(sources) + s. New posts therefore only add ids at the end of the
+    postings, and the rest of the index keeps its bytes from build to build.
+    The viewer maps an id back to a post with the per-source counts, so the
+    data needs no ids of its own.
+
+    Args:
+        sources (list[tuple[str, list[dict]]]): (source name, posts) pairs,
+            each newest first as exported.
+        title_of (callable): Returns the searchable title of a post.
+        extra_of (callable | None): Returns more searchable strings (e.g. genres).
+
+    Returns:
+        dict: The JSON-serializable index. 'tokens' is the sorted vocabulary,
+        'postings' holds the gap-encoded document ids for each token and
+        'codes' the JAV code of each post, per source and oldest first.
+    """
+    codes = []
+    postings = {}
+    for position, (_, posts) in enumerate(sources):
+        source_codes = []
+        for k, post in enumerate(reversed(posts)):
+            title = title_of(post)
+            code = extract_jav_code(title)
+            source_codes.append(code)
+            doc_id = k * len(sources) + position
+            for token in document_tokens(title, code, extra_of(post) if extra_of else ()):
+                postings.setdefault(token, []).append(doc_id)
+        codes.append(source_codes)
+
+    tokens = sorted(postings)
+    encoded = []
+    for token in tokens:
+        ids = sorted(postings[token])
+        encoded.append([ids[0]] + [b - a for a, b in zip(ids, ids[1:])])
+    return {
+        "format": FORMAT,
+        "sources": [{"name": name, "count": len(posts)} for name, posts in sources],
+        "codes": codes,
+        "tokens": tokens,
+        "postings": encoded,
+    }
+
+
+def locate(index, doc_id):
+    """Maps a document id to (source name, index of the post in that source's export)."""
+    sources = index["sources"]
+    source = sources[doc_id % len(sources)]
+    return source["name"], source["count"] - 1 - doc_id // len(sources)
+
+
+def token_trigrams(tokens):
+    """
+    Maps every 3-character run to the positions of the vocabulary tokens
+    containing it. The viewer builds the same map when it first searches.
+    """
+    grams = {}
+    for i, token in enumerate(tokens):
+        for k in range(len(token) - GRAM + 1):
+            positions = grams.setdefault(token[k:k + GRAM], [])
+            if not positions or positions[-1] != i:
+                positions.append(i)
+    return grams
+
+
+def matching_tokens(tokens, grams, term):
+    """
+    The positions of the tokens containing `term`. Only the tokens sharing
+    the term's rarest trigram are checked; a term shorter than a trigram is
+    looked for in the whole vocabulary.
+    """
+    if len(term) < GRAM:
+        return [i for i, token in enumerate(tokens) if term in token]
+    candidates = min((grams.get(term[k:k + GRAM], []) for k in range(len(term) - GRAM + 1)), key=len)
+    return [i for i in candidates if term in tokens[i]]
+
+
+def search(index, query, grams=None):
+    """
+    Reference implementation of the viewer's lookup: returns the ids of
+    documents that have, for every query token, a token containing it, in
+    post order (source after source, newest first).
+
+    Args:
+        grams (dict | None): token_trigrams() of the index, if already built.
+    """
+    tokens, postings = index["tokens"], index["postings"]
+    grams = token_trigrams(tokens) if grams is None else grams
+    result = None
+    for term in tokenize(query):
+        matches = set()
+        for i in matching_tokens(tokens, grams, term):
+            doc = 0
+            for gap in postings[i]:
+                doc += gap
+                matches.add(doc)
+        result = matches if result is None else result & matches
+    count = len(index["sources"])
+    return sorted(result or (), key=lambda doc: (doc % count, -doc))
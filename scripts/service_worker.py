@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import re
+
+# --- Configuration ---
+DOCS_DIR = "docs"
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sw_template.js")
+PAGES = ["index.html", "hanime.html"]  # Their scripts, styles and fonts make up the app shell
+THUMB_CACHE_ENTRIES = 600  # Thumbnails the worker keeps, most recently used first
+DATA_CACHE_ENTRIES = 200  # Manifests, shards and deltas the worker keeps
+
+# <script src="..."> and <link ... href="..."> in the pages, and CSS @import url(...)
+ASSET_RE = re.compile(r'<(?:script|link)\b[^>]*?\b(?:src|href)="([^"]+)"')
+IMPORT_RE = re.compile(r"@import url\(['\"]?([^'\")]+)")
+
+
+def shell_assets(docs_dir=DOCS_DIR, pages=PAGES):
+    """
+    Lists what the pages need to start: the pages themselves, their local
+    scripts and styles, and the CDN assets they reference.
+
+    Returns:
+        tuple[list[str], list[str]]: Local paths relative to docs_dir, and CDN URLs.
+    """
+    local, remote = ["./"], []
+    for page in pages:
+        path = os.path.join(docs_dir, page)
+        if not os.path.exists(path):
+            continue
+        local.append(page)
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        for url in ASSET_RE.findall(html) + IMPORT_RE.findall(html):
+            if url.startswith(('http://', 'https://')):
+                remote.append(url)
+            elif not url.startswith(('data:', '#')) and os.path.exists(os.path.join(docs_dir, url)):
+                local.append(url)
+    return list(dict.fromkeys(local)), list(dict.fromkeys(remote))
+
+
+def build_service_worker(docs_dir=DOCS_DIR):
+    """
+    Writes docs/sw.js from the template. Its VERSION hashes the shell's
+    contents, so any change to a page or script installs a new shell.
+
+    Returns:
+        tuple[str, int, int]: The version and the number of local and CDN assets.
+    """
+    local, remote = shell_assets(docs_dir)
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        template = f.read()
+    digest = hashlib.sha1(template.encode('utf-8'))
+    for path in local:
+        if path != "./":
+            with open(os.path.join(docs_dir, path), 'rb') as f:
+                digest.update(f.read())
+    digest.update(json.dumps([remote, THUMB_CACHE_ENTRIES, DATA_CACHE_ENTRIES]).encode('utf-8'))
+    version = digest.hexdigest()[:12]
+
+    values = {
+        "__VERSION__": version,
+        "__PRECACHE__": local,
+        "__CDN_ASSETS__": remote,
+        "__THUMB_CACHE_ENTRIES__": THUMB_CACHE_ENTRIES,
+        "__DATA_CACHE_ENTRIES__": DATA_CACHE_ENTRIES,
+    }
+    source = template
+    for placeholder, value in values.items():
+        source = source.replace(placeholder, json.dumps(value))
+    with open(os.path.join(docs_dir, "sw.js"), 'w', encoding='utf-8') as f:
+        f.write(source)
+    return version, len(local), len(remote)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+
+from catalogue import encode_catalogue, normalize_code, standardize_post
+
+# --- Configuration ---
+FORMAT = "shards-v2"
+PAGE_SIZE = 52  # Posts per shard; the viewer shows one shard per page
+MIN_HEAD_SIZE = PAGE_SIZE // 2  # A smaller head shard joins the shard below it
+
+
+def view_key(source_website):
+    """The viewer's key for a source view, e.g. 'JAV.Guru' -> 'javguru'."""
+    return source_website.lower().replace('.', '', 1)
+
+
+def source_items(posts, source_website):
+    """
+    One catalogue item per post of a single source, newest first, without
+    merging, so a source view shows exactly that source's posts. Record
+    indexes count from the source's oldest post (see build_views()).
+    """
+    items = []
+    for i, post in enumerate(posts):
+        standard = standardize_post(post, source_website)
+        item = {
+            "code": normalize_code(standard["title"]),
+            "title": standard["title"] or '',
+            "cover_image_url": standard["cover_image_url"],
+            "preview_video_url": standard["preview_video_url"],
+            "post_fetched_date": standard["post_fetched_date"],
+            "records": [[0, len(posts) - 1 - i, standard["page_link"]]],
+        }
+        if "thumbnail" in standard:
+            item["thumbnail"] = standard["thumbnail"]
+        items.append(item)
+    # Stable, so posts fetched together keep their file order.
+    items.sort(key=lambda item: item["post_fetched_date"], reverse=True)
+    return items
+
+
+def build_views(catalogue_header, catalogue_items, sources):
+    """
+    Lists the views the viewer offers: 'all' (the merged catalogue) and one
+    per source.
+
+    The exports are newest first, so a record's index into its source file
+    shifts with every new post. In the views it counts from the source's
+    oldest post instead, which keeps the shards of older posts unchanged.
+
+    Args:
+        catalogue_header (dict): From catalogue.build_catalogue().
+        catalogue_items (list[dict]): From catalogue.build_catalogue().
+        sources (list[tuple[str, dict, list[dict]]]): (name, header, posts) per source.
+
+    Returns:
+        dict: view key -> (label, catalogue header, items), in button order.
+    """
+    counts = [len(posts) for _, _, posts in sources]
+    all_items = [{**item, "records": [[s, counts[s] - 1 - i, link] for s, i, link in item["records"]]}
+                 for item in catalogue_items]
+    views = {"all": ("All Sources", catalogue_header, all_items)}
+    for name, header, posts in sources:
+        source_website = header.get('source_website', 'Unknown')
+        views[view_key(source_website)] = (source_website, {
+            "catalogue": catalogue_header["catalogue"],
+            "last_fetched": header.get('last_fetched'),
+            "sources": [{"name": name, "source_website": source_website, "count": len(posts)}],
+        }, source_items(posts, source_website))
+    return views
+
+
+def shard_header(header):
+    """
+    The part of a view's header every shard repeats: the format and the
+    source names. Totals and fetch times change with every run, so they
+    live in the manifest only.
+    """
+    return {
+        "catalogue": header["catalogue"],
+        "sources": [{"name": source["name"], "source_website": source["source_website"]}
+                    for source in header["sources"]],
+    }
+
+
+def paginate(header, items, page_size=PAGE_SIZE, min_head=MIN_HEAD_SIZE):
+    """
+    Yields the shards of a view (items newest first) as encoded catalogue
+    documents, numbered from the oldest post: shard 1 holds the oldest
+    page_size items and the last one, the head, the newest. Each shard
+    lists its items newest first. New posts thus only change the head shard
+    and the one below it, and older shards stay byte for byte the same from
+    run to run.
+
+    The viewer loads the head first, so a head of fewer than `min_head`
+    items is merged into the shard below it rather than leaving a cold load
+    a second request for a screenful; the head then holds up to
+    page_size + min_head - 1 items.
+    """
+    header = shard_header(header)
+    oldest_first = items[::-1]
+    starts = list(range(0, len(items), page_size))
+    if len(starts) > 1 and len(items) - starts[-1] < min_head:
+        starts.pop()
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(items)
+        yield encode_catalogue(header, oldest_first[start:end][::-1])
+
+
+def build_manifest(views, pages, page_size=PAGE_SIZE):
+    """
+    The small document the viewer loads first: per view its label, totals,
+    page count and last_fetched. 'version' changes whenever any shard does,
+    so the viewer can fetch shards with it as a cache buster.
+
+    Args:
+        views (dict): From build_views().
+        pages (dict): view key -> list of encoded shard documents, oldest first.
+    """
+    digest = hashlib.sha1()
+    for key in views:
+        for page in pages[key]:
+            digest.update(json.dumps(page, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    fetched = [header.get('last_fetched') for _, header, _ in views.values() if header.get('last_fetched')]
+    return {
+        "format": FORMAT,
+        "version": digest.hexdigest()[:12],
+        "page_size": page_size,
+        "last_fetched": max(fetched) if fetched else None,
+        "views": {
+            key: {"label": label, "total": len(items), "pages": len(pages[key]), "last_fetched": header.get('last_fetched')}
+            for key, (label, header, items) in views.items()
+        },
+    }
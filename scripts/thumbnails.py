@@ -0,0 +1,325 @@
+"""
+Optional stage: downloads the cover images and writes small WebP thumbnails
+into docs/thumbs, so the viewer's grid loads a few KiB per card from the site
+itself instead of full-size covers from third-party hosts.
+
+    python scripts/thumbnails.py             # fetch what is missing, then evict
+    python scripts/thumbnails.py --max-mb 10 # a smaller cap
+
+Thumbnails are content-addressed: docs/thumbs/<hh>/<sha1 of the original>-<width>.webp,
+so covers that several URLs share are stored once. data/store/thumbs.ndjson
+maps each cover URL to its hash. The total size is capped at MAX_TOTAL_MB:
+covers are ranked by how close their post is to the top of its source, and
+the thumbnails that no longer fit (or are no longer used) are deleted.
+
+Needs Pillow; without it the stage is skipped and the viewer keeps using the
+original covers.
+"""
+import argparse
+import glob
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, UTC
+
+import requests
+from tqdm import tqdm
+
+from link_checker import load_dead_links
+from post_store import STORE_DIR, PostStore
+from rate_limit import SCHEDULER
+
+# Pillow is optional; without it no thumbnails are made.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# --- Configuration ---
+THUMB_STORE = "thumbs"  # data/store/thumbs.ndjson, one record per cover URL
+THUMBS_DIR = "docs/thumbs"  # Served with the site; posts reference "thumbs/<hh>/<hash>"
+THUMBNAIL_SOURCES = {
+    # store name -> the key of its posts and the field holding the cover URL
+    "javguru": {"key": "link", "field": "image_source"},
+    "onejav": {"key": "link", "field": "image_source"},
+    "playlist": {"key": "page_link", "field": "cover_image_url"},
+    "hanime": {"key": "url", "field": "image_url"},
+}
+THUMB_WIDTHS = (320, 640)  # Derivatives per cover, for srcset; index.html uses the same widths
+WEBP_QUALITY = 75
+# Thumbnails kept in docs/thumbs; the lowest-ranked covers are evicted past this.
+# They are committed with the site, and every evicted file stays in the git
+# history, so the cap is kept to what the first pages need: at about 50 KiB
+# per cover (both widths), 20 MB covers roughly the first two pages of every
+# source. Posts further down keep their original covers.
+MAX_TOTAL_MB = 20
+MAX_IMAGE_BYTES = 8 * 1024 * 1024  # Larger downloads are abandoned
+FAILED_RETRY_DAYS = 7  # A cover that failed is tried again after this
+FETCH_BATCH = 200  # Covers fetched between two checks of the size cap
+MAX_WORKERS = 16
+REQUESTS_PER_SECOND = 8  # Per host
+REQUEST_TIMEOUT = 20
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def thumb_base(digest):
+    """The path a post references, relative to docs/: 'thumbs/ab/ab12...'."""
+    return f"thumbs/{digest[:2]}/{digest}"
+
+
+def thumb_path(digest, width, thumbs_dir=THUMBS_DIR):
+    return os.path.join(thumbs_dir, digest[:2], f"{digest}-{width}.webp")
+
+
+def render_thumbnails(data, digest, thumbs_dir=THUMBS_DIR):
+    """
+    Writes one WebP per THUMB_WIDTHS width from the original image bytes.
+    Covers narrower than a width are not upscaled.
+
+    Returns:
+        int: The bytes written.
+    """
+    image = Image.open(io.BytesIO(data))
+    # Lets JPEG decoding skip detail the largest thumbnail does not need.
+    image.draft('RGB', (max(THUMB_WIDTHS), max(THUMB_WIDTHS) * 2))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    os.makedirs(os.path.join(thumbs_dir, digest[:2]), exist_ok=True)
+    written = 0
+    for width in THUMB_WIDTHS:
+        thumb = image.copy()
+        thumb.thumbnail((width, width * 2))
+        path = thumb_path(digest, width, thumbs_dir)
+        # Two URLs with the same content may be rendered at once; never share a temp file.
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        thumb.save(temp, 'WEBP', quality=WEBP_QUALITY, method=6)
+        os.replace(temp, path)
+        written += os.path.getsize(path)
+    return written
+
+
+class ThumbnailMaker:
+    """Downloads covers over pooled connections, rate limited per host, and renders their thumbnails."""
+
+    def __init__(self, thumbs_dir=THUMBS_DIR, max_workers=MAX_WORKERS,
+                 requests_per_second=REQUESTS_PER_SECOND, timeout=REQUEST_TIMEOUT):
+        self.thumbs_dir = thumbs_dir
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Cover hosts have no policy of their own; this sets theirs.
+        SCHEDULER.configure(rate=requests_per_second)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def download(self, url):
+        """Returns the image bytes, or None if the request failed or the body is too large."""
+        try:
+            response = SCHEDULER.request(url, lambda: self.session.get(url, stream=True, timeout=self.timeout))
+            with response:
+                if response.status_code != 200:
+                    return None
+                chunks, size = [], 0
+                for chunk in response.iter_content(64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        return None
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except requests.RequestException:
+            return None
+
+    def make(self, url):
+        """
+        Downloads one cover and makes its thumbnails, unless a cover with the
+        same content already has them.
+
+        Returns:
+            tuple[str, int] | None: The content hash and the thumbnails' total
+            size, or None if the cover could not be fetched or decoded.
+        """
+        data = self.download(url)
+        if not data:
+            return None
+        digest = hashlib.sha1(data).hexdigest()
+        paths = [thumb_path(digest, width, self.thumbs_dir) for width in THUMB_WIDTHS]
+        if all(os.path.exists(path) for path in paths):
+            return digest, sum(os.path.getsize(path) for path in paths)
+        try:
+            return digest, render_thumbnails(data, digest, self.thumbs_dir)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Not an image Pillow can read (HTML error pages, truncated files).
+            return None
+
+    def make_many(self, urls, desc="Making thumbnails"):
+        """Yields (url, result of make()) pairs as the covers complete."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_url = {executor.submit(self.make, url): url for url in urls}
+            for future in tqdm(as_completed(future_to_url), total=len(future_to_url), desc=desc):
+                yield future_to_url[future], future.result()
+
+
+def cover_urls(store_dir=STORE_DIR, dead=frozenset()):
+    """
+    Collects the cover URLs of every source, ranked by the position of their
+    post within its source (newest first), so each source's first pages come
+    first. Dead covers are left out.
+    """
+    ranked = []
+    for order, (name, config) in enumerate(THUMBNAIL_SOURCES.items()):
+        for rank, post in enumerate(PostStore(name, config["key"], store_dir=store_dir).posts()):
+            url = post.get(config["field"])
+            if isinstance(url, str) and url.startswith(('http://', 'https://')) and url not in dead:
+                ranked.append((rank, order, url))
+    ranked.sort()
+    return list(dict.fromkeys(url for _, _, url in ranked))
+
+
+def needs_fetch(record, now, thumbs_dir=THUMBS_DIR):
+    """True for a cover never fetched, evicted, missing on disk, or failed long enough ago."""
+    if record is None or record["status"] == "evicted":
+        return True
+    if record["status"] == "failed":
+        return datetime.fromisoformat(record["checked"]) + timedelta(days=FAILED_RETRY_DAYS) <= now
+    return not all(os.path.exists(thumb_path(record["hash"], width, thumbs_dir)) for width in THUMB_WIDTHS)
+
+
+def plan_fetches(batch, store, kept, total, cap, now, thumbs_dir=THUMBS_DIR):
+    """
+    The covers of `batch` (best-ranked first) to fetch before the cap is
+    checked. A cover fetched before, kept or evicted, has a known size, so
+    it counts against the cap up front, and planning stops at the first one
+    that no longer fits: a cover evicted for lack of room is not downloaded
+    again only to be evicted once more. Covers of unknown size are fetched,
+    and main() checks the cap once their size is known.
+
+    Args:
+        kept (dict): Content hash -> bytes of the thumbnails kept so far.
+        total (int): Their total size.
+    """
+    todo, planned = [], set(kept)
+    for url in batch:
+        record = store.get(url)
+        if record and record["status"] in ("ok", "evicted") and record["hash"] not in planned:
+            if total + record["bytes"] > cap:
+                break
+            planned.add(record["hash"])
+            total += record["bytes"]
+        if needs_fetch(record, now, thumbs_dir):
+            todo.append(url)
+    return todo
+
+
+def fetched_record(url, result, previous, now):
+    if result is None:
+        failures = (previous or {}).get("failures", 0) + 1
+        return {"url": url, "status": "failed", "hash": None, "bytes": 0, "failures": failures, "checked": now.isoformat()}
+    digest, size = result
+    return {"url": url, "status": "ok", "hash": digest, "bytes": size, "failures": 0, "checked": now.isoformat()}
+
+
+def evict(store, kept, thumbs_dir=THUMBS_DIR):
+    """
+    Deletes every thumbnail whose hash is not in `kept` and marks the covers
+    that used it as evicted.
+
+    Returns:
+        int: The number of covers (content hashes) deleted.
+    """
+    deleted = set()
+    for path in glob.glob(os.path.join(thumbs_dir, "*", "*.webp")):
+        digest = os.path.basename(path).rsplit('-', 1)[0]
+        if digest not in kept:
+            os.remove(path)
+            deleted.add(digest)
+    store.upsert([{**record, "status": "evicted"} for record in store.index.values()
+                  if record["status"] == "ok" and record["hash"] not in kept])
+    return len(deleted)
+
+
+def load_thumbnails(store_dir=STORE_DIR, thumbs_dir=THUMBS_DIR):
+    """Maps each cover URL with thumbnails on disk to its thumb_base()."""
+    store = PostStore(THUMB_STORE, "url", store_dir=store_dir)
+    return {url: thumb_base(record["hash"]) for url, record in store.index.items()
+            if record["status"] == "ok" and os.path.exists(thumb_path(record["hash"], THUMB_WIDTHS[0], thumbs_dir))}
+
+
+def attach_thumbnails(name, posts, thumbnails):
+    """
+    Sets 'thumbnail' on the posts of one source whose cover has thumbnails,
+    unless the link checker found the cover dead.
+
+    Returns:
+        int: The number of posts with a thumbnail.
+    """
+    config = THUMBNAIL_SOURCES.get(name)
+    if not config or not thumbnails:
+        return 0
+    attached = 0
+    for post in posts:
+        base = thumbnails.get(post.get(config["field"]))
+        if base and config["field"] not in (post.get("dead_links") or []):
+            post["thumbnail"] = base
+            attached += 1
+    return attached
+
+
+def main(argv=None):
+    """Fetches the missing thumbnails that fit the size cap; `argv` defaults to the command line."""
+    parser = argparse.ArgumentParser(description="Make WebP thumbnails of the cover images.")
+    parser.add_argument('--max-mb', type=float, default=MAX_TOTAL_MB, help="Size cap for docs/thumbs.")
+    parser.add_argument('--limit', type=int, help="Fetch at most this many covers in this run.")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Concurrent downloads.")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="Requests per second per host.")
+    args = parser.parse_args(argv)
+
+    print("--- Making cover thumbnails ---")
+    if Image is None:
+        print("[!] Pillow is not installed. Skipping thumbnails.")
+        return
+    now = datetime.now(UTC)
+    store = PostStore(THUMB_STORE, "url")
+    urls = cover_urls(dead=load_dead_links())
+    cap = args.max_mb * 1024 * 1024
+    budget = args.limit if args.limit is not None else len(urls)
+    maker = ThumbnailMaker(max_workers=args.workers, requests_per_second=args.rate)
+
+    # Walk the covers best-ranked first, fetching what is missing, until the cap is reached.
+    kept, total, fetched, failed = {}, 0, 0, 0
+    for start in range(0, len(urls), FETCH_BATCH):
+        batch = urls[start:start + FETCH_BATCH]
+        todo = plan_fetches(batch, store, kept, total, cap, now)[:budget]
+        budget -= len(todo)
+        if todo:
+            store.upsert([fetched_record(url, result, store.get(url), now) for url, result in maker.make_many(todo)])
+        fetched += len(todo)
+        full = False
+        for url in batch:
+            record = store.get(url)
+            if not record or record["status"] != "ok":
+                failed += bool(record and url in todo)
+                continue
+            if record["hash"] in kept:
+                continue
+            if total + record["bytes"] > cap:
+                full = True
+                break
+            kept[record["hash"]] = record["bytes"]
+            total += record["bytes"]
+        if full:
+            print(f"-> Reached the {args.max_mb:g} MiB cap.")
+            break
+
+    deleted = evict(store, kept)
+    print(f"-> Fetched {fetched} covers ({failed} failed); evicted {deleted} thumbnails.")
+    print(f"✅ {len(kept)} thumbnails kept for {len(urls)} covers, {total / 1024 / 1024:.1f} MiB.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1 @@
-python scripts/onejav_index.py
-python scripts/javguru_index.py
-python scripts/hanime_index.py
-python scripts/playlist_index.py
\ No newline at end of file
+python scripts/run_all.py
@@ -0,0 +1,105 @@
+"""
+Shared fixtures. The scripts run from the repo root with scripts/ on the
+path, so the tests do the same.
+
+`serve` starts a local http.server in a thread and returns its base URL;
+the sites and services the scrapers talk to are stood in for this way, so
+no test needs the network. FakeFlareSolverr answers the FlareSolverr API.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from rate_limit import SCHEDULER  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Hands every request to the server's `respond(handler)` callable."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _dispatch(self):
+        self.server.respond(self)
+
+    do_GET = do_HEAD = do_POST = _dispatch
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=b'', headers=None, content_type='application/octet-stream'):
+        """Writes a complete response (headers only for HEAD)."""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+
+class FakeFlareSolverr:
+    """
+    Answers the FlareSolverr API like the real service, solving every page
+    unless `solve(url, session)` returns a different answer.
+    """
+
+    def __init__(self, solve=None):
+        self.solve = solve or (lambda url, session: None)
+        self.calls = []  # (cmd, session, url, time)
+        self.lock = threading.Lock()
+
+    def __call__(self, handler):
+        payload = json.loads(handler.rfile.read(int(handler.headers['Content-Length'])))
+        with self.lock:
+            self.calls.append((payload['cmd'], payload.get('session'), payload.get('url'), time.monotonic()))
+        if payload['cmd'] == 'request.get':
+            answer = self.solve(payload['url'], payload.get('session')) or {
+                'status': 'ok',
+                'solution': {'status': 200, 'headers': {}, 'response': f"<html>{payload['url']}</html>"},
+            }
+        else:
+            answer = {'status': 'ok'}
+        handler.send(200, json.dumps(answer).encode('utf-8'), content_type='application/json')
+
+    def commands(self, cmd):
+        return [call for call in self.calls if call[0] == cmd]
+
+
+@pytest.fixture(autouse=True)
+def scheduler():
+    """Undoes what a test configured on the shared per-host scheduler."""
+    saved = SCHEDULER.default.copy(), {host: dict(policy) for host, policy in SCHEDULER.policies.items()}
+    yield SCHEDULER
+    SCHEDULER.default, SCHEDULER.policies = saved
+    SCHEDULER.hosts.clear()
+
+
+@pytest.fixture
+def serve():
+    """
+    Starts stub servers for the test: serve(respond) returns the base URL,
+    e.g. 'http://127.0.0.1:43121', of a server calling respond(handler).
+    """
+    servers = []
+
+    def start(respond):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.daemon_threads = True
+        server.respond = respond
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,40 @@
+import gzip
+import json
+import random
+
+from build_site import gzip_stable
+
+
+def listing(count, seed=0):
+    rng = random.Random(seed)
+    return [{"title": f"[ABC-{n:03d}] {rng.random()}", "page_link": f"https://example.test/{n}"} for n in range(count)]
+
+
+def common_prefix(a, b):
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+
+def test_gzip_stable_round_trips_and_is_deterministic():
+    raw = json.dumps(listing(2000), separators=(',', ':')).encode('utf-8')
+    assert gzip.decompress(gzip_stable(raw)) == raw
+    assert gzip_stable(raw) == gzip_stable(raw)
+    assert gzip.decompress(gzip_stable(b'')) == b''
+
+
+def test_gzip_stable_keeps_the_bytes_around_an_edit():
+    posts = listing(4000)
+    before = gzip_stable(json.dumps(posts, separators=(',', ':')).encode('utf-8'))
+    posts.insert(2000, {"title": "[NEW-001] inserted", "page_link": "https://example.test/new"})
+    after = gzip_stable(json.dumps(posts, separators=(',', ':')).encode('utf-8'))
+
+    head = common_prefix(before, after)
+    # The last 8 bytes are the CRC and length, which always change.
+    tail = common_prefix(before[-9::-1], after[-9::-1])
+    assert head > len(before) * 0.3 and tail > len(before) * 0.3
+    # Plain gzip shares nothing after the edit.
+    plain = [gzip.compress(json.dumps(p, separators=(',', ':')).encode('utf-8'), mtime=0)
+             for p in (posts[:2000] + posts[2001:], posts)]
+    assert common_prefix(plain[0][-9::-1], plain[1][-9::-1]) < 100
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+import bulk_missav  # noqa: E402
+
+PACKED = ("<script>eval(function(p,a,c,k,e,d){{}}('0://1.2/{0}/3.4',5,5,'https|cdn|test|playlist|m3u8'.split('|')))"
+          "</script>")
+
+
+class VideoPages:
+    """Serves /v<n> with one packed playlist link each; v3 shares v1's link."""
+
+    def __init__(self):
+        self.requested = []
+
+    def __call__(self, handler):
+        self.requested.append(handler.path)
+        n = int(handler.path[2:])
+        key = 'a1' if n == 3 else f'a{n}'
+        handler.send(200, f"<html><body>{PACKED.format(key)}</body></html>".encode('utf-8'), content_type='text/html')
+
+
+@pytest.fixture
+def site(serve, tmp_path, monkeypatch):
+    """A stub site whose /v1 .. /v5 are listed in tmp_path/urls.txt, fetched with plain requests sessions."""
+    pages = VideoPages()
+    base_url = serve(pages)
+    (tmp_path / "urls.txt").write_text("".join(f"{base_url}/v{n}\n" for n in range(1, 6)))
+    monkeypatch.setattr(bulk_missav.cloudscraper, "create_scraper", requests.Session)
+    return pages
+
+
+def run(tmp_path, **kwargs):
+    """Runs bulk_missav.main() with one worker and returns the output file's lines."""
+    bulk_missav.main(str(tmp_path / "urls.txt"), str(tmp_path / "out.txt"), workers=1, rate=1000, **kwargs)
+    return (tmp_path / "out.txt").read_text().splitlines()
+
+
+def test_an_interrupted_run_resumes_from_its_checkpoint(site, tmp_path, monkeypatch):
+    find = bulk_missav.find_m3u8_in_url
+
+    def killed_at_v3(url, session):
+        if url.endswith("/v3"):
+            raise KeyboardInterrupt
+        return find(url, session)
+
+    monkeypatch.setattr(bulk_missav, "find_m3u8_in_url", killed_at_v3)
+    with pytest.raises(KeyboardInterrupt):
+        run(tmp_path)
+    checkpoint = tmp_path / "out.txt.checkpoint"
+    assert [line.rsplit('/', 1)[1] for line in checkpoint.read_text().splitlines()] == ["v1", "v2"]
+
+    monkeypatch.setattr(bulk_missav, "find_m3u8_in_url", find)
+    site.requested.clear()
+    links = run(tmp_path)
+
+    assert site.requested == ["/v3", "/v4", "/v5"]
+    assert links == [f"https://cdn.test/a{n}/playlist.m3u8" for n in (1, 2, 4, 5)]  # v3's link is not repeated
+    assert not checkpoint.exists()
+
+
+def test_restart_ignores_the_checkpoint(site, tmp_path):
+    (tmp_path / "out.txt.checkpoint").write_text("".join(f"{line}\n" for line in (tmp_path / "urls.txt").read_text().split()))
+    (tmp_path / "out.txt").write_text("stale\n")
+
+    links = run(tmp_path, restart=True)
+
+    assert len(site.requested) == 5 and "stale" not in links and len(links) == 4
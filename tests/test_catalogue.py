@@ -0,0 +1,82 @@
+import pytest
+
+from catalogue import build_catalogue, decode_catalogue, encode_catalogue, normalize_code
+
+
+@pytest.mark.parametrize("title, code", [
+    ("PLA-062 Some title", "PLA-062"),
+    ("[PLA-062] Some title", "PLA-062"),
+    ("PLA062 (2.1 GB)", "PLA-062"),
+    ("pla-062 lowercase", "PLA-062"),
+    ("[ssis-001] Lowercase in brackets", "SSIS-001"),
+    ("SSIS-001-UNCENSORED-LEAK", "SSIS-001"),
+    ("SSIS-001-C Chinese subtitles", "SSIS-001"),
+    ("ssis001c", "SSIS-001"),
+    ("ABC-00123", "ABC-123"),
+    ("ABC-12", ""),  # Too few digits to be a code
+    ("Ane Koi Episode 2", ""),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_code(title, code):
+    assert normalize_code(title) == code
+
+
+def source(name, website, *posts, last_fetched=None):
+    header = {"source_website": website}
+    if last_fetched:
+        header["last_fetched"] = last_fetched
+    return name, header, list(posts)
+
+
+def test_posts_with_the_same_code_merge_and_the_newest_wins():
+    sources = [
+        source("javguru", "JAV.Guru",
+               {"title": "[SSIS-001] Older title", "link": "https://jav.guru/ssis-001", "image_source": "https://jav.guru/1.jpg",
+                "post_fetched_date": "2026-01-01"},
+               last_fetched="2026-01-01T00:00:00"),
+        source("playlist", "MissAV",
+               {"title": "ssis-001-uncensored Newer title", "page_link": "https://missav.ws/ssis-001", "cover_image_url": None,
+                "preview_video_url": "https://missav.ws/ssis-001.mp4", "post_fetched_date": "2026-02-01"},
+               {"title": "Untitled clip", "page_link": "https://missav.ws/clip", "post_fetched_date": "2026-03-01"},
+               last_fetched="2026-03-01T00:00:00"),
+    ]
+
+    header, items = build_catalogue(sources)
+
+    assert [item["code"] for item in items] == ["", "SSIS-001"]  # Newest first; a codeless post stays on its own
+    merged = items[1]
+    assert merged["title"] == "ssis-001-uncensored Newer title"
+    assert merged["post_fetched_date"] == "2026-02-01"
+    # The newest post has no cover, so the cover comes from the next one that has.
+    assert merged["cover_image_url"] == "https://jav.guru/1.jpg"
+    assert merged["preview_video_url"] == "https://missav.ws/ssis-001.mp4"
+    assert merged["records"] == [[1, 0, "https://missav.ws/ssis-001"], [0, 0, "https://jav.guru/ssis-001"]]
+    assert header["last_fetched"] == "2026-03-01T00:00:00"
+    assert [s["count"] for s in header["sources"]] == [1, 2]
+
+
+def test_ties_keep_source_order_and_repeated_links_are_listed_once():
+    same_day = "2026-01-01"
+    sources = [
+        source("javguru", "JAV.Guru", {"title": "ABP-123 first", "link": "https://a.test/abp-123", "post_fetched_date": same_day}),
+        source("onejav", "OneJAV", {"title": "ABP123 second", "link": "https://b.test/abp123", "post_fetched_date": same_day},
+               {"title": "ABP123 again", "link": "https://b.test/abp123", "post_fetched_date": same_day}),
+    ]
+
+    _, items = build_catalogue(sources)
+
+    assert len(items) == 1
+    assert items[0]["title"] == "ABP-123 first"
+    assert items[0]["records"] == [[0, 0, "https://a.test/abp-123"], [1, 0, "https://b.test/abp123"]]
+
+
+def test_the_catalogue_round_trips_through_its_encoding():
+    sources = [source("javguru", "JAV.Guru",
+                      *[{"title": f"[ABC-{n:03d}] t", "link": f"https://a.test/{n}", "post_fetched_date": f"2026-01-{n + 1:02d}"}
+                        for n in range(5)])]
+    header, items = build_catalogue(sources)
+
+    decoded_header, decoded = decode_catalogue(encode_catalogue(header, items))
+
+    assert decoded == items and decoded_header == header
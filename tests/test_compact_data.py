@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import tarfile
+from datetime import datetime, UTC
+
+import compact_data
+from compact_data import compact_stores, write_snapshot
+
+
+def test_compact_stores_keeps_the_newest_record_in_first_seen_order(tmp_path, capsys):
+    store = tmp_path / "store"
+    store.mkdir()
+    lines = [
+        '{"page_link":"b","title":"B"}',
+        '{"title":"A","page_link":"a"}',
+        '{"page_link":"b","title":"B, renamed"}',
+        '{"page_link":"c"',  # Truncated by a killed run
+    ]
+    (store / "playlist.ndjson").write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (store / "unknown.ndjson").write_text('{"x":1}\n{"x":1}\n', encoding='utf-8')
+
+    compact_stores(str(store))
+    compacted = (store / "playlist.ndjson").read_bytes()
+    compact_stores(str(store))
+
+    assert compacted.decode('utf-8').splitlines() == [
+        '{"page_link":"b","title":"B, renamed"}',
+        '{"page_link":"a","title":"A"}',
+    ]
+    assert (store / "playlist.ndjson").read_bytes() == compacted  # A second run changes nothing
+    assert (store / "unknown.ndjson").read_text(encoding='utf-8') == '{"x":1}\n{"x":1}\n'
+    assert "No key configured" in capsys.readouterr().out
+
+
+def commit_files(repo, files):
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    env = {"GIT_AUTHOR_DATE": "2026-01-31T12:00:00Z", "GIT_COMMITTER_DATE": "2026-01-31T12:00:00Z"}
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "data"],
+                   cwd=repo, check=True, env={**os.environ, **env})
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def test_write_snapshot_archives_only_the_source_data_sorted_and_byte_stable(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    commit = commit_files(repo, {
+        "docs/data/playlist.json": '[\n{"page_link":"a"}\n]\n',
+        "docs/data/hanime.json": '[\n{"url":"h"}\n]\n',
+        "docs/data/playlist.min.json": '{}',
+        "docs/data/search-index.json": '{}',
+        "docs/data/hanime-search-index.json": '{}',
+        "docs/data/shards/manifest.json": '{}',
+        "data/store/playlist.ndjson": '{"page_link":"a"}\n',
+        "scripts/run_all.py": '',
+    })
+    monkeypatch.chdir(repo)
+    when = datetime(2026, 1, 31, 12, tzinfo=UTC)
+
+    count = write_snapshot(str(tmp_path / "first.tar.gz"), "2026-01", commit, when)
+    write_snapshot(str(tmp_path / "second.tar.gz"), "2026-01", commit, when)
+
+    assert (tmp_path / "first.tar.gz").read_bytes() == (tmp_path / "second.tar.gz").read_bytes()
+    with tarfile.open(tmp_path / "first.tar.gz") as archive:
+        names = archive.getnames()
+        info = json.load(archive.extractfile("snapshot.json"))
+        playlist = archive.extractfile("docs/data/playlist.json").read()
+    expected = ["data/store/playlist.ndjson", "docs/data/hanime.json", "docs/data/playlist.json"]
+    assert count == 3 and names == ["snapshot.json", *expected]
+    assert info["files"] == expected and info["commit"] == commit
+    assert playlist == b'[\n{"page_link":"a"}\n]\n'
+
+
+def test_search_indexes_count_as_derived():
+    assert not compact_data.is_snapshot_path("docs/data/search-index.json")
+    assert not compact_data.is_snapshot_path("docs/data/hanime-search-index.json")
+    assert compact_data.is_snapshot_path("docs/data/hanime.json")
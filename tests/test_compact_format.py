@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from compact_format import decode_posts, encode_posts
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+EXPORTS = ["javguru", "onejav", "playlist", "hanime"]
+DATA_LOADER = os.path.join(ROOT, 'docs', 'js', 'data-loader.js')
+
+# Decodes the document in argv[2] with the viewer's decodeCompact() and prints the result.
+NODE_DECODE = """
+const fs = require('fs');
+global.window = global;
+eval(fs.readFileSync(process.argv[1], 'utf8'));
+const decoded = DataLoader.decodeCompact(JSON.parse(fs.readFileSync(process.argv[2], 'utf8')));
+process.stdout.write(JSON.stringify(decoded));
+"""
+
+
+def load_export(name):
+    with open(os.path.join(ROOT, 'docs', 'data', f"{name}.json"), encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {}, data
+    return {k: v for k, v in data.items() if k != 'posts'}, data['posts']
+
+
+def minified(document):
+    """The document as build_site writes and the viewer reads it."""
+    return json.loads(json.dumps(document, ensure_ascii=False, separators=(',', ':')))
+
+
+@pytest.mark.parametrize("name", EXPORTS)
+def test_real_exports_round_trip(name):
+    header, posts = load_export(name)
+    document = minified(encode_posts(posts, header))
+
+    assert decode_posts(document) == (header, posts)
+    assert len(json.dumps(document, separators=(',', ':'))) < len(json.dumps(posts, separators=(',', ':')))
+
+
+def test_missing_fields_and_nulls_stay_apart():
+    posts = [{"link": "https://a.test/1/cover.jpg", "title": None},
+             {"link": None, "extra": 1},
+             {"title": "t"}]
+    assert decode_posts(minified(encode_posts(posts))) == ({}, posts)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node is not installed")
+@pytest.mark.parametrize("name", ["playlist", "hanime"])
+def test_the_viewer_decodes_the_same_layout(name, tmp_path):
+    header, posts = load_export(name)
+    path = tmp_path / f"{name}.min.json"
+    path.write_text(json.dumps(encode_posts(posts, header), ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+
+    output = subprocess.run(["node", "-e", NODE_DECODE, DATA_LOADER, str(path)],
+                            check=True, capture_output=True, text=True).stdout
+
+    assert json.loads(output) == {**header, "posts": posts}
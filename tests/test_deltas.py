@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from compact_format import encode_posts
+from deltas import build_delta, build_manifest, diff_list, version_of
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_LOADER = os.path.join(ROOT, 'docs', 'js', 'data-loader.js')
+DATA_SYNC = os.path.join(ROOT, 'docs', 'js', 'data-sync.js')
+HEADER = {"source_website": "MissAV"}
+
+# Runs DataSync.load(['playlist']) against the files in argv[3], with the
+# copy in argv[4] already stored, and prints the result, the fetched URLs and
+# what was stored afterwards.
+NODE_SYNC = """
+const fs = require('fs');
+const path = require('path');
+global.window = global;
+const [loaderJs, syncJs, dataDir, storedPath] = process.argv.slice(1);
+const fetched = [];
+global.fetch = async (url) => {
+    fetched.push(url);
+    const file = path.join(dataDir, url.replace(/^data\\//, ''));
+    if (url.endsWith('.gz') || !fs.existsSync(file)) return { ok: false, status: 404 };
+    const text = fs.readFileSync(file, 'utf8');
+    return { ok: true, json: async () => JSON.parse(text) };
+};
+const store = { playlist: JSON.parse(fs.readFileSync(storedPath, 'utf8')) };
+const request = (result) => {
+    const r = { result };
+    setTimeout(() => r.onsuccess && r.onsuccess());
+    return r;
+};
+const db = {
+    transaction: () => ({ objectStore: () => ({
+        get: key => request(store[key]),
+        put: (value, key) => { store[key] = value; return request(); },
+    }) }),
+    close() {},
+};
+global.indexedDB = { open: () => request(db) };
+console.warn = () => {};
+eval(fs.readFileSync(loaderJs, 'utf8'));
+eval(fs.readFileSync(syncJs, 'utf8'));
+DataSync.load(['playlist']).then(({ lists, restored }) => {
+    process.stdout.write(JSON.stringify({ restored, posts: lists.playlist.posts, fetched, stored: store.playlist }));
+});
+"""
+
+
+def posts(*links):
+    return [{"page_link": link, "title": link.upper()} for link in links]
+
+
+def apply(old, ops, rows):
+    """Rebuilds the new list from a diff the way the viewer does."""
+    items, rows = [], list(rows)
+    for op in ops:
+        if op[0] == 0:
+            items.extend(old[op[1]:op[2]])
+        else:
+            items.extend(rows[:op[1]])
+            del rows[:op[1]]
+    return items
+
+
+def test_diff_list_detects_added_removed_and_changed_posts():
+    old = posts("a", "b", "c", "d")
+    new = posts("new", "a", "c", "d")
+    new[2]["title"] = "C, retitled"
+
+    ops, rows, removed = diff_list(old, new)
+
+    assert rows == [new[0], new[2]]
+    assert removed == ["b"]  # A changed post is replaced, not removed
+    assert apply(old, ops, rows) == new
+    assert diff_list(new, new) == ([[0, 0, 4]], [], [])
+
+
+def test_a_shifted_catalogue_record_index_is_not_a_change():
+    old = [{"code": "ABC-001", "title": "t", "records": [[0, 5, "https://a.test/1"]]}]
+    new = [{"code": "ABC-001", "title": "t", "records": [[0, 6, "https://a.test/1"]]}]
+
+    assert diff_list(old, new) == ([[0, 0, 1]], [], [])
+
+
+def versions():
+    """Three builds of one list: two posts, then one more, then one fewer."""
+    return [{"playlist": (HEADER, posts(*links))} for links in (["a", "b"], ["c", "a", "b"], ["c", "b"])]
+
+
+def test_the_manifest_chains_consecutive_deltas():
+    v0, v1, v2 = versions()
+    first = build_manifest(None, build_delta(v0, v1), v1)
+    second = build_manifest(first, build_delta(v1, v2), v2)
+
+    assert [(link["from"], link["to"]) for link in second["chain"]] == [
+        (version_of(v0), version_of(v1)), (version_of(v1), version_of(v2))]
+    assert second["version"] == version_of(v2) and second["lists"] == {"playlist": 2}
+    assert build_manifest(second, None, v2)["chain"] == second["chain"]  # Nothing changed
+    assert build_manifest(second, build_delta(v1, v2), v2, max_deltas=1)["chain"] == [second["chain"][-1]]
+
+
+def test_a_delta_that_does_not_start_at_the_last_version_starts_a_new_chain():
+    v0, v1, v2 = versions()
+    first = build_manifest(None, build_delta(v0, v1), v1)
+
+    # The build before this one left no trace, so this delta starts from v0.
+    manifest = build_manifest(first, build_delta(v0, v2), v2)
+
+    assert [(link["from"], link["to"]) for link in manifest["chain"]] == [(version_of(v0), version_of(v2))]
+    assert build_manifest({**first, "format": "deltas-v0"}, build_delta(v1, v2), v2)["chain"] == \
+        [{"from": version_of(v1), "to": version_of(v2), "file": f"{version_of(v2)}.min.json"}]
+
+
+def write_site(data_dir, chain_versions, current):
+    """Writes the full list and the deltas between consecutive `chain_versions`."""
+    (data_dir / "deltas").mkdir(parents=True)
+    (data_dir / "playlist.min.json").write_text(json.dumps(encode_posts(current["playlist"][1], HEADER)))
+    manifest = None
+    for before, after in zip(chain_versions, chain_versions[1:]):
+        delta = build_delta(before, after)
+        (data_dir / "deltas" / f"{delta['to']}.min.json").write_text(json.dumps(delta))
+        manifest = build_manifest(manifest, delta, after)
+    (data_dir / "deltas" / "manifest.json").write_text(json.dumps(manifest))
+
+
+def sync(tmp_path, stored_version):
+    stored_path = tmp_path / "stored.json"
+    header, items = stored_version["playlist"]
+    stored_path.write_text(json.dumps({"version": version_of(stored_version), "lists": {"playlist": {**header, "posts": items}}}))
+    output = subprocess.run(["node", "-e", NODE_SYNC, DATA_LOADER, DATA_SYNC, str(tmp_path / "data"), str(stored_path)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node is not installed")
+def test_the_viewer_follows_an_intact_chain(tmp_path):
+    v0, v1, v2 = versions()
+    write_site(tmp_path / "data", [v0, v1, v2], v2)
+
+    result = sync(tmp_path, v0)
+
+    assert result["restored"] and result["posts"] == v2["playlist"][1]
+    assert "data/playlist.min.json" not in result["fetched"]
+    assert result["stored"]["version"] == version_of(v2)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node is not installed")
+def test_the_viewer_loads_everything_when_the_chain_is_broken(tmp_path):
+    v0, v1, v2 = versions()
+    write_site(tmp_path / "data", [v1, v2], v2)  # The chain no longer reaches v0
+
+    result = sync(tmp_path, v0)
+
+    assert not result["restored"] and result["posts"] == v2["playlist"][1]
+    assert "data/playlist.min.json" in result["fetched"]
+    assert not any(url.startswith("data/deltas/") and "manifest" not in url for url in result["fetched"])
+    assert result["stored"]["version"] == version_of(v2)  # The next visit can take deltas again
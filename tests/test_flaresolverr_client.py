@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from conftest import FakeFlareSolverr
+from flaresolverr_client import AIMDLimiter, FlareSolverrClient
+
+
+def test_sequential_requests_reuse_one_warm_session(serve):
+    fake = FakeFlareSolverr()
+    with FlareSolverrClient(f"{serve(fake)}/v1", pool_size=4, backoff=0) as client:
+        pages = [client.get(f"https://reuse.test/page/{n}") for n in range(6)]
+
+    assert pages == [f"<html>https://reuse.test/page/{n}</html>" for n in range(6)]
+    assert len(fake.commands('sessions.create')) == 1
+    assert len({session for _, session, _, _ in fake.commands('request.get')}) == 1
+    assert len(fake.commands('sessions.destroy')) == 1  # On close()
+
+
+def test_failed_solve_is_retried_on_a_fresh_session(serve):
+    failed = []
+
+    def solve(url, session):
+        if not failed:
+            failed.append(session)
+            return {'status': 'error', 'message': 'Error solving the challenge. Timeout after 60.0 seconds.'}
+        return None
+
+    fake = FakeFlareSolverr(solve)
+    with FlareSolverrClient(f"{serve(fake)}/v1", pool_size=1, retries=1, backoff=0) as client:
+        assert client.get("https://fresh.test/") == "<html>https://fresh.test/</html>"
+
+    first, second = [session for _, session, _, _ in fake.commands('request.get')]
+    assert first == failed[0] and second != first
+    assert [session for _, session, _, _ in fake.commands('sessions.destroy')][0] == first
+
+
+def test_aimd_limiter_halves_once_per_burst():
+    limiter = AIMDLimiter(8, initial=8, latency_target=60)
+    burst = [limiter.acquire() for _ in range(4)]
+    for started in burst:
+        limiter.release(started, ok=False)
+    assert limiter.limit == 4  # Not 0.5: the burst started before the first decrease
+
+    limiter.release(limiter.acquire(), ok=False)
+    assert limiter.limit == 2  # A solve started after the decrease may decrease again
+
+    limiter.release(limiter.acquire(), ok=True)
+    assert limiter.limit == pytest.approx(2.5)
+
+
+def test_client_halves_its_concurrency_once_for_a_burst_of_timeouts(serve):
+    def solve(url, session):
+        time.sleep(0.2)  # Keep the whole burst in flight together
+        return {'status': 'error', 'message': 'Error solving the challenge. Timeout after 60.0 seconds.'}
+
+    fake = FakeFlareSolverr(solve)
+    with FlareSolverrClient(f"{serve(fake)}/v1", pool_size=4, retries=0, use_sessions=False) as client:
+        client.limiter = AIMDLimiter(4, initial=4)
+        results = dict(client.get_many([f"https://burst.test/{n}" for n in range(4)]))
+        assert set(results.values()) == {None}
+        assert client.concurrency == 2
+
+
+def test_429_with_retry_after_holds_back_the_whole_host(serve):
+    limited = []
+
+    def solve(url, session):
+        if url.endswith('/first') and not limited:
+            limited.append(url)
+            return {'status': 'ok', 'solution': {'status': 429, 'headers': {'Retry-After': '1'}, 'response': 'slow down'}}
+        return None
+
+    fake = FakeFlareSolverr(solve)
+    with FlareSolverrClient(f"{serve(fake)}/v1", pool_size=2, retries=1, backoff=0, use_sessions=False) as client:
+        first = threading.Thread(target=client.get, args=("https://held.test/first",))
+        first.start()
+        time.sleep(0.2)  # The 429 has come back by now
+        assert client.get("https://held.test/second") == "<html>https://held.test/second</html>"
+        first.join()
+
+    solves = fake.commands('request.get')
+    limited_at = solves[0][3]
+    later = [(url, at) for _, _, url, at in solves[1:]]
+    assert sorted(url for url, _ in later) == ["https://held.test/first", "https://held.test/second"]
+    assert all(at - limited_at >= 0.9 for _, at in later)
@@ -0,0 +1,101 @@
+import os
+from datetime import datetime, timedelta, UTC
+
+import hanime_index
+from hanime_index import LINK_TTL_SPREAD, LinkCache, crawl_listing, refresh_older_posts
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'hanime_listing.html')
+TTL = timedelta(days=30)
+NEGATIVE_TTL = timedelta(days=1)
+
+
+class FakeResolver:
+    """Records the posts handed to it instead of resolving them."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, posts):
+        self.submitted.extend(posts)
+        return len(posts)
+
+
+def cache(tmp_path):
+    return LinkCache(str(tmp_path / "links.json"), TTL, NEGATIVE_TTL)
+
+
+def test_resolved_links_are_trusted_for_the_ttl(tmp_path):
+    links = cache(tmp_path)
+    now = datetime.now(UTC)
+    links.put("https://hanimes.org/fresh", "https://cdn.test/fresh.mp4", now - TTL * (1 - LINK_TTL_SPREAD) + timedelta(hours=1))
+    links.put("https://hanimes.org/stale", "https://cdn.test/stale.mp4", now - TTL - timedelta(hours=1))
+
+    assert links.get("https://hanimes.org/fresh") == "https://cdn.test/fresh.mp4"
+    assert links.get("https://hanimes.org/stale") is None
+    assert links.get("https://hanimes.org/unknown") is None
+
+
+def test_failed_links_are_retried_after_the_negative_ttl(tmp_path):
+    links = cache(tmp_path)
+    now = datetime.now(UTC)
+    links.put("https://hanimes.org/recent", "N/A", now - NEGATIVE_TTL + timedelta(hours=1))
+    links.put("https://hanimes.org/older", "Error", now - NEGATIVE_TTL - timedelta(hours=1))
+
+    assert links.get("https://hanimes.org/recent") == "N/A"
+    assert links.get("https://hanimes.org/older") is None
+
+
+def test_evict_keeps_only_the_listed_posts_and_survives_a_reload(tmp_path):
+    links = cache(tmp_path)
+    for name in ("a", "b", "c"):
+        links.put(f"https://hanimes.org/{name}", f"https://cdn.test/{name}.mp4")
+
+    assert links.evict({"https://hanimes.org/a", "https://hanimes.org/c"}) == 1
+    links.save()
+    reloaded = cache(tmp_path)
+    reloaded.seed([{"url": "https://hanimes.org/b", "direct_video_link": "https://cdn.test/b.mp4"}])
+
+    assert sorted(reloaded.entries) == ["https://hanimes.org/a", "https://hanimes.org/c"]
+
+
+def test_delisted_posts_are_evicted_and_not_resolved_again(tmp_path):
+    links = cache(tmp_path)
+    long_ago = datetime.now(UTC) - 2 * TTL
+    existing = [{"url": f"https://hanimes.org/{name}", "direct_video_link": f"https://cdn.test/{name}.mp4"}
+                for name in ("listed", "older", "delisted")]
+    for post in existing:
+        links.put(post["url"], post["direct_video_link"], long_ago)
+    listed = [existing[0]]
+
+    # An incremental crawl does not see the whole listing, so nothing is evicted.
+    resolver = FakeResolver()
+    older, evicted = refresh_older_posts(resolver, links, existing, listed, complete=False)
+    assert evicted == 0 and [post["url"] for post in resolver.submitted] == [p["url"] for p in older]
+
+    # A complete one does: the delisted post keeps its link but is no longer resolved.
+    resolver = FakeResolver()
+    listed.append(existing[1])
+    older, evicted = refresh_older_posts(resolver, links, existing, listed, complete=True)
+    assert evicted == 1 and [post["url"] for post in older] == ["https://hanimes.org/delisted"]
+    assert resolver.submitted == []
+    assert older[0]["direct_video_link"] == "https://cdn.test/delisted.mp4"
+
+
+def test_crawl_listing_reports_whether_it_reached_the_end(monkeypatch):
+    with open(FIXTURE, encoding='utf-8') as f:
+        page = f.read()
+
+    class Client:
+        def __init__(self, pages):
+            self.pages = pages
+
+        def get(self, url):
+            number = 1 if url == hanime_index.BASE_WEBSITE_URL else int(url.rstrip('/').rsplit('/', 1)[1])
+            return self.pages.get(number)
+
+    monkeypatch.setattr(hanime_index, "PAGE_REQUEUES", 0)
+    posts, complete = crawl_listing(Client({1: page, 2: "<html><body></body></html>"}), FakeResolver(), set(), full=True)
+    assert posts and complete
+
+    posts, complete = crawl_listing(Client({1: page}), FakeResolver(), set(), full=True)
+    assert posts and not complete  # Page 2 failed, so later posts may still be listed
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import hanime_index
+import html_parsing
+import javguru_index
+import onejav_index
+import playlist_index
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'fixtures')
+FETCH_TIME = "2025-01-01T00:00:00+00:00"
+SCRAPERS = [hanime_index, javguru_index, onejav_index, playlist_index]
+
+# Fixture file name -> the parse step that consumes it, as in benchmarks/bench_parsers.py.
+PARSERS = {
+    "missav_playlist.html": lambda html: playlist_index.parse_playlist_page(html, FETCH_TIME),
+    "missav_playlist.html (pages)": lambda html: playlist_index.parse_total_pages(html),
+    "hanime_listing.html": lambda html: hanime_index.extract_posts_from_html(html, "https://hanimes.org/tag/hanime/"),
+    "onejav_overview.html": lambda html: onejav_index.parse_overview_page(html, onejav_index.BASE_URL, FETCH_TIME),
+    "javguru_listing.html": lambda html: javguru_index.parse_listing_page(html, javguru_index.BASE_URL, FETCH_TIME),
+}
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name.split(' ')[0]), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def baseline_soup(markup, parse_only=None):
+    """How every scraper parsed its pages before the strainers: the whole tree, html.parser."""
+    return BeautifulSoup(markup, 'html.parser')
+
+
+@pytest.mark.parametrize("backend", ["lxml", "html.parser"])
+@pytest.mark.parametrize("name", PARSERS)
+def test_scoped_parsing_matches_the_full_html_parser_tree(name, backend, monkeypatch):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    parse, html = PARSERS[name], read_fixture(name)
+    with monkeypatch.context() as patch:
+        for module in SCRAPERS:
+            patch.setattr(module, "make_soup", baseline_soup)
+        expected = parse(html)
+    monkeypatch.setattr(html_parsing, "PARSER", backend)
+
+    scoped = parse(html)
+
+    assert scoped == expected
+    assert expected  # The fixture still holds what the scraper looks for
@@ -0,0 +1,81 @@
+import os
+
+import requests
+
+from http_cache import HttpCache
+from javguru_index import scrape_jav_guru
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'fixtures', 'javguru_listing.html')
+LAST_MODIFIED = "Sat, 10 Jan 2026 12:00:00 GMT"
+
+
+class Listing:
+    """
+    Serves the saved JAV.Guru listing at every path with an ETag per version.
+    Answers 304 to a matching If-None-Match unless `validators` is off, and
+    puts the request count in the sidebar so only the article grid is stable.
+    """
+
+    def __init__(self, validators=True):
+        with open(FIXTURE, 'r', encoding='utf-8') as f:
+            self.html = f.read()
+        self.validators = validators
+        self.version = 1
+        self.requests = []  # (path, If-None-Match, If-Modified-Since)
+
+    def __call__(self, handler):
+        self.requests.append((handler.path, handler.headers.get('If-None-Match'), handler.headers.get('If-Modified-Since')))
+        etag = f'"v{self.version}"'
+        if self.validators and handler.headers.get('If-None-Match') == etag:
+            handler.send(304, headers={'ETag': etag})
+            return
+        body = self.html.replace('</body>', f'<aside>request {len(self.requests)}</aside></body>')
+        if self.version > 1:
+            body = body.replace('</h2>', ' (updated)</h2>', 1)
+        handler.send(200, body.encode('utf-8'), headers={'ETag': etag, 'Last-Modified': LAST_MODIFIED},
+                     content_type='text/html')
+
+
+def crawl(base_url, cache, max_pages=2):
+    with requests.Session() as session:
+        return scrape_jav_guru(base_url, max_pages, session, cache=cache)
+
+
+def test_a_cached_url_is_revalidated_and_304_means_unchanged(serve, tmp_path):
+    site = Listing()
+    base_url = serve(site) + "/"
+    cache = HttpCache(str(tmp_path / "cache.json"))
+
+    first = crawl(base_url, cache)
+    cache.save()
+    second = crawl(base_url, HttpCache(str(tmp_path / "cache.json")))
+
+    assert len(first) == 40 and second == []
+    assert site.requests == [
+        ("/", None, None), ("/page/2/", None, None),
+        ("/", '"v1"', LAST_MODIFIED),  # Not modified: the crawl stops here
+    ]
+
+
+def test_a_changed_page_is_parsed_and_its_new_validators_stored(serve, tmp_path):
+    site = Listing()
+    base_url = serve(site) + "/"
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    crawl(base_url, cache)
+
+    site.version = 2
+    posts = crawl(base_url, cache)
+
+    assert len(posts) == 40
+    assert cache.conditional_headers(base_url) == {'If-None-Match': '"v2"', 'If-Modified-Since': LAST_MODIFIED}
+
+
+def test_without_validators_an_unchanged_article_grid_ends_the_crawl(serve, tmp_path):
+    site = Listing(validators=False)
+    base_url = serve(site) + "/"
+    cache = HttpCache(str(tmp_path / "cache.json"))
+    crawl(base_url, cache)
+
+    # The sidebar differs on every response, but the posts do not.
+    assert crawl(base_url, cache) == []
+    assert [path for path, _, _ in site.requests] == ["/", "/page/2/", "/"]
@@ -0,0 +1,119 @@
+import json
+import socket
+
+import pytest
+import requests
+
+import rate_limit
+from instrumentation import METRICS, Histogram, failure_cause, instrumented, timed_get, timed_parse
+
+
+@pytest.fixture
+def metrics(scheduler, monkeypatch):
+    """Fresh process metrics, and a scheduler that retries without waiting long."""
+    monkeypatch.setattr(scheduler, "backoff", 0.01)
+    METRICS.reset("test")
+    return METRICS
+
+
+class Site:
+    """/ok answers 200, /busy 429 (Retry-After: 0) once and then 200, anything else 404."""
+
+    def __init__(self):
+        self.busy = 0
+
+    def __call__(self, handler):
+        if handler.path == "/ok":
+            handler.send(200, b"0123456789")
+        elif handler.path == "/busy" and not self.busy:
+            self.busy += 1
+            handler.send(429, headers={"Retry-After": "0"})
+        elif handler.path == "/busy":
+            handler.send(200, b"done")
+        else:
+            handler.send(404, b"gone")
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}/"
+
+
+def test_timed_get_records_latency_bytes_failures_and_retries(serve, metrics):
+    base_url = serve(Site())
+    with requests.Session() as session:
+        assert timed_get(session, f"{base_url}/ok").status_code == 200
+        assert timed_get(session, f"{base_url}/missing").status_code == 404
+        assert timed_get(session, f"{base_url}/busy").status_code == 200
+        with pytest.raises(requests.exceptions.ConnectionError):
+            timed_get(session, closed_port_url())
+
+    report = metrics.report()
+    stats = report["backends"]["requests"]
+    attempts = 3 + 1 + (1 + rate_limit.RETRIES)  # The refused connection is retried
+    assert stats["requests"] == attempts and stats["latency_ms"]["count"] == attempts
+    assert sum(stats["latency_ms"]["counts"]) == attempts
+    assert stats["bytes"] == len(b"0123456789") + len(b"gone") + len(b"done")
+    assert stats["failures_by_cause"] == {"http_404": 1, "http_429": 1, "connection": 1 + rate_limit.RETRIES}
+    assert stats["failed"] == 2 + 1 + rate_limit.RETRIES
+    assert stats["retries_by_cause"] == {"http_429": 1, "connection": rate_limit.RETRIES}
+    assert len(report["slowest_requests"]) == attempts
+
+
+@pytest.mark.parametrize("kwargs, cause", [
+    ({"error": requests.exceptions.ReadTimeout()}, "timeout"),
+    ({"error": requests.exceptions.ConnectionError()}, "connection"),
+    ({"error": json.JSONDecodeError("x", "", 0)}, "bad_response"),
+    ({"error": KeyError("x")}, "KeyError"),
+    ({"status": 503, "headers": {"Server": "cloudflare"}}, "cloudflare"),
+    ({"status": 503, "headers": {"Server": "nginx"}}, "http_503"),
+    ({"status": 200}, None),
+])
+def test_failure_causes(kwargs, cause):
+    assert failure_cause(**kwargs) == cause
+
+
+def test_timed_parse_counts_pages_and_posts(metrics):
+    @timed_parse
+    def parse_listing(html):
+        return [html] * 3, 7  # Some parsers also return the page count
+
+    @timed_parse
+    def parse_empty(html):
+        return []
+
+    assert parse_listing("page") == (["page"] * 3, 7)
+    parse_empty("page")
+
+    parse = metrics.report()["parse"]
+    assert (parse["pages"], parse["posts"], parse["empty_pages"]) == (2, 3, 1)
+    assert parse["posts_per_page"]["max"] == 3
+
+
+def test_instrumented_writes_the_report_even_when_main_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    @instrumented("onejav")
+    def main():
+        METRICS.observe_request("requests", "https://onejav.test/", 0.2, 100)
+        raise RuntimeError("scraper crashed")
+
+    with pytest.raises(RuntimeError):
+        main()
+
+    report = json.loads((tmp_path / "data" / "metrics" / "onejav.json").read_text(encoding='utf-8'))
+    assert report["source"] == "onejav"
+    assert report["backends"]["requests"]["bytes"] == 100
+    assert report["slowest_requests"] == [{"url": "https://onejav.test/", "backend": "requests", "ms": 200.0}]
+
+
+def test_histogram_quantiles_use_bucket_bounds_capped_at_the_max():
+    histogram = Histogram([10, 100, 1000])
+    for value in [5] * 90 + [50] * 9 + [5000]:
+        histogram.add(value)
+
+    summary = histogram.to_dict()
+    assert summary["counts"] == [90, 9, 0, 1]
+    assert (summary["p50"], summary["p95"], summary["max"]) == (10, 100, 5000)
+    assert Histogram([10]).to_dict()["p95"] == 0
@@ -0,0 +1,94 @@
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+
+import link_checker
+from link_checker import LinkChecker, next_status
+from post_store import PostStore
+
+
+class MediaHost:
+    """
+    Answers HEAD from the path: /ok/..., /gone/... (404) and /nohead/<status>/...
+    (that status for HEAD, 206 for a one-byte range GET). Tracks the requests
+    in flight at once.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []  # (method, path, Range header)
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self.lock:
+            self.requests.append((handler.command, handler.path, handler.headers.get('Range')))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            parts = handler.path.strip('/').split('/')
+            if parts[0] == 'gone':
+                handler.send(404)
+            elif parts[0] == 'nohead' and handler.command == 'HEAD':
+                handler.send(int(parts[1]))
+            elif parts[0] == 'nohead':
+                handler.send(206 if handler.headers.get('Range') == 'bytes=0-0' else 200, b'x')
+            else:
+                handler.send(200)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_requests_in_flight_per_host_are_capped(serve):
+    host = MediaHost(delay=0.1)
+    base = serve(host)
+    checker = LinkChecker(max_workers=16, per_host=2, requests_per_second=1000)
+
+    results = dict(checker.check_many([f"{base}/ok/{n}.jpg" for n in range(12)]))
+
+    assert set(results.values()) == {200}
+    assert host.peak == 2
+
+
+def test_servers_refusing_head_get_a_one_byte_range_get(serve):
+    host = MediaHost()
+    base = serve(host)
+    checker = LinkChecker(requests_per_second=1000)
+
+    for status in (403, 405, 501):
+        assert checker.check(f"{base}/nohead/{status}/video.mp4") == 206
+    assert checker.check(f"{base}/gone/video.mp4") == 404
+
+    gets = [request for request in host.requests if request[0] == 'GET']
+    assert [(path, header) for _, path, header in gets] == [
+        (f"/nohead/{status}/video.mp4", 'bytes=0-0') for status in (403, 405, 501)]
+
+
+def test_a_link_is_dead_only_after_dead_after_dead_answers(serve, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    base = serve(MediaHost())
+    cover = f"{base}/gone/cover.jpg"
+    PostStore('playlist', 'page_link').append([{"page_link": "https://missav.ws/a", "cover_image_url": cover,
+                                                "preview_video_url": f"{base}/ok/preview.mp4"}])
+
+    link_checker.main(['--all', '--rate', '1000'])
+    assert link_checker.load_dead_links() == set()
+    link_checker.main(['--all', '--rate', '1000'])
+
+    assert link_checker.load_dead_links() == {cover}
+    assert link_checker.DEAD_AFTER == 2
+
+
+def test_next_checks_are_spread_around_the_interval():
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    previous = {"result": "alive", "failures": 0, "interval_days": 8}
+
+    due = {next_status(previous, f"https://cdn.test/{n}", 200, now)["next_check"] for n in range(50)}
+
+    offsets = [datetime.fromisoformat(check) - now for check in due]
+    assert len(due) == 50
+    low, high = 16 * (1 - link_checker.INTERVAL_JITTER), 16 * (1 + link_checker.INTERVAL_JITTER)
+    assert all(timedelta(days=low) <= offset <= timedelta(days=high) for offset in offsets)
+    assert max(offsets) - min(offsets) > timedelta(days=2)
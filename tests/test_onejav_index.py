@@ -0,0 +1,74 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from onejav_index import scrape_all_posts
+
+NEWEST_DAY = datetime(2026, 1, 10)
+CARD = '<div class="card-overview" data-date="{date}">{thumbnails}</div>'
+THUMBNAIL = ('<div class="thumbnail is-inline"><a class="thumbnail-link" href="/torrent/{code}">'
+             '<img src="/{code}.jpg"><div class="thumbnail-text">{code}</div></a></div>')
+
+
+def day(offset):
+    return (NEWEST_DAY - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+class OneJav:
+    """
+    The front page shows NEWEST_DAY; `?action=overview` serves two posts per
+    older day, the newer days slowest so the answers arrive out of order.
+    Days in `empty` have no posts and days in `missing` answer 404.
+    """
+
+    def __init__(self, days, empty=(), missing=()):
+        self.days = days
+        self.empty, self.missing = set(empty), set(missing)
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def page(self, date):
+        codes = [] if date in self.empty else [f"{date}-a", f"{date}-b"]
+        return CARD.format(date=date, thumbnails="".join(THUMBNAIL.format(code=code) for code in codes))
+
+    def __call__(self, handler):
+        query = parse_qs(urlsplit(handler.path).query)
+        date = query.get('currentdate', [day(0)])[0]
+        with self.lock:
+            self.requested.append(date)
+        if date in self.missing:
+            handler.send(404)
+            return
+        offset = (NEWEST_DAY - datetime.strptime(date, '%Y-%m-%d')).days
+        time.sleep(0.02 * (self.days - offset))
+        handler.send(200, self.page(date).encode('utf-8'), content_type='text/html')
+
+
+def dates(posts):
+    return list(dict.fromkeys(post['date'] for post in posts))
+
+
+def test_days_fetched_concurrently_come_back_in_date_order(serve):
+    site = OneJav(days=6)
+    base_url = serve(site) + "/"
+
+    posts = scrape_all_posts(base_url, 6, max_workers=6, requests_per_second=100)
+
+    assert dates(posts) == [day(offset) for offset in range(7)]
+    assert [post['link'] for post in posts[:3]] == [
+        f"{base_url}torrent/{day(0)}-a", f"{base_url}torrent/{day(0)}-b", f"{base_url}torrent/{day(1)}-a"]
+    assert len(site.requested) == 7
+
+
+@pytest.mark.parametrize("gap", ["empty", "missing"])
+def test_the_walk_stops_at_the_first_day_without_posts(serve, gap):
+    site = OneJav(days=6, **{gap: {day(3)}})
+
+    posts = scrape_all_posts(serve(site) + "/", 6, max_workers=6, requests_per_second=100)
+
+    # Later days were fetched too, but nothing past the gap is kept.
+    assert dates(posts) == [day(0), day(1), day(2)]
+    assert len(site.requested) == 7
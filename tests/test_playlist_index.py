@@ -0,0 +1,66 @@
+import playlist_index
+from playlist_index import scrape_all_pages, scrape_new_pages
+
+START_URL = "https://missav.test/playlist"
+ITEM = ('<li class="sm:flex"><label>{0}</label><a href="https://missav.test/{0}"></a>'
+        '<img data-src="https://missav.test/{0}.jpg"><video data-src="https://missav.test/{0}.mp4"></video></li>')
+
+
+class StubClient:
+    """Serves playlist pages of `per_page` posts each, newest first; pages in `failing` always fail."""
+
+    def __init__(self, total_posts, per_page=2, failing=()):
+        self.links = [f"v{n}" for n in range(total_posts, 0, -1)]
+        self.per_page = per_page
+        self.failing = set(failing)
+        self.concurrency = 1
+        self.requested = []
+
+    def get(self, url):
+        page = int(url.rsplit('=', 1)[1])
+        self.requested.append(page)
+        if page in self.failing:
+            return None
+        links = self.links[(page - 1) * self.per_page:page * self.per_page]
+        return "<ul>" + "".join(ITEM.format(link) for link in links) + "</ul>"
+
+    def total_pages(self):
+        return -(-len(self.links) // self.per_page)
+
+
+def links(posts):
+    return [post["page_link"].rsplit('/', 1)[1] for post in posts]
+
+
+def test_an_incremental_crawl_stops_at_the_first_window_with_only_known_posts(monkeypatch):
+    monkeypatch.setattr(playlist_index, "INCREMENTAL_WINDOW", 2)
+    client = StubClient(20)  # v20 .. v11 are new, v10 and older known
+    known = {f"https://missav.test/v{n}" for n in range(1, 11)}
+
+    posts, pages_scanned, newest = scrape_new_pages(client, START_URL, client.total_pages(), known)
+
+    assert pages_scanned == 6 and sorted(client.requested) == [1, 2, 3, 4, 5, 6]
+    assert links(posts)[:10] == [f"v{n}" for n in range(20, 10, -1)]
+    assert newest == "https://missav.test/v20"
+
+
+def test_the_saved_high_water_mark_also_stops_the_crawl(monkeypatch):
+    monkeypatch.setattr(playlist_index, "INCREMENTAL_WINDOW", 2)
+    client = StubClient(20)
+
+    _, pages_scanned, _ = scrape_new_pages(client, START_URL, client.total_pages(), {"https://missav.test/v1"},
+                                           high_water_mark="https://missav.test/v17")
+
+    assert pages_scanned == 2
+
+
+def test_no_newest_link_when_page_one_keeps_failing(monkeypatch):
+    monkeypatch.setattr(playlist_index, "INCREMENTAL_WINDOW", 2)
+    client = StubClient(8, failing={1})
+
+    posts, _, newest = scrape_new_pages(client, START_URL, client.total_pages(), {"https://missav.test/v1"})
+    all_posts, _, all_newest = scrape_all_pages(client, START_URL, client.total_pages())
+
+    assert client.requested.count(1) == 2 * (playlist_index.REQUEUE_ROUNDS + 1)
+    assert links(posts)[0] == "v6" and newest is None  # The first post fetched is from page 2
+    assert links(all_posts)[0] == "v6" and all_newest is None
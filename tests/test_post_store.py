@@ -0,0 +1,73 @@
+import json
+
+from post_store import PostStore, write_export
+
+
+def store(tmp_path, **kwargs):
+    return PostStore('playlist', 'page_link', store_dir=str(tmp_path / "store"), **kwargs)
+
+
+def log_lines(tmp_path):
+    return (tmp_path / "store" / "playlist.ndjson").read_text(encoding='utf-8').splitlines()
+
+
+def test_append_skips_links_already_stored_or_repeated(tmp_path):
+    posts = store(tmp_path)
+    assert posts.append([{"page_link": "a", "title": "A"}, {"page_link": "b"}, {"page_link": "a"}, {"title": "no link"}]) == \
+        [{"page_link": "a", "title": "A"}, {"page_link": "b"}]
+
+    added = store(tmp_path).append([{"page_link": "b", "title": "B again"}, {"page_link": "c"}])
+
+    assert added == [{"page_link": "c"}]
+    assert [json.loads(line)["page_link"] for line in log_lines(tmp_path)] == ["a", "b", "c"]
+
+
+def test_upsert_writes_only_changes_and_the_last_version_wins(tmp_path):
+    posts = store(tmp_path)
+    posts.append([{"page_link": "a", "title": "A"}, {"page_link": "b", "title": "B"}])
+
+    written = posts.upsert([{"page_link": "a", "title": "A"}, {"page_link": "b", "title": "B2"},
+                            {"page_link": "b", "title": "B3"}, {"page_link": "c", "title": "C"}])
+
+    assert written == [{"page_link": "b", "title": "B3"}, {"page_link": "c", "title": "C"}]
+    reloaded = store(tmp_path)
+    assert reloaded.get("b") == {"page_link": "b", "title": "B3"}
+    # Newest first by first-seen order: an updated post keeps its place.
+    assert [post["page_link"] for post in reloaded.posts()] == ["c", "b", "a"]
+
+
+def test_compact_folds_superseded_lines_and_keeps_first_seen_order(tmp_path):
+    posts = store(tmp_path)
+    posts.append([{"page_link": "a", "title": "A"}, {"page_link": "b", "title": "B"}])
+    posts.upsert([{"page_link": "a", "title": "A2"}])
+    with open(tmp_path / "store" / "playlist.ndjson", 'a', encoding='utf-8') as f:
+        f.write('{"page_link": "trunc')
+
+    assert store(tmp_path).compact() == 2
+    assert log_lines(tmp_path) == ['{"page_link":"a","title":"A2"}', '{"page_link":"b","title":"B"}']
+    assert store(tmp_path).compact() is None
+
+
+def test_a_legacy_export_is_imported_once_oldest_first(tmp_path):
+    legacy = tmp_path / "playlist.json"
+    write_export(str(legacy), [{"page_link": "new"}, {"page_link": "old"}], {"source_website": "MissAV"})
+
+    posts = store(tmp_path, legacy_file=str(legacy))
+    assert [json.loads(line)["page_link"] for line in log_lines(tmp_path)] == ["old", "new"]
+    assert [post["page_link"] for post in posts.posts()] == ["new", "old"]
+
+    write_export(str(legacy), [{"page_link": "other"}])
+    assert store(tmp_path, legacy_file=str(legacy)).keys() == {"new", "old"}  # The log exists now
+
+
+def test_export_json_sorts_newest_first_and_reports_changes(tmp_path):
+    posts = store(tmp_path)
+    posts.append([{"page_link": "a", "date": "2026-01-02"}, {"page_link": "b", "date": "2026-01-01"}])
+    output = tmp_path / "docs" / "playlist.json"
+
+    exported = posts.export_json(str(output), sort_key=lambda post: post["date"], header={"source_website": "MissAV"})
+
+    data = json.loads(output.read_text(encoding='utf-8'))
+    assert [post["page_link"] for post in exported] == ["a", "b"]
+    assert data == {"source_website": "MissAV", "total_videos": 2, "posts": exported}
+    assert write_export(str(output), exported, {"source_website": "MissAV"}) is False
@@ -0,0 +1,131 @@
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import rate_limit
+from rate_limit import HostScheduler, TokenBucket, retry_after
+
+
+def http_date(seconds_from_now):
+    return format_datetime(datetime.now(UTC) + timedelta(seconds=seconds_from_now), usegmt=True)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "5"}, 5.0),
+    ({"retry-after": "0.5"}, 0.5),
+    ({"Retry-After": "-3"}, 0.0),
+    ({"Retry-After": http_date(-60)}, 0.0),
+    ({"Retry-After": "soon"}, None),
+    ({}, None),
+])
+def test_retry_after_values(headers, expected):
+    assert retry_after(headers) == expected
+
+
+def test_retry_after_reads_an_http_date():
+    assert 28 <= retry_after({"Retry-After": http_date(30)}) <= 30
+
+
+def test_the_token_bucket_allows_a_burst_then_keeps_the_rate():
+    bucket = TokenBucket(rate=20, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    burst = time.monotonic() - start
+    for _ in range(4):
+        bucket.acquire()
+
+    assert burst < 0.02
+    assert 0.18 <= time.monotonic() - start < 0.4  # 4 more tokens at 20 per second
+
+
+def test_slow_down_halves_the_rate_down_to_its_floor():
+    scheduler = HostScheduler(policies={"a.test": {"rate": 10.0, "burst": 1, "concurrency": 1}})
+    url = "https://a.test/page"
+
+    rates = []
+    for _ in range(5):
+        scheduler.slow_down(url)
+        rates.append(scheduler._host(url)["bucket"].rate)
+
+    assert rates == [5.0, 2.5, 1.25, 1.0, 1.0]  # The floor is MIN_RATE_FRACTION of 10
+    assert scheduler._host("https://b.test/")["bucket"].rate == rate_limit.DEFAULT_POLICY["rate"]
+
+
+class Host:
+    """Answers after `delay`, tracking requests in flight; `throttled` first requests get a 429 with `wait`."""
+
+    def __init__(self, delay=0.05, throttled=0, wait=None):
+        self.delay, self.throttled, self.wait = delay, throttled, wait
+        self.in_flight = self.peak = 0
+        self.times = []
+        self.lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self.lock:
+            self.times.append(time.monotonic())
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            throttle = len(self.times) <= self.throttled
+        try:
+            if throttle:
+                handler.send(429, headers={"Retry-After": self.wait} if self.wait else {})
+                return
+            time.sleep(self.delay)
+            handler.send(200, b"ok")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def fetch_all(scheduler, urls):
+    """Sends every url through the scheduler from its own thread; returns the status codes."""
+    statuses = {}
+
+    def fetch(url):
+        statuses[url] = scheduler.request(url, lambda: requests.get(url, timeout=10)).status_code
+
+    threads = [threading.Thread(target=fetch, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def test_each_host_keeps_its_own_concurrency_cap(serve):
+    slow, fast = Host(), Host()
+    slow_url, fast_url = serve(slow), serve(fast)
+    scheduler = HostScheduler(policies={}, default={"rate": 1000, "burst": 100, "concurrency": 4})
+    scheduler.configure(slow_url.split("//")[1], concurrency=2)
+
+    statuses = fetch_all(scheduler, [f"{base}/{n}" for base in (slow_url, fast_url) for n in range(8)])
+
+    assert set(statuses.values()) == {200}
+    assert slow.peak == 2 and fast.peak == 4
+
+
+@pytest.mark.parametrize("form", ["seconds", "date"])
+def test_a_retry_after_holds_back_the_whole_host(serve, form):
+    host = Host(delay=0, throttled=1, wait="1" if form == "seconds" else http_date(2))
+    base_url = serve(host)
+    scheduler = HostScheduler(policies={}, default={"rate": 1000, "burst": 100, "concurrency": 1}, backoff=0.01)
+
+    statuses = fetch_all(scheduler, [f"{base_url}/{n}" for n in range(3)])
+
+    assert set(statuses.values()) == {200}
+    # The date form is rounded down to whole seconds, so it waits at least one.
+    assert all(later - host.times[0] >= 0.9 for later in host.times[1:])
+
+
+def test_a_429_without_retry_after_backs_off_and_slows_the_host(serve):
+    host = Host(delay=0, throttled=1)
+    base_url = serve(host)
+    scheduler = HostScheduler(policies={}, default={"rate": 50, "burst": 1, "concurrency": 1}, backoff=0.01)
+
+    assert scheduler.request(f"{base_url}/", lambda: requests.get(f"{base_url}/", timeout=10)).status_code == 200
+    assert scheduler._host(base_url)["bucket"].rate == 25.0
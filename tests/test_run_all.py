@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import hanime_index
+import playlist_index
+import run_all
+from conftest import FakeFlareSolverr
+from flaresolverr_client import FlareSolverrClient
+
+
+class InFlight:
+    """A solve() for FakeFlareSolverr that takes a while and records the peak number of solves at once."""
+
+    def __init__(self, seconds=0.1):
+        self.seconds = seconds
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, session):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.current -= 1
+
+
+LIMITS = {"playlist": playlist_index.MAX_WORKERS, "hanime": hanime_index.LISTING_WINDOW}
+
+
+def crawl_together(url, budget):
+    """Runs the playlist and hanime clients at once, each at its own limit; returns their pages."""
+    results = {}
+
+    def crawl(name, limit):
+        # Not adaptive, so each client keeps its own limit busy the whole time.
+        with FlareSolverrClient(url, pool_size=limit, budget=budget, adaptive=False, use_sessions=False) as client:
+            results[name] = dict(client.get_many([f"https://{name}.test/{n}" for n in range(4 * limit)]))
+
+    crawlers = [threading.Thread(target=crawl, args=item) for item in LIMITS.items()]
+    for crawler in crawlers:
+        crawler.start()
+    for crawler in crawlers:
+        crawler.join()
+    return results
+
+
+def test_the_flaresolverr_users_contend_for_the_budget(serve):
+    assert run_all.FLARESOLVERR_BUDGET < sum(LIMITS.values())
+    solves = InFlight()
+    budget = multiprocessing.get_context('fork').BoundedSemaphore(run_all.FLARESOLVERR_BUDGET)
+
+    results = crawl_together(f"{serve(FakeFlareSolverr(solves))}/v1", budget)
+
+    assert solves.peak == run_all.FLARESOLVERR_BUDGET
+    assert all(page is not None for pages in results.values() for page in pages.values())
+
+
+def test_without_the_budget_the_users_add_up(serve):
+    solves = InFlight()
+    crawl_together(f"{serve(FakeFlareSolverr(solves))}/v1", None)
+    assert solves.peak == sum(LIMITS.values())
+
+
+def source(main, timeout=30, flaresolverr=False):
+    return {"enabled": True, "module": SimpleNamespace(main=main), "args": ["--flag"], "timeout": timeout,
+            "flaresolverr": flaresolverr}
+
+
+def test_each_source_runs_isolated_and_a_hung_one_is_stopped(tmp_path, monkeypatch):
+    marker = tmp_path / "markers"
+    marker.mkdir()
+
+    def ok(argv):
+        (marker / "ok").write_text(" ".join(argv))
+
+    def shared(argv, budget):
+        (marker / "shared").write_text(type(budget).__name__)
+
+    def raises(argv):
+        raise ValueError("broken page")
+
+    def crashes(argv):
+        os._exit(3)
+
+    def hangs(argv):
+        try:
+            time.sleep(60)
+        finally:
+            (marker / "cleaned_up").write_text("")  # The SIGTERM reaches `finally` blocks
+
+    monkeypatch.setattr(run_all, "SCRAPER_CONFIG", {
+        "ok": source(ok), "shared": source(shared, flaresolverr=True), "raises": source(raises),
+        "crashes": source(crashes), "hangs": source(hangs, timeout=1),
+    })
+    monkeypatch.setattr(run_all, "STOP_GRACE_SECONDS", 5)
+
+    started = time.monotonic()
+    results = run_all.run_sources(["ok", "shared", "raises", "crashes", "hangs"])
+
+    assert [(r["name"], r["status"]) for r in results] == [
+        ("ok", "ok"), ("shared", "ok"), ("raises", "failed"), ("crashes", "failed"), ("hangs", "timeout")]
+    assert time.monotonic() - started < 10
+    assert (marker / "ok").read_text() == "--flag"
+    assert (marker / "shared").read_text() == "BoundedSemaphore"
+    assert (marker / "cleaned_up").exists()
+
+
+def test_a_source_that_ignores_sigterm_is_killed(monkeypatch):
+    def stubborn(argv):
+        while True:
+            try:
+                time.sleep(60)
+            except SystemExit:
+                pass
+
+    monkeypatch.setattr(run_all, "SCRAPER_CONFIG", {"stubborn": source(stubborn, timeout=0.5)})
+    monkeypatch.setattr(run_all, "STOP_GRACE_SECONDS", 0.5)
+
+    started = time.monotonic()
+    assert run_all.run_sources(["stubborn"])[0]["status"] == "timeout"
+    assert time.monotonic() - started < 5
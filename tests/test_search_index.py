@@ -0,0 +1,40 @@
+from search_index import build_search_index, locate, matching_tokens, search, token_trigrams
+
+
+def posts(*titles):
+    return [{"title": title} for title in titles]
+
+
+def title(post):
+    return post["title"]
+
+
+def test_new_posts_only_add_to_the_end_of_the_index():
+    before = [("javguru", posts("[ABP-123] Blue sky", "[SSIS-001] Red sky")), ("onejav", posts("ABP123 sky"))]
+    after = [("javguru", posts("[MIDV-500] Blue sea", *[p["title"] for p in before[0][1]])),
+             ("onejav", posts("SSIS001 sea", "ABP123 sky"))]
+    old, new = build_search_index(before, title), build_search_index(after, title)
+
+    for i, token in enumerate(old["tokens"]):
+        kept = new["postings"][new["tokens"].index(token)]
+        assert kept[:len(old["postings"][i])] == old["postings"][i]
+    assert [codes[:len(old_codes)] for codes, old_codes in zip(new["codes"], old["codes"])] == old["codes"]
+
+
+def test_search_returns_posts_source_after_source_newest_first():
+    sources = [("javguru", posts("[ABP-124] sky", "[SSIS-001] sea", "[ABP-123] sky")), ("onejav", posts("ABP124 sky"))]
+    index = build_search_index(sources, title)
+
+    found = [locate(index, doc) for doc in search(index, "sky")]
+
+    assert found == [("javguru", 0), ("javguru", 2), ("onejav", 0)]
+    assert [locate(index, doc) for doc in search(index, "abp124")] == [("javguru", 0), ("onejav", 0)]
+    assert search(index, "nothing") == []
+
+
+def test_trigram_lookup_finds_the_same_tokens_as_a_substring_scan():
+    tokens = sorted({"300mium1227", "mium", "premium", "ssis", "ssis001", "sky", "skyline", "ab", "abp123"})
+    grams = token_trigrams(tokens)
+
+    for term in ("mium", "ium12", "ssis0", "sky", "kyl", "ab", "s", "zzz", "abp123x"):
+        assert matching_tokens(tokens, grams, term) == [i for i, token in enumerate(tokens) if term in token]
@@ -0,0 +1,48 @@
+import pytest
+
+from catalogue import decode_catalogue
+from shards import MIN_HEAD_SIZE, paginate
+
+HEADER = {"catalogue": "catalogue-v1", "sources": [{"name": "playlist", "source_website": "MissAV"}]}
+
+
+def posts(count):
+    """`count` items, newest first, numbered from the oldest."""
+    return [{"title": f"post {n}", "records": [[0, n - 1, f"https://a.test/{n}"]]} for n in range(count, 0, -1)]
+
+
+def titles(shard):
+    return [item["title"] for item in decode_catalogue(shard)[1]]
+
+
+def test_shards_are_numbered_from_the_oldest_post():
+    shards = list(paginate(HEADER, posts(10), page_size=4, min_head=1))
+
+    assert [titles(shard) for shard in shards] == [
+        ["post 4", "post 3", "post 2", "post 1"],
+        ["post 8", "post 7", "post 6", "post 5"],
+        ["post 10", "post 9"],
+    ]
+
+
+@pytest.mark.parametrize("count, sizes", [
+    (0, []),
+    (3, [3]),  # A lone shard keeps whatever it has
+    (8, [4, 4]),
+    (9, [4, 5]),  # One post short of the minimum: folded into the shard below
+    (10, [4, 6]),
+    (11, [4, 4, 3]),
+])
+def test_a_small_head_shard_joins_the_one_below(count, sizes):
+    shards = list(paginate(HEADER, posts(count), page_size=4, min_head=3))
+
+    assert [len(titles(shard)) for shard in shards] == sizes
+    assert [title for shard in reversed(shards) for title in titles(shard)] == [p["title"] for p in posts(count)]
+
+
+def test_new_posts_only_change_the_newest_shards():
+    before = list(paginate(HEADER, posts(200)))
+    for added in range(1, 60):
+        after = list(paginate(HEADER, posts(200 + added)))
+        assert after[:len(before) - 2] == before[:len(before) - 2]
+        assert len(titles(after[-1])) >= MIN_HEAD_SIZE
@@ -0,0 +1,144 @@
+import glob
+import io
+import os
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import thumbnails  # noqa: E402
+from post_store import PostStore  # noqa: E402
+
+COVERS = 8
+
+
+def noise_jpeg(seed):
+    """A cover whose thumbnails do not compress away, so each one has a real size."""
+    rng = random.Random(seed)
+    image = Image.frombytes('RGB', (400, 560), rng.randbytes(400 * 560 * 3))
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=90)
+    return out.getvalue()
+
+
+class CoverHost:
+    """Serves /cover/<n>.jpg; /same/<n>.jpg all serve cover 0, and /missing/<n>.jpg is a 404."""
+
+    def __init__(self):
+        self.images = {n: noise_jpeg(n) for n in range(COVERS)}
+        self.hits = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self.lock:
+            self.hits[handler.path] += 1
+        kind, name = handler.path.strip('/').split('/')
+        number = int(name.split('.')[0])
+        if kind == 'missing':
+            return handler.send(404, b'not found', content_type='text/plain')
+        handler.send(200, self.images[0 if kind == 'same' else number], content_type='image/jpeg')
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch, serve):
+    """A working directory with a playlist store whose covers live on a stub host."""
+    monkeypatch.chdir(tmp_path)
+    host = CoverHost()
+    base = serve(host)
+
+    def posts(paths):
+        # Newest first, like the store's posts(): rank 0 is paths[0].
+        store = PostStore('playlist', 'page_link')
+        store.append([{"page_link": f"https://missav.ws/{n}", "cover_image_url": f"{base}{path}",
+                       "post_fetched_date": f"2026-01-{n + 1:02d}"} for n, path in reversed(list(enumerate(paths)))])
+
+    return host, posts
+
+
+def thumb_sizes(tmp_path):
+    """The bytes render_thumbnails() writes for each cover, measured in a scratch folder."""
+    scratch = tmp_path / "scratch"
+    return [thumbnails.render_thumbnails(noise_jpeg(n), f"{n:040d}", str(scratch)) for n in range(COVERS)]
+
+
+def store_records():
+    return PostStore(thumbnails.THUMB_STORE, "url").index
+
+
+def webp_files():
+    return sorted(os.path.relpath(path, thumbnails.THUMBS_DIR)
+                  for path in glob.glob(os.path.join(thumbnails.THUMBS_DIR, "*", "*.webp")))
+
+
+def test_cap_keeps_the_best_ranked_covers_and_evicts_the_rest(site, tmp_path):
+    host, posts = site
+    posts([f"/cover/{n}.jpg" for n in range(COVERS)])
+    sizes = thumb_sizes(tmp_path)
+    cap_mb = (sum(sizes[:3]) + sizes[3] // 2) / 1024 / 1024
+
+    thumbnails.main(['--max-mb', str(cap_mb)])
+
+    statuses = [record["status"] for record in store_records().values()]
+    assert statuses.count("ok") == 3 and statuses.count("evicted") == COVERS - 3
+    kept = {record["hash"] for record in store_records().values() if record["status"] == "ok"}
+    assert {name.split('/')[1].rsplit('-', 1)[0] for name in webp_files()} == kept
+    assert sum(os.path.getsize(os.path.join(thumbnails.THUMBS_DIR, name)) for name in webp_files()) <= cap_mb * 1024 * 1024
+
+
+def test_covers_evicted_for_lack_of_room_are_not_fetched_again(site, tmp_path):
+    host, posts = site
+    posts([f"/cover/{n}.jpg" for n in range(COVERS)])
+    sizes = thumb_sizes(tmp_path)
+    cap_mb = str((sum(sizes[:3]) + sizes[3] // 2) / 1024 / 1024)
+
+    thumbnails.main(['--max-mb', cap_mb])
+    first_run = sum(host.hits.values())
+    thumbnails.main(['--max-mb', cap_mb])
+
+    assert first_run == COVERS
+    assert sum(host.hits.values()) == first_run  # Nothing is downloaded again
+
+
+def test_covers_with_the_same_content_share_one_set_of_thumbnails(site):
+    host, posts = site
+    posts([f"/same/{n}.jpg" for n in range(3)] + ["/cover/1.jpg"])
+
+    thumbnails.main([])
+
+    hashes = [record["hash"] for record in store_records().values()]
+    assert len(hashes) == 4 and len(set(hashes)) == 2
+    assert len(webp_files()) == 2 * len(thumbnails.THUMB_WIDTHS)
+
+
+def test_a_lower_cap_evicts_thumbnails_already_made(site, tmp_path):
+    host, posts = site
+    posts([f"/cover/{n}.jpg" for n in range(4)])
+    sizes = thumb_sizes(tmp_path)
+
+    thumbnails.main([])
+    assert len(webp_files()) == 4 * len(thumbnails.THUMB_WIDTHS)
+    thumbnails.main(['--max-mb', str((sizes[0] + sizes[1] // 2) / 1024 / 1024)])
+
+    records = list(store_records().values())
+    assert [record["status"] for record in records].count("ok") == 1
+    assert len(webp_files()) == len(thumbnails.THUMB_WIDTHS)
+    assert sum(host.hits.values()) == 4  # Evicting needs no download
+
+
+def test_failed_covers_wait_for_the_retry_window(site):
+    host, posts = site
+    posts(["/missing/0.jpg", "/cover/1.jpg"])
+
+    thumbnails.main([])
+    thumbnails.main([])
+
+    assert host.hits["/missing/0.jpg"] == 1
+    record = next(record for url, record in store_records().items() if url.endswith("/missing/0.jpg"))
+    assert record["status"] == "failed" and record["failures"] == 1
+    checked = datetime.fromisoformat(record["checked"])
+    assert not thumbnails.needs_fetch(record, checked + timedelta(days=thumbnails.FAILED_RETRY_DAYS - 1))
+    assert thumbnails.needs_fetch(record, checked + timedelta(days=thumbnails.FAILED_RETRY_DAYS))
@@ -1,51 +1,105 @@
+import argparse
+import hashlib
+import os
 import sys
+import threading
 import cloudscraper
 from bs4 import BeautifulSoup
 import re
-from urllib.parse import urljoin
-import time
-
-def unpack_js_packer(packed_js):
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from rate_limit import SCHEDULER  # noqa: E402
+
+# --- Precompiled patterns ---
+PACKER_ARGS_RE = re.compile(r"}\('(.+)',(\d+),(\d+),'(.+?)'\.split\('\|'\)")  # The packer's (p, a, c, k) arguments
+PACKED_SCRIPT_RE = re.compile(r"eval\(function\(p,a,c,k,e,d\)")
+WORD_SPLIT_RE = re.compile(r'\b(\w+)\b')  # split() puts the words at the odd indices
+M3U8_RE = re.compile(r'https?://[^\s"\'`]+\.m3u8[^\s"\'`]*')
+BASE_N_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+UNPACK_CACHE_SIZE = 64  # Distinct player scripts remembered by the unpacker
+
+class JsUnpacker:
     """
-    A pure Python implementation to unpack the popular 'eval(function(p,a,c,k,e,d)...)' JS packer.
-    
-    Args:
-        packed_js (str): The entire packed JavaScript string.
+    Unpacks 'eval(function(p,a,c,k,e,d)...)' scripts.
 
-    Returns:
-        str: The deobfuscated (unpacked) JavaScript code or None if it fails.
+    The base-N symbol keys are built once per (radix, symbol count), and
+    results are memoized on a hash of the packed script, since many pages ship
+    the same player script. Safe to share between threads.
     """
-    try:
-        # This regex is the key to extracting the packer's arguments
-        match = re.search(r"}\('(.+)',(\d+),(\d+),'(.+?)'\.split\('\|'\)", packed_js)
+
+    def __init__(self, cache_size=UNPACK_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._results = OrderedDict()
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _base_n_keys(self, radix, count):
+        """The base-`radix` spelling of 0 .. count-1, as the packer numbers its symbols."""
+        keys = self._keys.get((radix, count))
+        if keys is None:
+            keys = []
+            for num in range(count):
+                digits = BASE_N_ALPHABET[num % radix]
+                num //= radix
+                while num:
+                    digits = BASE_N_ALPHABET[num % radix] + digits
+                    num //= radix
+                keys.append(digits)
+            self._keys[(radix, count)] = keys
+        return keys
+
+    def _unpack(self, packed_js):
+        match = PACKER_ARGS_RE.search(packed_js)
         if not match:
             return None
-
-        payload, radix, count, symbols = match.groups()
-        radix = int(radix)
-        count = int(count)
+        payload, radix, _, symbols = match.groups()
         symbols = symbols.split('|')
+        table = dict(zip(self._base_n_keys(int(radix), len(symbols)), symbols))
+        parts = WORD_SPLIT_RE.split(payload)
+        lookup = table.get
+        parts[1::2] = [lookup(word, word) for word in parts[1::2]]
+        return ''.join(parts)
+
+    def unpack(self, packed_js):
+        """
+        Args:
+            packed_js (str): The entire packed JavaScript string.
+
+        Returns:
+            str: The deobfuscated (unpacked) JavaScript code or None if it fails.
+        """
+        digest = hashlib.sha1(packed_js.encode('utf-8', 'surrogatepass')).digest()
+        with self._lock:
+            if digest in self._results:
+                self._results.move_to_end(digest)
+                return self._results[digest]
+        try:
+            result = self._unpack(packed_js)
+        except Exception as e:
+            print(f"    [!] Warning: Failed to unpack a JS block. Error: {e}")
+            return None
+        with self._lock:
+            self._results[digest] = result
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result
 
-        # This function converts an integer to a base-n string, crucial for the symbol table
-        def int_to_base_n(num, base):
-            if num < 0: return ''
-            if num == 0: return '0'
-            alphabet = "0123456789abcdefghijklmnopqrstuvwxyz"
-            if num < base:
-                return alphabet[num]
-            else:
-                return int_to_base_n(num // base, base) + alphabet[num % base]
+UNPACKER = JsUnpacker()
 
-        # Create a dictionary for fast symbol lookups
-        symbol_table = {int_to_base_n(i, radix): sym for i, sym in enumerate(symbols)}
+def unpack_js_packer(packed_js):
+    """
+    A pure Python implementation to unpack the popular 'eval(function(p,a,c,k,e,d)...)' JS packer.
 
-        # Use a regex to perform the replacements
-        # This finds all the alphanumeric "words" to be replaced
-        return re.sub(r'\b(\w+)\b', lambda m: symbol_table.get(m.group(1), m.group(1)), payload)
+    Args:
+        packed_js (str): The entire packed JavaScript string.
 
-    except Exception as e:
-        print(f"    [!] Warning: Failed to unpack a JS block. Error: {e}")
-        return None
+    Returns:
+        str: The deobfuscated (unpacked) JavaScript code or None if it fails.
+    """
+    return UNPACKER.unpack(packed_js)
 
 def find_m3u8_in_url(url, scraper_session):
     """
@@ -61,7 +115,8 @@ def find_m3u8_in_url(url, scraper_session):
     found_m3u8 = set()
     try:
         print(f"[*] Processing URL: {url}")
-        response = scraper_session.get(url, timeout=30)
+        # Paced per host, and retried on 429/5xx, by the shared scheduler.
+        response = SCHEDULER.request(url, lambda: scraper_session.get(url, timeout=30))
         response.raise_for_status()
 
         page_content = response.text
@@ -69,20 +124,14 @@ def find_m3u8_in_url(url, scraper_session):
 
         # --- 1. Find M3U8 Links using advanced de-obfuscation ---
         print("    [*] Searching for obfuscated JavaScript resources...")
-        for script in soup.find_all("script", string=re.compile(r"eval\(function\(p,a,c,k,e,d\)")):
+        for script in soup.find_all("script", string=PACKED_SCRIPT_RE):
             unpacked_code = unpack_js_packer(script.string)
             if unpacked_code:
-                m3u8_pattern = re.compile(r'https?://[^\s"\'`]+\.m3u8[^\s"\'`]*')
-                urls = m3u8_pattern.findall(unpacked_code)
-                for u in urls:
-                    found_m3u8.add(u)
+                found_m3u8.update(M3U8_RE.findall(unpacked_code))
 
         # --- 2. Find standard M3U8 Links (fallback) ---
         print("    [*] Searching for standard M3U8 links...")
-        m3u8_pattern_fallback = re.compile(r'https?://[^\s"\'`]+\.m3u8[^\s"\'`]*')
-        urls_fallback = m3u8_pattern_fallback.findall(page_content)
-        for u in urls_fallback:
-            found_m3u8.add(u)
+        found_m3u8.update(M3U8_RE.findall(page_content))
 
         if found_m3u8:
              print(f"    [+] Found {len(found_m3u8)} M3U8 link(s) for this URL.")
@@ -95,9 +144,21 @@ def find_m3u8_in_url(url, scraper_session):
         print(f"    [!] An error occurred while processing {url}: {e}")
         return found_m3u8 # Return any links found before the error
 
-def main(input_file, output_file):
+def load_checkpoint(checkpoint_file):
+    """Returns the set of URLs an earlier, interrupted run already finished."""
+    if not os.path.exists(checkpoint_file):
+        return set()
+    with open(checkpoint_file, 'r') as f:
+        return {line.strip() for line in f if line.strip()}
+
+def main(input_file, output_file, workers=4, rate=1.0, checkpoint_file=None, restart=False):
     """
     Main function to read URLs from a file, find M3U8 links, and save them.
+
+    URLs are processed by `workers` threads, with requests to each host paced
+    at `rate` per second. Playlist links are appended to the output file as
+    soon as each URL is done, and finished URLs are recorded in a checkpoint
+    file so an interrupted run picks up where it stopped.
     """
     try:
         with open(input_file, 'r') as f:
@@ -110,32 +171,61 @@ def main(input_file, output_file):
         print(f"[!] Input file '{input_file}' is empty.")
         sys.exit(1)
 
-    all_found_links = set()
-    scraper = cloudscraper.create_scraper() # Create one session to reuse
+    checkpoint_file = checkpoint_file or f"{output_file}.checkpoint"
+    done = set() if restart else load_checkpoint(checkpoint_file)
+    resuming = bool(done)
+    pending = list(dict.fromkeys(url for url in urls_to_process if url not in done))
+
+    written = set()
+    if resuming and os.path.exists(output_file):
+        with open(output_file, 'r') as f:
+            written = {line.strip() for line in f if line.strip()}
 
     print(f"[*] Found {len(urls_to_process)} URLs to process from '{input_file}'.")
-    
-    for url in urls_to_process:
-        links = find_m3u8_in_url(url, scraper)
-        all_found_links.update(links)
-        time.sleep(1) # Be a polite scraper
-
-    if all_found_links:
-        print(f"\n[*] Writing {len(all_found_links)} unique M3U8 links to '{output_file}'...")
-        with open(output_file, 'w') as f:
-            for link in sorted(list(all_found_links)):
-                if "playlist" in link:
-                    f.write(link + '\n')
+    if resuming:
+        print(f"[*] Resuming: {len(done)} URLs already done according to '{checkpoint_file}'.")
+
+    for host in {urlsplit(url).netloc for url in pending}:
+        SCHEDULER.configure(host, rate=rate, burst=1, concurrency=workers)
+    local = threading.local()
+
+    def process(url):
+        # cloudscraper sessions are not thread-safe, so each worker keeps its own.
+        if not hasattr(local, 'scraper'):
+            local.scraper = cloudscraper.create_scraper()
+        return find_m3u8_in_url(url, local.scraper)
+
+    mode = 'a' if resuming else 'w'
+    with open(output_file, mode) as out, open(checkpoint_file, mode) as checkpoint, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_url = {executor.submit(process, url): url for url in pending}
+        for future in as_completed(future_to_url):
+            url = future_to_url[future]
+            for link in sorted(future.result()):
+                if "playlist" in link and link not in written:
+                    out.write(link + '\n')
+                    written.add(link)
+            out.flush()
+            # Only mark the URL done once its links are safely on disk.
+            checkpoint.write(url + '\n')
+            checkpoint.flush()
+
+    os.remove(checkpoint_file)
+    if written:
+        print(f"\n[*] '{output_file}' holds {len(written)} unique M3U8 playlist links.")
         print("[*] Done.")
     else:
         print("\n[*] No M3U8 links were found across all provided URLs.")
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python resource_finder.py <path_to_links.txt>")
-        sys.exit(1)
-    
-    input_filename = sys.argv[1]
-    output_filename = 'output.txt'
-    main(input_filename, output_filename)
+    parser = argparse.ArgumentParser(description="Find M3U8 playlist links on a list of pages.")
+    parser.add_argument('input_file', help="Text file with one page URL per line.")
+    parser.add_argument('-o', '--output', default='output.txt', help="File the playlist links are written to.")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="Pages processed concurrently.")
+    parser.add_argument('--rate', type=float, default=1.0, help="Maximum requests per second to each host.")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <output>.checkpoint).")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start over.")
+    args = parser.parse_args()
+
+    main(args.input_file, args.output, args.workers, args.rate, args.checkpoint, args.restart)